@@ -16,10 +16,14 @@ from app.models.user import User
 from app.models.customer import Customer
 from app.models.supplier import Supplier
 from app.models.product import Product
-from app.models.order import SalesOrder, OrderLine
-from app.models.payment import Payment
-from app.models.stock import StockMovement
+from app.models.order import SalesOrder, SalesOrderItem
+from app.models.payment import Payment, PaymentAllocation
+from app.models.stock import StockMovement, StockCheckpoint
 from app.models.audit import AuditLog
+from app.models.report import DailySalesRollup, DailySalesTotal
+from app.models.numbering import DocumentCounter
+from app.models.idempotency import IdempotencyKey
+from app.models.balance import BalanceEntry, BalanceCheckpoint
 
 # this is the Alembic Config object
 config = context.config
@@ -0,0 +1,69 @@
+"""Daily sales rollup tables
+
+Revision ID: 002_daily_sales_rollup
+Revises: 001_uuid_schema
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002_daily_sales_rollup'
+down_revision = '001_uuid_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_sales_rollup',
+        sa.Column('business_date', sa.Date(), nullable=False),
+        sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('revenue', sa.Numeric(15, 0), nullable=False, server_default='0'),
+        sa.Column('quantity', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cost', sa.Numeric(15, 0), nullable=False, server_default='0'),
+        sa.Column('order_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('business_date', 'product_id')
+    )
+    op.create_index('idx_daily_sales_rollup_product_id', 'daily_sales_rollup', ['product_id'])
+    
+    op.create_table('daily_sales_totals',
+        sa.Column('business_date', sa.Date(), nullable=False),
+        sa.Column('revenue', sa.Numeric(15, 0), nullable=False, server_default='0'),
+        sa.Column('subtotal', sa.Numeric(15, 0), nullable=False, server_default='0'),
+        sa.Column('cost', sa.Numeric(15, 0), nullable=False, server_default='0'),
+        sa.Column('collected', sa.Numeric(15, 0), nullable=False, server_default='0'),
+        sa.Column('order_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('business_date')
+    )
+    
+    # Backfill from existing orders (same as `python -m app.rebuild_rollup`)
+    op.execute("""
+        INSERT INTO daily_sales_rollup (business_date, product_id, revenue, quantity, cost, order_count)
+        SELECT date(o.order_date), i.product_id, sum(i.line_total), sum(i.quantity),
+               sum(i.cost_price * i.quantity), count(DISTINCT i.order_id)
+        FROM sales_order_items i
+        JOIN sales_orders o ON o.id = i.order_id
+        WHERE o.status IN ('confirmed', 'shipped', 'completed') AND o.deleted_at IS NULL
+        GROUP BY date(o.order_date), i.product_id
+    """)
+    op.execute("""
+        INSERT INTO daily_sales_totals (business_date, revenue, subtotal, cost, collected, order_count)
+        SELECT date(o.order_date), sum(o.total), sum(o.subtotal), coalesce(sum(c.cost), 0),
+               sum(o.paid_amount), count(o.id)
+        FROM sales_orders o
+        LEFT JOIN (
+            SELECT order_id, sum(cost_price * quantity) AS cost
+            FROM sales_order_items GROUP BY order_id
+        ) c ON c.order_id = o.id
+        WHERE o.status IN ('confirmed', 'shipped', 'completed') AND o.deleted_at IS NULL
+        GROUP BY date(o.order_date)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_sales_totals')
+    op.drop_index('idx_daily_sales_rollup_product_id', table_name='daily_sales_rollup')
+    op.drop_table('daily_sales_rollup')
@@ -0,0 +1,35 @@
+"""Composite (sort column, id) indexes for keyset pagination
+
+Revision ID: 003_keyset_indexes
+Revises: 002_daily_sales_rollup
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003_keyset_indexes'
+down_revision = '002_daily_sales_rollup'
+branch_labels = None
+depends_on = None
+
+# (table, old single-column index, new composite index, columns)
+INDEXES = [
+    ('sales_orders', 'idx_sales_orders_order_date', 'idx_sales_orders_order_date_id', ['order_date', 'id']),
+    ('payments', 'idx_payments_payment_date', 'idx_payments_payment_date_id', ['payment_date', 'id']),
+    ('stock_movements', 'idx_stock_movements_created_at', 'idx_stock_movements_created_at_id', ['created_at', 'id']),
+    ('audit_logs', 'idx_audit_logs_created_at', 'idx_audit_created_at_id', ['created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    # The composite indexes also serve every query the single-column ones did
+    for table, old, new, columns in INDEXES:
+        op.create_index(new, table, columns)
+        op.drop_index(old, table_name=table)
+
+
+def downgrade() -> None:
+    for table, old, new, columns in INDEXES:
+        op.create_index(old, table, columns[:1])
+        op.drop_index(new, table_name=table)
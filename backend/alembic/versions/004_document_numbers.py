@@ -0,0 +1,36 @@
+"""Sequences for block-allocated order and payment numbers
+
+Revision ID: 004_document_numbers
+Revises: 003_keyset_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_document_numbers'
+down_revision = '003_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+# Must match DOCUMENT_NUMBER_BLOCK in app/models/numbering.py
+BLOCK = 100
+
+
+def upgrade() -> None:
+    for name in ('order', 'payment'):
+        op.execute(f"CREATE SEQUENCE {name}_number_seq INCREMENT BY {BLOCK} START WITH 1")
+    
+    # Fallback counters for databases without sequences
+    op.create_table('document_counters',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('document_counters')
+    for name in ('order', 'payment'):
+        op.execute(f"DROP SEQUENCE {name}_number_seq")
@@ -0,0 +1,38 @@
+"""Stock checkpoints at period boundaries for as-of stock queries
+
+Revision ID: 006_stock_checkpoints
+Revises: 005_idempotency_keys
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '006_stock_checkpoints'
+down_revision = '005_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('stock_checkpoints',
+        sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('period_end', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('product_id', 'period_end')
+    )
+    op.create_index('idx_stock_checkpoints_period_end', 'stock_checkpoints', ['period_end'])
+    
+    # Delta scans read one product's movements in a time range
+    op.create_index('idx_stock_movements_product_id_created_at', 'stock_movements', ['product_id', 'created_at'])
+    op.drop_index('idx_stock_movements_product_id', table_name='stock_movements')
+
+
+def downgrade() -> None:
+    op.create_index('idx_stock_movements_product_id', 'stock_movements', ['product_id'])
+    op.drop_index('idx_stock_movements_product_id_created_at', table_name='stock_movements')
+    op.drop_index('idx_stock_checkpoints_period_end', table_name='stock_checkpoints')
+    op.drop_table('stock_checkpoints')
@@ -0,0 +1,53 @@
+"""Append-only customer/supplier balance ledger with monthly checkpoints
+
+Revision ID: 007_balance_ledger
+Revises: 006_stock_checkpoints
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007_balance_ledger'
+down_revision = '006_stock_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    party_type = sa.Enum('customer', 'supplier', name='partytype')
+    
+    op.create_table('balance_entries',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text('uuid_generate_v4()')),
+        sa.Column('party_type', party_type, nullable=False),
+        sa.Column('party_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=15, scale=0), nullable=False),
+        sa.Column('source_type', sa.String(length=20), nullable=False),
+        sa.Column('source_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_by', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_balance_entries_party_created_at', 'balance_entries', ['party_type', 'party_id', 'created_at'])
+    op.create_index('idx_balance_entries_created_at', 'balance_entries', ['created_at'])
+    
+    op.create_table('balance_checkpoints',
+        sa.Column('party_type', party_type, nullable=False),
+        sa.Column('party_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('period_end', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('balance', sa.Numeric(precision=15, scale=0), nullable=False),
+        sa.PrimaryKeyConstraint('party_type', 'party_id', 'period_end')
+    )
+    op.create_index('idx_balance_checkpoints_period_end', 'balance_checkpoints', ['period_end'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_balance_checkpoints_period_end', table_name='balance_checkpoints')
+    op.drop_table('balance_checkpoints')
+    op.drop_index('idx_balance_entries_created_at', table_name='balance_entries')
+    op.drop_index('idx_balance_entries_party_created_at', table_name='balance_entries')
+    op.drop_table('balance_entries')
+    op.execute('DROP TYPE IF EXISTS partytype')
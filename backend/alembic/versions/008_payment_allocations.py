@@ -0,0 +1,40 @@
+"""Payment allocations to orders
+
+Revision ID: 008_payment_allocations
+Revises: 007_balance_ledger
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '008_payment_allocations'
+down_revision = '007_balance_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('payment_allocations',
+        sa.Column('payment_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['order_id'], ['sales_orders.id']),
+        sa.PrimaryKeyConstraint('payment_id', 'order_id')
+    )
+    op.create_index('idx_payment_allocations_order_id', 'payment_allocations', ['order_id'])
+    
+    # Payments linked to an order were applied to it in full
+    op.execute(
+        "INSERT INTO payment_allocations (payment_id, order_id, amount, created_at) "
+        "SELECT id, order_id, amount, created_at FROM payments WHERE order_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_payment_allocations_order_id', table_name='payment_allocations')
+    op.drop_table('payment_allocations')
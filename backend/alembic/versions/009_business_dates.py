@@ -0,0 +1,93 @@
+"""Stored shop-local business_date on orders, payments and stock movements
+
+Revision ID: 009_business_dates
+Revises: 008_payment_allocations
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+
+# revision identifiers, used by Alembic.
+revision = '009_business_dates'
+down_revision = '008_payment_allocations'
+branch_labels = None
+depends_on = None
+
+# Rows updated (and committed) per backfill statement
+BATCH_ROWS = 50_000
+
+# (table, timestamp the date is derived from, index, index columns)
+TABLES = [
+    ('sales_orders', 'order_date', 'idx_sales_orders_business_date', ['business_date']),
+    ('payments', 'payment_date', 'idx_payments_business_date', ['business_date']),
+    ('stock_movements', 'created_at', 'idx_stock_movements_type_business_date', ['type', 'business_date']),
+]
+
+
+def _backfill(conn, table: str, column: str):
+    """Set business_date in id order, one committed batch at a time."""
+    after = None
+    while True:
+        lower = "WHERE id > :after" if after else ""
+        upto = conn.execute(sa.text(
+            f"SELECT max(id::text) FROM (SELECT id FROM {table} {lower} ORDER BY id LIMIT :batch) b"
+        ), {"after": after, "batch": BATCH_ROWS}).scalar()
+        if upto is None:
+            return
+        conn.execute(sa.text(
+            f"UPDATE {table} SET business_date = ({column} AT TIME ZONE :tz)::date "
+            f"WHERE id <= :upto {'AND id > :after' if after else ''}"
+        ), {"tz": settings.SHOP_TIMEZONE, "upto": upto, "after": after})
+        after = upto
+
+
+def upgrade() -> None:
+    for table, _, _, _ in TABLES:
+        op.add_column(table, sa.Column('business_date', sa.Date(), nullable=True))
+
+    # Outside the migration transaction so large tables are not locked in one UPDATE
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        for table, column, _, _ in TABLES:
+            _backfill(conn, table, column)
+
+    for table, _, index, columns in TABLES:
+        op.alter_column(table, 'business_date', nullable=False)
+        op.create_index(index, table, columns)
+    # (type, business_date) serves every query the single-column index did
+    op.drop_index('idx_stock_movements_type', table_name='stock_movements')
+
+    # Re-key the daily rollup by the new business dates (same as `python -m app.rebuild_rollup`)
+    op.execute("DELETE FROM daily_sales_rollup")
+    op.execute("DELETE FROM daily_sales_totals")
+    op.execute("""
+        INSERT INTO daily_sales_rollup (business_date, product_id, revenue, quantity, cost, order_count)
+        SELECT o.business_date, i.product_id, sum(i.line_total), sum(i.quantity),
+               sum(i.cost_price * i.quantity), count(DISTINCT i.order_id)
+        FROM sales_order_items i
+        JOIN sales_orders o ON o.id = i.order_id
+        WHERE o.status IN ('confirmed', 'shipped', 'completed') AND o.deleted_at IS NULL
+        GROUP BY o.business_date, i.product_id
+    """)
+    op.execute("""
+        INSERT INTO daily_sales_totals (business_date, revenue, subtotal, cost, collected, order_count)
+        SELECT o.business_date, sum(o.total), sum(o.subtotal), coalesce(sum(c.cost), 0),
+               sum(o.paid_amount), count(o.id)
+        FROM sales_orders o
+        LEFT JOIN (
+            SELECT order_id, sum(cost_price * quantity) AS cost
+            FROM sales_order_items GROUP BY order_id
+        ) c ON c.order_id = o.id
+        WHERE o.status IN ('confirmed', 'shipped', 'completed') AND o.deleted_at IS NULL
+        GROUP BY o.business_date
+    """)
+
+
+def downgrade() -> None:
+    op.create_index('idx_stock_movements_type', 'stock_movements', ['type'])
+    for table, _, index, _ in TABLES:
+        op.drop_index(index, table_name=table)
+        op.drop_column(table, 'business_date')
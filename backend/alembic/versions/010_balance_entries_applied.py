@@ -0,0 +1,39 @@
+"""Balance entries applied to the balance columns after commit
+
+Revision ID: 010_balance_entries_applied
+Revises: 009_business_dates
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_balance_entries_applied'
+down_revision = '009_business_dates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing entries were applied in the same transaction that wrote them
+    op.add_column('balance_entries', sa.Column('applied', sa.Boolean(), nullable=False, server_default=sa.true()))
+    op.alter_column('balance_entries', 'applied', server_default=None)
+    op.create_index('idx_balance_entries_pending', 'balance_entries', ['party_type', 'party_id'],
+                    postgresql_where=sa.text('NOT applied'))
+
+
+def downgrade() -> None:
+    # Apply what is pending so the balance columns stay complete without the flag
+    for table, column, party_type in (('customers', 'total_debt', 'customer'),
+                                      ('suppliers', 'total_payable', 'supplier')):
+        op.execute(f"""
+            UPDATE {table} SET {column} = {column} + p.delta
+            FROM (
+                SELECT party_id, sum(amount) AS delta FROM balance_entries
+                WHERE NOT applied AND party_type = '{party_type}' GROUP BY party_id
+            ) p
+            WHERE {table}.id = p.party_id
+        """)
+    op.drop_index('idx_balance_entries_pending', table_name='balance_entries')
+    op.drop_column('balance_entries', 'applied')
@@ -10,6 +10,7 @@ from pydantic import BaseModel
 
 from app.database import get_db
 from app.models.audit import AuditLog
+from app.pagination import paginate
 from app.api.deps import require_admin
 
 
@@ -32,7 +33,8 @@ class AuditLogResponse(BaseModel):
 
 class AuditListResponse(BaseModel):
     items: list[AuditLogResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 @router.get("", response_model=AuditListResponse)
@@ -41,19 +43,22 @@ def list_audit_logs(
     entity_id: Optional[UUID] = None,
     page: int = Query(1, ge=1),
     size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     db: Session = Depends(get_db),
     _admin = Depends(require_admin)
 ):
     """List audit logs (admin only)."""
-    query = db.query(AuditLog).order_by(AuditLog.created_at.desc())
+    query = db.query(AuditLog)
     
     if entity_type:
         query = query.filter(AuditLog.entity_type == entity_type)
     if entity_id:
         query = query.filter(AuditLog.entity_id == entity_id)
     
-    total = query.count()
-    logs = query.offset((page - 1) * size).limit(size).all()
+    logs, total, next_cursor = paginate(
+        query, [AuditLog.created_at, AuditLog.id], True, page, size, cursor, include_total
+    )
     
     # Parse JSON strings back to dicts for response
     items = []
@@ -69,4 +74,4 @@ def list_audit_logs(
             created_at=log.created_at
         ))
     
-    return AuditListResponse(items=items, total=total)
+    return AuditListResponse(items=items, total=total, next_cursor=next_cursor)
@@ -3,13 +3,14 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.database import get_db
 from app.models.user import User, UserRole
 from app.schemas.user import Token, TokenRefresh, LoginRequest, UserResponse, UserCreate
 from app.services.auth import (
-    authenticate_user, create_access_token, create_refresh_token,
-    decode_token, get_user_by_id, hash_password
+    authenticate_user_async, create_access_token, create_refresh_token,
+    decode_token, get_user_by_id, hash_password, store_refresh_token
 )
 from app.api.deps import get_current_user, require_admin
 
@@ -17,11 +18,12 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/login", response_model=Token)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
+async def login(data: LoginRequest, db: Session = Depends(get_db)):
     """Authenticate user and return tokens."""
     # Note: Rate limiting should be configured at infrastructure level (nginx, API gateway)
     # or added via middleware in production
-    user = authenticate_user(db, data.email, data.password)
+    # bcrypt runs in a dedicated pool so a login burst cannot starve other endpoints
+    user = await authenticate_user_async(db, data.email, data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,8 +34,7 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
     refresh_token = create_refresh_token(user.id)
     
     # Store refresh token
-    user.refresh_token = refresh_token
-    db.commit()
+    await run_in_threadpool(store_refresh_token, db, user.id, refresh_token)
     
     return Token(access_token=access_token, refresh_token=refresh_token)
 
@@ -75,8 +76,11 @@ def get_me(current_user: User = Depends(get_current_user)):
 @router.post("/logout")
 def logout(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Logout user - invalidate refresh token."""
-    current_user.refresh_token = None
-    db.commit()
+    user = get_user_by_id(db, current_user.id)
+    # The cached user may outlive its row; a deleted user has no token to clear
+    if user is not None:
+        user.refresh_token = None
+        db.commit()
     return {"message": "Logged out successfully"}
 
 
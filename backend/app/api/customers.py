@@ -1,4 +1,5 @@
 """Customers API endpoints."""
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
@@ -8,9 +9,13 @@ from sqlalchemy import or_
 
 from app.database import get_db
 from app.models.customer import Customer
+from app.models.balance import PartyType
 from app.models.order import SalesOrder
 from app.schemas.customer import CustomerCreate, CustomerUpdate, CustomerResponse, CustomerListResponse
+from app.schemas.balance import BalanceAsOfResponse
+from app.pagination import paginate
 from app.api.deps import get_current_user
+from app.services.balances import balance_as_of
 from app.helpers import sanitize_like
 
 
@@ -21,6 +26,8 @@ router = APIRouter(prefix="/customers", tags=["customers"])
 def list_customers(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     search: Optional[str] = None,
     db: Session = Depends(get_db),
     _current_user = Depends(get_current_user)
@@ -38,9 +45,10 @@ def list_customers(
             )
         )
     
-    total = query.count()
-    items = query.offset((page - 1) * size).limit(size).all()
-    return CustomerListResponse(items=items, total=total)
+    items, total, next_cursor = paginate(
+        query, [Customer.code], False, page, size, cursor, include_total
+    )
+    return CustomerListResponse(items=items, total=total, next_cursor=next_cursor)
 
 
 @router.post("", response_model=CustomerResponse, status_code=status.HTTP_201_CREATED)
@@ -74,6 +82,21 @@ def get_customer(
     return customer
 
 
+@router.get("/{customer_id}/balance", response_model=BalanceAsOfResponse)
+def get_customer_balance(
+    customer_id: UUID,
+    at: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    _current_user = Depends(get_current_user)
+):
+    """Customer balance as of a timestamp (entries at `at` included); default now."""
+    at = at or datetime.utcnow()
+    balance = balance_as_of(db, PartyType.CUSTOMER, customer_id, at)
+    if balance is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return BalanceAsOfResponse(party_id=customer_id, at=at, balance=balance)
+
+
 @router.put("/{customer_id}", response_model=CustomerResponse)
 def update_customer(
     customer_id: UUID,
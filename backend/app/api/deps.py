@@ -8,7 +8,7 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.user import User, UserRole
-from app.services.auth import decode_token, get_user_by_id
+from app.services.auth import AuthenticatedUser, decode_token, get_authenticated_user
 
 
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -17,8 +17,12 @@ bearer_scheme = HTTPBearer(auto_error=False)
 def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
     db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT."""
+) -> AuthenticatedUser:
+    """Get current authenticated user from JWT.
+
+    Active users are served from a per-worker TTL cache, so most requests
+    do not query the users table.
+    """
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -36,8 +40,8 @@ def get_current_user(
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     
-    user = get_user_by_id(db, UUID(user_id))
-    if not user or not user.is_active:
+    user = get_authenticated_user(db, UUID(user_id))
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found or inactive")
     
     return user
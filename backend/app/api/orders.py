@@ -1,40 +1,118 @@
 """Orders API endpoints with proper transaction handling."""
+from collections import defaultdict
 from datetime import datetime
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from decimal import Decimal
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.database import get_db
 from app.models.customer import Customer
 from app.models.product import Product
-from app.models.order import SalesOrder, SalesOrderItem, OrderStatus, STATUS_TRANSITIONS
-from app.models.stock import StockMovement, MovementType
+from app.models.order import SalesOrder, SalesOrderItem, OrderStatus, STATUS_TRANSITIONS, REVENUE_STATUSES
+from app.models.payment import Payment, PaymentAllocation
+from app.models.stock import MovementType
+from app.models.balance import PartyType
 from app.models.user import User
 from app.schemas.order import (
     OrderCreate, OrderUpdate, OrderStatusUpdate, 
-    OrderResponse, OrderListResponse
+    OrderResponse, OrderListResponse,
+    OrderBatchCreate, OrderBatchResult, OrderBatchResponse,
+    OrderStatusBatchUpdate, OrderStatusBatchResult, OrderStatusBatchResponse
 )
+from app.schemas.payment import PaymentAllocationResponse
+from app.pagination import paginate
 from app.api.deps import get_current_user
-from app.services.audit import log_action
+from app.services.audit import log_action, log_actions
+from app.services import rollup
+from app.services.balances import BalanceChange, record_balance_changes
+from app.services.numbering import next_document_number, next_document_numbers
+from app.services.idempotency import idempotent_request, find_response, commit_response
+from app.services.inventory import StockChange, InsufficientStockError, apply_stock_changes
 
 logger = logging.getLogger("sme")
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
-def generate_order_number() -> str:
-    """Generate unique order number with microseconds to prevent collision."""
-    now = datetime.now()
-    return f"SO-{now.strftime('%Y%m%d%H%M%S%f')}"
+def generate_order_number(db: Session) -> str:
+    """Allocate a unique order number, e.g. SO-20260115-000123."""
+    return next_document_number(db, "order", "SO")
+
+
+def order_detail_query(db: Session):
+    """Query orders with everything OrderResponse reads, in two statements."""
+    return db.query(SalesOrder).options(
+        joinedload(SalesOrder.customer),
+        joinedload(SalesOrder.creator),
+        selectinload(SalesOrder.line_items).joinedload(SalesOrderItem.product),
+    )
+
+
+def load_order_detail(db: Session, order_id: UUID) -> SalesOrder:
+    """Reload an order (e.g. after commit) with its response graph."""
+    return order_detail_query(db).populate_existing().filter(SalesOrder.id == order_id).one()
+
+
+def line_items_error(line_items, products: dict) -> Optional[str]:
+    """Why an order's lines cannot be accepted, or None if they can."""
+    for item_data in line_items:
+        product = products.get(item_data.product_id)
+        if not product:
+            return f"Product {item_data.product_id} not found"
+        if not product.is_active:
+            return f"Product {product.sku} is inactive"
+    return None
+
+
+def line_total(item_data) -> Decimal:
+    return (item_data.unit_price * item_data.quantity) - item_data.discount
+
+
+def effect_sign(old_status: OrderStatus, new_status: OrderStatus) -> int:
+    """1 if the transition books stock and debt, -1 if it reverses them, else 0."""
+    if new_status == OrderStatus.CONFIRMED and old_status == OrderStatus.DRAFT:
+        return 1
+    if new_status == OrderStatus.CANCELLED and old_status == OrderStatus.CONFIRMED:
+        return -1
+    return 0
+
+
+def apply_order_effects(db: Session, orders: list[SalesOrder], sign: int, user_id: UUID):
+    """Book (sign=1) or reverse (sign=-1) orders' stock, customer debt and rollup.
+
+    Stock and debt are aggregated per product and per customer and written
+    with one set-based UPDATE each; debt changes are also appended to the
+    balance ledger. Raises InsufficientStockError when
+    booking would drive a product below zero.
+    """
+    if not orders or not sign:
+        return
+    prefix = "Order" if sign > 0 else "Cancelled order"
+    apply_stock_changes(db, [
+        StockChange(item.product_id, -sign * item.quantity, f"{prefix} {order.order_number}")
+        for order in orders for item in order.line_items
+    ], user_id, MovementType.OUT if sign > 0 else MovementType.IN)
+
+    # Confirmed orders are booked as negative customer balance
+    source = "order_confirm" if sign > 0 else "order_cancel"
+    record_balance_changes(db, [
+        BalanceChange(PartyType.CUSTOMER, order.customer_id, -sign * order.total, source, order.id)
+        for order in orders
+    ], user_id)
+
+    rollup.apply_orders(db, orders, sign)
 
 
 @router.get("", response_model=OrderListResponse)
 def list_orders(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     order_status: Optional[str] = None,
     customer_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
@@ -48,66 +126,76 @@ def list_orders(
     if customer_id:
         query = query.filter(SalesOrder.customer_id == customer_id)
     
-    query = query.order_by(SalesOrder.order_date.desc())
-    total = query.count()
-    items = query.offset((page - 1) * size).limit(size).all()
+    items, total, next_cursor = paginate(
+        query, [SalesOrder.order_date, SalesOrder.id], True, page, size, cursor, include_total
+    )
     
-    return OrderListResponse(items=items, total=total)
+    return OrderListResponse(items=items, total=total, next_cursor=next_cursor)
 
 
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order(
     data: OrderCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
     """Create a new order with proper transaction handling."""
     try:
+        # A retried request replays its first response
+        idempotent = idempotent_request(current_user.id, "orders", idempotency_key, data)
+        if idempotent:
+            replayed = find_response(db, idempotent)
+            if replayed:
+                return replayed
+        
         # Verify customer exists
         customer = db.query(Customer).filter(Customer.id == data.customer_id).first()
         if not customer:
             raise HTTPException(status_code=400, detail="Customer not found")
         
-        # Create order
+        # Create order with its line items (one query for all products)
         order = SalesOrder(
-            order_number=generate_order_number(),
+            order_number=generate_order_number(db),
             customer_id=data.customer_id,
             created_by=current_user.id,
             discount=data.discount,
             notes=data.notes
         )
-        db.add(order)
-        db.flush()
         
-        # Add line items
+        products = {
+            p.id: p for p in db.query(Product).filter(
+                Product.id.in_({item.product_id for item in data.line_items})
+            )
+        }
+        error = line_items_error(data.line_items, products)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
         for item_data in data.line_items:
-            product = db.query(Product).filter(Product.id == item_data.product_id).first()
-            if not product:
-                raise HTTPException(status_code=400, detail=f"Product {item_data.product_id} not found")
-            if not product.is_active:
-                raise HTTPException(status_code=400, detail=f"Product {product.sku} is inactive")
-            
-            line_item = SalesOrderItem(
-                order_id=order.id,
+            order.line_items.append(SalesOrderItem(
                 product_id=item_data.product_id,
                 quantity=item_data.quantity,
                 unit_price=item_data.unit_price,
-                cost_price=product.cost_price,
+                cost_price=products[item_data.product_id].cost_price,
                 discount=item_data.discount,
-                line_total=(item_data.unit_price * item_data.quantity) - item_data.discount
-            )
-            db.add(line_item)
+                line_total=line_total(item_data)
+            ))
         
-        db.flush()
         order.calculate_totals()
+        db.add(order)
+        db.flush()
         
         # Audit log
+        order_id = order.id
         log_action(db, "create", "order", order.id, current_user.id,
                    after_data={"order_number": order.order_number, "total": str(order.total)})
         
+        if idempotent:
+            body = OrderResponse.model_validate(load_order_detail(db, order_id)).model_dump_json()
+            return commit_response(db, idempotent, status.HTTP_201_CREATED, body)
+        
         db.commit()
-        db.refresh(order)
-        return order
+        return load_order_detail(db, order_id)
         
     except HTTPException:
         db.rollback()
@@ -118,6 +206,182 @@ def create_order(
         raise HTTPException(status_code=500, detail="Order creation failed")
 
 
+@router.post("/batch", response_model=OrderBatchResponse)
+def create_orders_batch(
+    data: OrderBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create many orders in one transaction; invalid orders are reported and skipped."""
+    try:
+        # One query each for all referenced customers and products
+        customer_ids = set(db.scalars(select(Customer.id).where(
+            Customer.id.in_({o.customer_id for o in data.orders})
+        )))
+        products = {
+            p.id: p for p in db.execute(
+                select(Product.id, Product.sku, Product.cost_price, Product.is_active).where(
+                    Product.id.in_({item.product_id for o in data.orders for item in o.line_items})
+                )
+            )
+        }
+
+        results, order_rows, item_rows = [], [], []
+        for index, order_data in enumerate(data.orders):
+            error = (
+                "Customer not found" if order_data.customer_id not in customer_ids
+                else line_items_error(order_data.line_items, products)
+            )
+            if error:
+                results.append(OrderBatchResult(index=index, success=False, error=error))
+                continue
+
+            order_id = uuid4()
+            lines = [
+                {
+                    "order_id": order_id,
+                    "product_id": item_data.product_id,
+                    "quantity": item_data.quantity,
+                    "unit_price": item_data.unit_price,
+                    "cost_price": products[item_data.product_id].cost_price,
+                    "discount": item_data.discount,
+                    "line_total": line_total(item_data),
+                }
+                for item_data in order_data.line_items
+            ]
+            subtotal = sum((line["line_total"] for line in lines), Decimal("0"))
+            order_rows.append({
+                "id": order_id,
+                "customer_id": order_data.customer_id,
+                "created_by": current_user.id,
+                "subtotal": subtotal,
+                "discount": order_data.discount,
+                "total": subtotal - order_data.discount,
+                "notes": order_data.notes,
+            })
+            item_rows.extend(lines)
+            results.append(OrderBatchResult(
+                index=index, success=True, order_id=order_id, total=order_rows[-1]["total"]
+            ))
+
+        if order_rows:
+            # One reservation for the whole batch, before the first write (see next_document_number)
+            numbers = next_document_numbers(db, "order", "SO", len(order_rows))
+            created = [result for result in results if result.success]
+            for row, result, number in zip(order_rows, created, numbers):
+                row["order_number"] = result.order_number = number
+            db.execute(insert(SalesOrder), order_rows)
+            if item_rows:
+                db.execute(insert(SalesOrderItem), item_rows)
+            log_actions(db, "create", "order", current_user.id, [
+                (row["id"], None, {"order_number": row["order_number"], "total": str(row["total"])})
+                for row in order_rows
+            ])
+            db.commit()
+
+        return OrderBatchResponse(
+            created=len(order_rows), failed=len(results) - len(order_rows), results=results
+        )
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Batch order creation failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Batch order creation failed")
+
+
+@router.post("/status/batch", response_model=OrderStatusBatchResponse)
+def update_orders_status_batch(
+    data: OrderStatusBatchUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Move many orders to one status in a single transaction.
+
+    Orders that cannot make the transition (or, on confirm, whose stock is
+    short after the earlier orders in the list) are reported and skipped.
+    """
+    try:
+        new_status = OrderStatus(data.status)
+        orders = {
+            o.id: o for o in db.query(SalesOrder).options(selectinload(SalesOrder.line_items)).filter(
+                SalesOrder.id.in_(set(data.order_ids)),
+                SalesOrder.deleted_at == None
+            ).with_for_update(of=SalesOrder)
+        }
+
+        # On confirm, check stock up front so a short order fails alone
+        remaining, skus = {}, {}
+        if new_status == OrderStatus.CONFIRMED:
+            for row in db.query(Product.id, Product.sku, Product.current_stock).filter(
+                Product.id.in_({
+                    item.product_id for o in orders.values()
+                    if o.status == OrderStatus.DRAFT for item in o.line_items
+                })
+            ).order_by(Product.id).with_for_update():
+                remaining[row.id], skus[row.id] = row.current_stock, row.sku
+
+        results, accepted, seen = [], [], set()
+        for index, order_id in enumerate(data.order_ids):
+            order = orders.get(order_id)
+            error = None
+            if order_id in seen:
+                error = "Duplicate order"
+            elif order is None:
+                error = "Order not found"
+            elif not order.can_transition_to(new_status):
+                error = f"Cannot transition from {order.status.value} to {new_status.value}"
+            elif effect_sign(order.status, new_status) > 0:
+                needed = defaultdict(int)
+                for item in order.line_items:
+                    needed[item.product_id] += item.quantity
+                short = next((pid for pid, qty in needed.items() if remaining[pid] < qty), None)
+                if short is not None:
+                    error = f"Insufficient stock for {skus[short]}"
+                else:
+                    for pid, qty in needed.items():
+                        remaining[pid] -= qty
+
+            seen.add(order_id)
+            results.append(OrderStatusBatchResult(
+                index=index, order_id=order_id, success=error is None, error=error
+            ))
+            if error is None:
+                accepted.append(order)
+
+        if accepted:
+            for sign in (1, -1):
+                try:
+                    apply_order_effects(db, [
+                        o for o in accepted if effect_sign(o.status, new_status) == sign
+                    ], sign, current_user.id)
+                except InsufficientStockError as e:
+                    raise HTTPException(status_code=400, detail=f"Insufficient stock for {e.sku}")
+
+            db.query(SalesOrder).filter(SalesOrder.id.in_([o.id for o in accepted])).update(
+                {SalesOrder.status: new_status}, synchronize_session=False
+            )
+            log_actions(db, "status_change", "order", current_user.id, [
+                (o.id, {"status": o.status.value}, {"status": new_status.value}) for o in accepted
+            ])
+            db.commit()
+
+        return OrderStatusBatchResponse(
+            status=new_status.value, updated=len(accepted),
+            failed=len(results) - len(accepted), results=results
+        )
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Batch status update failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Batch status update failed")
+
+
 @router.get("/{order_id}", response_model=OrderResponse)
 def get_order(
     order_id: UUID,
@@ -125,7 +389,7 @@ def get_order(
     _current_user = Depends(get_current_user)
 ):
     """Get a single order with line items."""
-    order = db.query(SalesOrder).filter(
+    order = order_detail_query(db).filter(
         SalesOrder.id == order_id,
         SalesOrder.deleted_at == None
     ).first()
@@ -134,6 +398,26 @@ def get_order(
     return order
 
 
+@router.get("/{order_id}/payments", response_model=list[PaymentAllocationResponse])
+def get_order_payments(
+    order_id: UUID,
+    db: Session = Depends(get_db),
+    _current_user = Depends(get_current_user)
+):
+    """Payments applied to an order, oldest first."""
+    if not db.scalar(select(SalesOrder.id).where(SalesOrder.id == order_id, SalesOrder.deleted_at == None)):
+        raise HTTPException(status_code=404, detail="Order not found")
+    rows = db.execute(
+        select(
+            PaymentAllocation.payment_id, Payment.payment_number, PaymentAllocation.order_id,
+            PaymentAllocation.amount, PaymentAllocation.created_at
+        ).join(Payment, Payment.id == PaymentAllocation.payment_id).where(
+            PaymentAllocation.order_id == order_id
+        ).order_by(PaymentAllocation.created_at, Payment.payment_number)
+    )
+    return [PaymentAllocationResponse(**row._mapping) for row in rows]
+
+
 @router.put("/{order_id}/status", response_model=OrderResponse)
 def update_order_status(
     order_id: UUID,
@@ -143,7 +427,7 @@ def update_order_status(
 ):
     """Update order status with workflow validation and transaction handling."""
     try:
-        order = db.query(SalesOrder).filter(
+        order = db.query(SalesOrder).options(selectinload(SalesOrder.line_items)).filter(
             SalesOrder.id == order_id,
             SalesOrder.deleted_at == None
         ).first()
@@ -159,60 +443,21 @@ def update_order_status(
                 detail=f"Cannot transition from {order.status.value} to {new_status.value}"
             )
         
-        # Handle stock changes and debt updates
-        if new_status == OrderStatus.CONFIRMED and order.status == OrderStatus.DRAFT:
-            # Deduct stock on confirm
-            for item in order.line_items:
-                product = db.query(Product).filter(Product.id == item.product_id).first()
-                if product.current_stock < item.quantity:
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Insufficient stock for {product.sku}"
-                    )
-                
-                stock_before = product.current_stock
-                product.current_stock -= item.quantity
-                
-                movement = StockMovement(
-                    product_id=product.id,
-                    created_by=current_user.id,
-                    type=MovementType.OUT,
-                    quantity=item.quantity,
-                    stock_before=stock_before,
-                    stock_after=product.current_stock,
-                    reason=f"Order {order.order_number}"
-                )
-                db.add(movement)
-            
-            # Update Customer Debt (Decrease/Negative for debt creation)
-            customer = db.query(Customer).filter(Customer.id == order.customer_id).first()
-            if customer:
-                customer.total_debt -= order.total
-
-        elif new_status == OrderStatus.CANCELLED and order.status == OrderStatus.CONFIRMED:
-            # Restore stock on cancel
-            for item in order.line_items:
-                product = db.query(Product).filter(Product.id == item.product_id).first()
-                stock_before = product.current_stock
-                product.current_stock += item.quantity
-                
-                movement = StockMovement(
-                    product_id=product.id,
-                    created_by=current_user.id,
-                    type=MovementType.IN,
-                    quantity=item.quantity,
-                    stock_before=stock_before,
-                    stock_after=product.current_stock,
-                    reason=f"Cancelled order {order.order_number}"
-                )
-                db.add(movement)
-
-            # Revert Customer Debt (Increase/Back towards zero)
-            customer = db.query(Customer).filter(Customer.id == order.customer_id).first()
-            if customer:
-                customer.total_debt += order.total
+        # Claim the transition only if the status is still the one checked above, so
+        # a concurrent change of the same order cannot apply its effects twice
+        sign = effect_sign(order.status, new_status)
+        claimed = db.execute(
+            update(SalesOrder).where(SalesOrder.id == order.id, SalesOrder.status == order.status)
+            .values(status=new_status)
+        ).rowcount
+        if not claimed:
+            raise HTTPException(status_code=409, detail="Order status was changed concurrently")
         
-        order.status = new_status
+        # Handle stock changes and debt updates (atomic, fails if any line is short)
+        try:
+            apply_order_effects(db, [order], sign, current_user.id)
+        except InsufficientStockError as e:
+            raise HTTPException(status_code=400, detail=f"Insufficient stock for {e.sku}")
         
         # Audit log for status change
         log_action(db, "status_change", "order", order.id, current_user.id,
@@ -220,8 +465,7 @@ def update_order_status(
                    after_data={"status": new_status.value})
         
         db.commit()
-        db.refresh(order)
-        return order
+        return load_order_detail(db, order_id)
         
     except HTTPException:
         db.rollback()
@@ -246,6 +490,10 @@ def delete_order(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    # Deleted orders drop out of reports
+    if order.status in REVENUE_STATUSES:
+        rollup.apply_order(db, order, -1)
+    
     order.deleted_at = datetime.utcnow()
     db.commit()
     return None
@@ -1,40 +1,61 @@
 """Payments API endpoints."""
-from datetime import datetime
+from decimal import Decimal
 from typing import Optional
 from uuid import UUID
-from decimal import Decimal
+import csv
+import io
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.database import get_db
-from app.models.customer import Customer
-from app.models.supplier import Supplier
-from app.models.order import SalesOrder
 from app.models.payment import Payment, PaymentType, PaymentMethod
 from app.models.user import User
+from app.models.balance import PartyType
 from app.schemas.payment import (
-    PaymentCreate, PaymentUpdate, PaymentResponse, PaymentListResponse, ARAPSummary
+    PaymentCreate, PaymentUpdate, PaymentResponse, PaymentListResponse, ARAPSummary,
+    BankMatchedLine, BankReviewLine, BankImportResponse
 )
+from app.pagination import paginate
 from app.api.deps import get_current_user
+from app.services.allocation import allocate_payment, release_payment
+from app.services.balances import BalanceChange, record_balance_changes
+from app.services.bank_import import StatementFormatError, import_statement
+from app.services.reports import get_arap
+from app.services.numbering import next_document_number
+from app.services.idempotency import idempotent_request, find_response, commit_response
 
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 logger = logging.getLogger("sme")
 
 
-def generate_payment_number() -> str:
-    """Generate unique payment number."""
-    now = datetime.now()
-    return f"PAY-{now.strftime('%Y%m%d%H%M%S')}"
+def generate_payment_number(db: Session) -> str:
+    """Allocate a unique payment number, e.g. PAY-20260115-000123."""
+    return next_document_number(db, "payment", "PAY")
+
+
+def payment_balance_changes(payment: Payment, sign: int) -> list[BalanceChange]:
+    """Debt/payable effect of recording (sign=1) or deleting (sign=-1) a payment."""
+    source = "payment" if sign > 0 else "payment_delete"
+    if payment.type == PaymentType.INCOMING and payment.customer_id:
+        # Settlements ADD to settle negative debt, others SUBTRACT to create it
+        amount = payment.amount if payment.is_settlement else -payment.amount
+        return [BalanceChange(PartyType.CUSTOMER, payment.customer_id, sign * amount, source, payment.id)]
+    if payment.type == PaymentType.OUTGOING and payment.supplier_id:
+        # Settlements SUBTRACT to settle positive payable, others ADD to create it
+        amount = -payment.amount if payment.is_settlement else payment.amount
+        return [BalanceChange(PartyType.SUPPLIER, payment.supplier_id, sign * amount, source, payment.id)]
+    return []
 
 
 @router.get("", response_model=PaymentListResponse)
 def list_payments(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     payment_type: Optional[str] = None,
     customer_id: Optional[UUID] = None,
     supplier_id: Optional[UUID] = None,
@@ -51,18 +72,19 @@ def list_payments(
     if supplier_id:
         query = query.filter(Payment.supplier_id == supplier_id)
     
-    query = query.order_by(Payment.payment_date.desc())
-    total = query.count()
-    items = query.offset((page - 1) * size).limit(size).all()
+    items, total, next_cursor = paginate(
+        query, [Payment.payment_date, Payment.id], True, page, size, cursor, include_total
+    )
     
-    return PaymentListResponse(items=items, total=total)
+    return PaymentListResponse(items=items, total=total, next_cursor=next_cursor)
 
 
 @router.post("", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
 def create_payment(
     data: PaymentCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
     """Create a payment and update debts."""
     # Validate based on type
@@ -71,8 +93,15 @@ def create_payment(
     if data.type == "outgoing" and not data.supplier_id:
         raise HTTPException(status_code=400, detail="Supplier ID required for outgoing payment")
     
+    # A retried request replays its first response
+    idempotent = idempotent_request(current_user.id, "payments", idempotency_key, data)
+    if idempotent:
+        replayed = find_response(db, idempotent)
+        if replayed:
+            return replayed
+    
     payment = Payment(
-        payment_number=generate_payment_number(),
+        payment_number=generate_payment_number(db),
         type=PaymentType(data.type),
         method=PaymentMethod(data.method),
         customer_id=data.customer_id,
@@ -84,65 +113,73 @@ def create_payment(
         notes=data.notes
     )
     db.add(payment)
+    db.flush()
+    record_balance_changes(db, payment_balance_changes(payment, 1), current_user.id)
     
-    # Update customer debt
-    if data.type == "incoming" and data.customer_id:
-        customer = db.query(Customer).filter(Customer.id == data.customer_id).first()
-        if customer:
-            if data.is_settlement:
-                customer.total_debt += data.amount  # ADD to settle negative debt
-            else:
-                customer.total_debt -= data.amount  # SUBTRACT to create negative debt
-    
-    # Update order paid_amount if linked
-    if data.order_id:
-        order = db.query(SalesOrder).filter(SalesOrder.id == data.order_id).first()
-        if order:
-            order.paid_amount += data.amount
+    # Pay off the linked order, or the customer's oldest open orders
+    allocate_payment(db, payment)
     
-    # Update supplier payable
-    if data.type == "outgoing" and data.supplier_id:
-        supplier = db.query(Supplier).filter(Supplier.id == data.supplier_id).first()
-        if supplier:
-            if data.is_settlement:
-                supplier.total_payable -= data.amount  # SUBTRACT to settle positive payable
-            else:
-                supplier.total_payable += data.amount  # ADD to create positive payable
+    if idempotent:
+        db.flush()
+        db.refresh(payment)
+        body = PaymentResponse.model_validate(payment).model_dump_json()
+        return commit_response(db, idempotent, status.HTTP_201_CREATED, body)
     
     db.commit()
     db.refresh(payment)
     return payment
 
 
+@router.post("/import", response_model=BankImportResponse)
+def import_bank_statement(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create payments for the bank statement lines matched to customers/orders.
+
+    The CSV needs date, amount and description columns; unmatched lines are
+    returned for review. With dry_run nothing is written.
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        result = import_statement(db, stream, current_user.id, dry_run)
+    except StatementFormatError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except (UnicodeDecodeError, csv.Error):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Statement must be a UTF-8 CSV file")
+    if result.payment_numbers:
+        db.commit()
+        logger.info(f"Bank statement import created {len(result.payment_numbers)} payments")
+    
+    numbers = result.payment_numbers or [None] * len(result.matched)
+    return BankImportResponse(
+        lines=result.lines,
+        matched_amount=sum((m.amount for m in result.matched), Decimal("0")),
+        payments_created=len(result.payment_numbers),
+        matched=[
+            BankMatchedLine(**m._asdict(), payment_number=number)
+            for m, number in zip(result.matched, numbers)
+        ],
+        review=[BankReviewLine(**r._asdict()) for r in result.review]
+    )
+
+
 @router.get("/ar-ap", response_model=ARAPSummary)
 def get_arap_summary(
     db: Session = Depends(get_db),
     _current_user = Depends(get_current_user)
 ):
     """Get accounts receivable/payable summary."""
-    # Total receivables (sum of all negative debts/payables)
-    c_receivables = db.query(func.coalesce(func.sum(Customer.total_debt), 0)).filter(Customer.total_debt < 0).scalar()
-    s_receivables = db.query(func.coalesce(func.sum(Supplier.total_payable), 0)).filter(Supplier.total_payable < 0).scalar()
-    receivables = Decimal(str(c_receivables or 0)) + Decimal(str(s_receivables or 0))
-    
-    c_debtor_count = db.query(Customer).filter(Customer.total_debt < 0).count()
-    s_debtor_count = db.query(Supplier).filter(Supplier.total_payable < 0).count()
-    customer_count = c_debtor_count + s_debtor_count
-    
-    # Total payables (sum of all positive debts/payables)
-    s_payables = db.query(func.coalesce(func.sum(Supplier.total_payable), 0)).filter(Supplier.total_payable > 0).scalar()
-    c_payables = db.query(func.coalesce(func.sum(Customer.total_debt), 0)).filter(Customer.total_debt > 0).scalar()
-    payables = Decimal(str(s_payables or 0)) + Decimal(str(c_payables or 0))
-    
-    s_creditor_count = db.query(Supplier).filter(Supplier.total_payable > 0).count()
-    c_creditor_count = db.query(Customer).filter(Customer.total_debt > 0).count()
-    supplier_count = s_creditor_count + c_creditor_count
-    
+    arap = get_arap(db)
     return ARAPSummary(
-        total_receivables=receivables,
-        customer_count=customer_count,
-        total_payables=payables,
-        supplier_count=supplier_count
+        total_receivables=arap.receivables,
+        customer_count=arap.debtor_count,
+        total_payables=arap.payables,
+        supplier_count=arap.creditor_count
     )
 
 
@@ -163,36 +200,15 @@ def get_payment(
 def delete_payment(
     payment_id: UUID,
     db: Session = Depends(get_db),
-    _current_user = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Delete a payment and reverse debt/payable changes."""
     payment = db.query(Payment).filter(Payment.id == payment_id).first()
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     
-    # Reverse customer debt
-    if str(payment.type) == "incoming" and payment.customer_id:
-        customer = db.query(Customer).filter(Customer.id == payment.customer_id).first()
-        if customer:
-            if payment.is_settlement:
-                customer.total_debt -= payment.amount
-            else:
-                customer.total_debt += payment.amount
-    
-    # Reverse order paid_amount if linked
-    if payment.order_id:
-        order = db.query(SalesOrder).filter(SalesOrder.id == payment.order_id).first()
-        if order:
-            order.paid_amount -= payment.amount
-    
-    # Reverse supplier payable
-    if str(payment.type) == "outgoing" and payment.supplier_id:
-        supplier = db.query(Supplier).filter(Supplier.id == payment.supplier_id).first()
-        if supplier:
-            if payment.is_settlement:
-                supplier.total_payable += payment.amount
-            else:
-                supplier.total_payable -= payment.amount
+    record_balance_changes(db, payment_balance_changes(payment, -1), current_user.id)
+    release_payment(db, payment)
     
     db.delete(payment)
     db.commit()
@@ -12,6 +12,7 @@ from app.schemas.product import (
     ProductCreate, ProductUpdate, ProductResponse, 
     ProductListResponse, LowStockProduct
 )
+from app.pagination import paginate
 from app.api.deps import get_current_user
 from app.helpers import sanitize_like
 
@@ -23,6 +24,8 @@ router = APIRouter(prefix="/products", tags=["products"])
 def list_products(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     search: Optional[str] = None,
     category: Optional[str] = None,
     active_only: bool = True,
@@ -44,10 +47,11 @@ def list_products(
     if category:
         query = query.filter(Product.category == category)
     
-    total = query.count()
-    items = query.offset((page - 1) * size).limit(size).all()
+    items, total, next_cursor = paginate(
+        query, [Product.sku], False, page, size, cursor, include_total
+    )
     
-    return ProductListResponse(items=items, total=total)
+    return ProductListResponse(items=items, total=total, next_cursor=next_cursor)
 
 
 @router.get("/low-stock", response_model=list[LowStockProduct])
@@ -1,4 +1,5 @@
 """Stock movements API endpoints."""
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
@@ -6,14 +7,22 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.product import Product
 from app.models.stock import StockMovement, MovementType
 from app.models.user import User
 from app.schemas.stock import (
     StockInCreate, StockOutCreate, StockAdjustCreate,
-    StockMovementResponse, StockMovementListResponse
+    StockMovementResponse, StockMovementListResponse,
+    StockInBatchCreate, StockInBatchResponse, StockAsOfItem, StockAsOfResponse
 )
+from app.pagination import paginate
 from app.api.deps import get_current_user
+from app.services.inventory import (
+    StockChange, ProductNotFoundError, InsufficientStockError, apply_stock_changes
+)
+from app.services.stock_ledger import stock_as_of
+
+# Products per as-of request
+AS_OF_MAX_PRODUCTS = 500
 
 
 router = APIRouter(prefix="/stock", tags=["stock"])
@@ -23,20 +32,68 @@ router = APIRouter(prefix="/stock", tags=["stock"])
 def list_movements(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     product_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
     _current_user = Depends(get_current_user)
 ):
     """List stock movements with pagination."""
-    query = db.query(StockMovement).order_by(StockMovement.created_at.desc())
+    query = db.query(StockMovement)
     
     if product_id:
         query = query.filter(StockMovement.product_id == product_id)
     
-    total = query.count()
-    items = query.offset((page - 1) * size).limit(size).all()
+    items, total, next_cursor = paginate(
+        query, [StockMovement.created_at, StockMovement.id], True, page, size, cursor, include_total
+    )
     
-    return StockMovementListResponse(items=items, total=total)
+    return StockMovementListResponse(items=items, total=total, next_cursor=next_cursor)
+
+
+@router.get("/as-of", response_model=StockAsOfResponse)
+def get_stock_as_of(
+    at: datetime,
+    product_id: list[UUID] = Query(...),
+    db: Session = Depends(get_db),
+    _current_user = Depends(get_current_user)
+):
+    """Stock of one or many products as of a timestamp (movements at `at` included)."""
+    product_ids = list(dict.fromkeys(product_id))
+    if len(product_ids) > AS_OF_MAX_PRODUCTS:
+        raise HTTPException(status_code=400, detail=f"At most {AS_OF_MAX_PRODUCTS} products per request")
+    
+    stock = stock_as_of(db, product_ids, at)
+    for pid in product_ids:
+        if pid not in stock:
+            raise HTTPException(status_code=404, detail=f"Product {pid} not found")
+    
+    return StockAsOfResponse(
+        at=at, items=[StockAsOfItem(product_id=pid, stock=stock[pid]) for pid in product_ids]
+    )
+
+
+def record_movement(
+    db: Session,
+    change: StockChange,
+    user_id: UUID,
+    movement_type: MovementType,
+    insufficient_detail: str
+) -> StockMovementResponse:
+    """Apply one stock change atomically, commit and return its movement."""
+    try:
+        [movement] = apply_stock_changes(db, [change], user_id, movement_type)
+    except ProductNotFoundError:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Product not found")
+    except InsufficientStockError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=insufficient_detail)
+    
+    # Serialize before commit so the response needs no reload
+    response = StockMovementResponse.model_validate(movement)
+    db.commit()
+    return response
 
 
 @router.post("/in", response_model=StockMovementResponse, status_code=status.HTTP_201_CREATED)
@@ -46,26 +103,41 @@ def stock_in(
     current_user: User = Depends(get_current_user)
 ):
     """Record stock in (receiving)."""
-    product = db.query(Product).filter(Product.id == data.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    return record_movement(
+        db, StockChange(data.product_id, data.quantity, data.reason),
+        current_user.id, MovementType.IN, "Insufficient stock"
+    )
+
+
+@router.post("/in/batch", response_model=StockInBatchResponse, status_code=status.HTTP_201_CREATED)
+def stock_in_batch(
+    data: StockInBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Receive a whole delivery in one transaction, one movement per product."""
+    # Repeated lines of a product become one movement
+    quantities, reasons = {}, {}
+    for line in data.lines:
+        quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+        if line.reason and line.reason not in reasons.setdefault(line.product_id, []):
+            reasons[line.product_id].append(line.reason)
     
-    stock_before = product.current_stock
-    product.current_stock += data.quantity
+    try:
+        movements = apply_stock_changes(db, [
+            StockChange(pid, quantity, "; ".join(reasons.get(pid, [])) or None)
+            for pid, quantity in quantities.items()
+        ], current_user.id, MovementType.IN)
+    except ProductNotFoundError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=f"Product {e.product_id} not found")
     
-    movement = StockMovement(
-        product_id=product.id,
-        created_by=current_user.id,
-        type=MovementType.IN,
-        quantity=data.quantity,
-        stock_before=stock_before,
-        stock_after=product.current_stock,
-        reason=data.reason
+    response = StockInBatchResponse(
+        items=[StockMovementResponse.model_validate(m) for m in movements],
+        total_quantity=sum(quantities.values())
     )
-    db.add(movement)
     db.commit()
-    db.refresh(movement)
-    return movement
+    return response
 
 
 @router.post("/out", response_model=StockMovementResponse, status_code=status.HTTP_201_CREATED)
@@ -75,29 +147,10 @@ def stock_out(
     current_user: User = Depends(get_current_user)
 ):
     """Record stock out."""
-    product = db.query(Product).filter(Product.id == data.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    if product.current_stock < data.quantity:
-        raise HTTPException(status_code=400, detail="Insufficient stock")
-    
-    stock_before = product.current_stock
-    product.current_stock -= data.quantity
-    
-    movement = StockMovement(
-        product_id=product.id,
-        created_by=current_user.id,
-        type=MovementType.OUT,
-        quantity=data.quantity,
-        stock_before=stock_before,
-        stock_after=product.current_stock,
-        reason=data.reason
+    return record_movement(
+        db, StockChange(data.product_id, -data.quantity, data.reason),
+        current_user.id, MovementType.OUT, "Insufficient stock"
     )
-    db.add(movement)
-    db.commit()
-    db.refresh(movement)
-    return movement
 
 
 @router.post("/adjust", response_model=StockMovementResponse, status_code=status.HTTP_201_CREATED)
@@ -107,26 +160,7 @@ def stock_adjust(
     current_user: User = Depends(get_current_user)
 ):
     """Adjust stock (can be positive or negative)."""
-    product = db.query(Product).filter(Product.id == data.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    if product.current_stock + data.quantity < 0:
-        raise HTTPException(status_code=400, detail="Adjustment would result in negative stock")
-    
-    stock_before = product.current_stock
-    product.current_stock += data.quantity
-    
-    movement = StockMovement(
-        product_id=product.id,
-        created_by=current_user.id,
-        type=MovementType.ADJUST,
-        quantity=data.quantity,
-        stock_before=stock_before,
-        stock_after=product.current_stock,
-        reason=data.reason
+    return record_movement(
+        db, StockChange(data.product_id, data.quantity, data.reason),
+        current_user.id, MovementType.ADJUST, "Adjustment would result in negative stock"
     )
-    db.add(movement)
-    db.commit()
-    db.refresh(movement)
-    return movement
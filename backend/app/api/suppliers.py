@@ -1,4 +1,5 @@
 """Suppliers API endpoints."""
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
@@ -8,8 +9,12 @@ from sqlalchemy import or_
 
 from app.database import get_db
 from app.models.supplier import Supplier
+from app.models.balance import PartyType
 from app.schemas.supplier import SupplierCreate, SupplierUpdate, SupplierResponse, SupplierListResponse
+from app.schemas.balance import BalanceAsOfResponse
+from app.pagination import paginate
 from app.api.deps import get_current_user
+from app.services.balances import balance_as_of
 
 
 router = APIRouter(prefix="/suppliers", tags=["suppliers"])
@@ -19,6 +24,8 @@ router = APIRouter(prefix="/suppliers", tags=["suppliers"])
 def list_suppliers(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     search: Optional[str] = None,
     db: Session = Depends(get_db),
     _current_user = Depends(get_current_user)
@@ -36,9 +43,10 @@ def list_suppliers(
             )
         )
     
-    total = query.count()
-    items = query.offset((page - 1) * size).limit(size).all()
-    return SupplierListResponse(items=items, total=total)
+    items, total, next_cursor = paginate(
+        query, [Supplier.code], False, page, size, cursor, include_total
+    )
+    return SupplierListResponse(items=items, total=total, next_cursor=next_cursor)
 
 
 @router.post("", response_model=SupplierResponse, status_code=status.HTTP_201_CREATED)
@@ -72,6 +80,21 @@ def get_supplier(
     return supplier
 
 
+@router.get("/{supplier_id}/balance", response_model=BalanceAsOfResponse)
+def get_supplier_balance(
+    supplier_id: UUID,
+    at: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    _current_user = Depends(get_current_user)
+):
+    """Supplier balance as of a timestamp (entries at `at` included); default now."""
+    at = at or datetime.utcnow()
+    balance = balance_as_of(db, PartyType.SUPPLIER, supplier_id, at)
+    if balance is None:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+    return BalanceAsOfResponse(party_id=supplier_id, at=at, balance=balance)
+
+
 @router.put("/{supplier_id}", response_model=SupplierResponse)
 def update_supplier(
     supplier_id: UUID,
@@ -0,0 +1,60 @@
+"""
+Incremental ledger checkpoint job.
+Run: python -m app.checkpoints [--ledger stock|balance]   (e.g. daily from cron)
+
+Adds a checkpoint per product (stock) and per customer and supplier
+(balance) for every month boundary closed since the last run, so as-of-date
+queries scan at most about a month of ledger rows. Balance entries whose
+deferred column update never ran (e.g. the process died right after
+commit) are applied first.
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.services.balances import apply_pending_balances, build_balance_checkpoints
+from app.services.stock_ledger import build_checkpoints
+
+# --ledger name -> (label, build function)
+LEDGERS = {
+    "stock": ("Stock", build_checkpoints),
+    "balance": ("Balance", build_balance_checkpoints),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build ledger checkpoints for closed months.")
+    parser.add_argument("--ledger", choices=sorted(LEDGERS), default=None, help="default: all ledgers")
+    parser.add_argument("--database-url", default=None, help="default: the configured database")
+    args = parser.parse_args()
+
+    from app.config import settings
+    engine = create_engine(args.database_url or settings.DATABASE_URL)
+    try:
+        with Session(engine) as db:
+            if args.ledger in (None, "balance"):
+                applied = apply_pending_balances(db)
+                db.commit()
+                if applied:
+                    print(f"✅ Applied {applied} pending balance entries")
+
+            for name in [args.ledger] if args.ledger else LEDGERS:
+                label, build = LEDGERS[name]
+                started = time.perf_counter()
+                boundaries = build(db)
+                db.commit()
+                elapsed = time.perf_counter() - started
+                if not boundaries:
+                    print(f"✅ {label} checkpoints are up to date")
+                    continue
+                print(f"✅ Built {len(boundaries)} {name} checkpoint(s) in {elapsed:.1f}s")
+                for boundary in sorted(boundaries):
+                    print(f"   {boundary:%Y-%m-%d}")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """Application configuration with validation."""
 import os
 from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from pydantic_settings import BaseSettings
 from pydantic import Field, field_validator
 
@@ -23,6 +24,24 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30)
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=7)
     
+    # Threads per worker dedicated to bcrypt hashing/verification
+    PASSWORD_HASH_WORKERS: int = Field(default=2)
+    
+    # Per-worker cache of authenticated users
+    USER_CACHE_TTL_SECONDS: int = Field(default=60)
+    
+    # Per-worker cache of the AR/AP summary (also evicted on balance changes)
+    ARAP_CACHE_TTL_SECONDS: int = Field(default=30)
+    
+    # Per-worker cache of the receivables aging report (keyed by business day)
+    AR_AGING_CACHE_TTL_SECONDS: int = Field(default=300)
+    
+    # IANA zone whose calendar days reports are bucketed by (business_date)
+    SHOP_TIMEZONE: str = Field(default="UTC")
+    
+    # Stored responses for Idempotency-Key retries
+    IDEMPOTENCY_KEY_TTL_HOURS: int = Field(default=24)
+    
     # CORS
     CORS_ORIGINS: str = Field(default="http://localhost:5173")
     
@@ -41,6 +60,15 @@ class Settings(BaseSettings):
             raise ValueError("JWT_SECRET_KEY must be at least 32 characters")
         return v
     
+    @field_validator("SHOP_TIMEZONE")
+    @classmethod
+    def validate_shop_timezone(cls, v: str) -> str:
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"SHOP_TIMEZONE {v!r} is not a known time zone")
+        return v
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
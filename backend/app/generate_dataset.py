@@ -0,0 +1,436 @@
+"""
+Deterministic large-scale dataset generator for load testing.
+Run: python -m app.generate_dataset --orders 10000000 --workers 8
+
+The same seed and sizes always produce the same rows. Data is split into
+shards that each own a slice of products, customers, suppliers and orders,
+so a shard can keep its stock chains and balances consistent on its own and
+shards can be written by parallel worker processes. Every balance change is
+also written as an (applied) balance ledger entry, and timestamps are UTC.
+Rows are written with COPY on PostgreSQL and executemany elsewhere.
+"""
+import argparse
+import csv
+import io
+import random
+import time
+import uuid
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from decimal import Decimal
+from multiprocessing import get_context
+from typing import NamedTuple, Optional
+
+from sqlalchemy import bindparam, create_engine, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.helpers import business_date
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.models.order import SalesOrder, SalesOrderItem, OrderStatus, REVENUE_STATUSES
+from app.models.payment import Payment, PaymentType, PaymentMethod, PaymentAllocation
+from app.models.stock import StockMovement, MovementType
+from app.models.balance import BalanceEntry, PartyType
+from app.services.auth import hash_password
+from app.services.balances import BALANCE_COLUMNS
+from app.services.rollup import rebuild_sales_rollup
+
+
+NAMESPACE = uuid.UUID("6f1c1a52-3b1e-4a43-9a55-2b7e4f0d8c11")
+PASSWORD = "LoadTest123!"
+CATEGORIES = ["Electrical", "Plumbing", "Tools", "Paint", "Hardware", "Garden", "Lighting", "Safety"]
+UNITS = ["pcs", "set", "box", "m", "kg"]
+METHODS = [PaymentMethod.CASH, PaymentMethod.BANK, PaymentMethod.BANK, PaymentMethod.OTHER]
+STATUS_WEIGHTS = [
+    (OrderStatus.DRAFT, 3),
+    (OrderStatus.CANCELLED, 5),
+    (OrderStatus.CONFIRMED, 10),
+    (OrderStatus.SHIPPED, 12),
+    (OrderStatus.COMPLETED, 70),
+]
+
+# Tables in foreign-key order; buffered rows are always written in this order
+TABLES = [
+    Product.__table__, Customer.__table__, Supplier.__table__, SalesOrder.__table__,
+    SalesOrderItem.__table__, Payment.__table__, PaymentAllocation.__table__, StockMovement.__table__,
+    BalanceEntry.__table__,
+]
+
+
+class DatasetSpec(NamedTuple):
+    """Sizes and seed of a generated dataset; equal specs give equal data."""
+    products: int = 100_000
+    customers: int = 500_000
+    suppliers: int = 2_000
+    orders: int = 10_000_000
+    days: int = 365
+    end_date: Optional[date] = None
+    seed: int = 42
+    shards: int = 32
+
+    def validate(self):
+        if min(self.products, self.customers, self.suppliers) < self.shards:
+            raise ValueError("products, customers and suppliers must each be >= shards")
+        # Movements of consecutive orders in a shard need distinct timestamps
+        if self.days * 86_400_000_000 * self.shards / max(self.orders, 1) < 4:
+            raise ValueError("too many orders for the date range")
+
+
+class _BulkWriter:
+    """Buffers rows per table and writes them in foreign-key order."""
+
+    def __init__(self, engine: Engine, batch_rows: int):
+        self.engine = engine
+        self.batch_rows = batch_rows
+        self.buffers = {table: [] for table in TABLES}
+        self.pending = 0
+        self.written = {table.name: 0 for table in TABLES}
+
+    def add(self, table, row: dict):
+        self.buffers[table].append(row)
+        self.pending += 1
+
+    def flush_if_full(self):
+        """Flush once batch_rows are buffered.
+
+        Called between records, never inside one, so an order is written
+        in the same transaction as its items, payments and ledger rows.
+        """
+        if self.pending >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows in one transaction."""
+        if not self.pending:
+            return
+        with self.engine.begin() as conn:
+            for table in TABLES:
+                rows = self.buffers[table]
+                if not rows:
+                    continue
+                if conn.dialect.name == "postgresql":
+                    self._copy(conn, table, rows)
+                else:
+                    conn.execute(table.insert(), rows)
+                self.written[table.name] += len(rows)
+                self.buffers[table] = []
+        self.pending = 0
+
+    @staticmethod
+    def _copy(conn, table, rows: list[dict]):
+        """Stream rows through COPY, converting values like a normal INSERT would."""
+        columns = list(rows[0])
+        processors = [table.c[c].type.bind_processor(conn.dialect) for c in columns]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                None if row[c] is None else (p(row[c]) if p else row[c])
+                for c, p in zip(columns, processors)
+            ])
+        buffer.seek(0)
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _user_ids(spec: DatasetSpec) -> list[uuid.UUID]:
+    return [uuid.uuid5(NAMESPACE, f"{spec.seed}:user:{role.value}") for role in UserRole]
+
+
+def _start(spec: DatasetSpec) -> datetime:
+    end = spec.end_date or date.today()
+    return datetime.combine(end - timedelta(days=spec.days), dtime(), tzinfo=timezone.utc)
+
+
+def _generate_shard(url: str, spec: DatasetSpec, shard: int, batch_rows: int) -> dict:
+    """Generate and write one shard; returns rows written per table."""
+    engine = create_engine(url, connect_args={"timeout": 60} if url.startswith("sqlite") else {})
+    try:
+        return _ShardGenerator(engine, spec, shard, batch_rows).run()
+    finally:
+        engine.dispose()
+
+
+class _ShardGenerator:
+    """Generates one shard in chronological order, tracking stock and balances."""
+
+    def __init__(self, engine: Engine, spec: DatasetSpec, shard: int, batch_rows: int):
+        self.spec = spec
+        self.shard = shard
+        self.rng = random.Random(f"{spec.seed}:{shard}")
+        self.writer = _BulkWriter(engine, batch_rows)
+        self.users = _user_ids(spec)
+        self.start = _start(spec)
+        self.end = self.start + timedelta(days=spec.days)
+        self.payments = 0
+
+    def run(self) -> dict:
+        self._master_data()
+        span = self.end - self.start
+        for i in range(self.shard, self.spec.orders, self.spec.shards):
+            self._order(i, self.start + span * i / self.spec.orders)
+            self.writer.flush_if_full()
+        self.writer.flush()
+        self._write_balances()
+        return self.writer.written
+
+    def _owned(self, count: int) -> range:
+        return range(self.shard, count, self.spec.shards)
+
+    def _master_data(self):
+        rng, start = self.rng, self.start
+        self.products = []
+        for i in self._owned(self.spec.products):
+            cost = Decimal(rng.randrange(10, 2000) * 1000)
+            sell = (cost * Decimal(rng.uniform(1.2, 1.8))).quantize(Decimal("1000"))
+            product = {
+                "id": _uuid(rng), "sku": f"LT-{i:07d}", "name": f"Load test item {i}",
+                "category": rng.choice(CATEGORIES), "unit": rng.choice(UNITS),
+                "cost_price": cost, "sell_price": sell, "current_stock": 0,
+                "min_stock": rng.randint(5, 50), "is_active": True,
+                "created_at": start, "updated_at": start,
+            }
+            self.writer.add(Product.__table__, product)
+            self.writer.flush_if_full()
+            self.products.append(product)
+        self.stock = [0] * len(self.products)
+
+        self.customers = []
+        for i in self._owned(self.spec.customers):
+            customer = {
+                "id": _uuid(rng), "code": f"LT-KH{i:07d}", "name": f"Customer {i}",
+                "phone": f"09{rng.randrange(10 ** 8):08d}", "total_debt": Decimal("0"),
+                "created_at": start, "updated_at": start,
+            }
+            self.writer.add(Customer.__table__, customer)
+            self.writer.flush_if_full()
+            self.customers.append(customer)
+
+        self.suppliers = []
+        for i in self._owned(self.spec.suppliers):
+            supplier = {
+                "id": _uuid(rng), "code": f"LT-NCC{i:05d}", "name": f"Supplier {i}",
+                "phone": f"028{rng.randrange(10 ** 7):07d}", "total_payable": Decimal("0"),
+                "created_at": start, "updated_at": start,
+            }
+            self.writer.add(Supplier.__table__, supplier)
+            self.writer.flush_if_full()
+            self.suppliers.append(supplier)
+
+    def _balance(self, at: datetime, party_type: PartyType, party: dict, amount: Decimal,
+                 source_type: str, source_id: uuid.UUID):
+        """Change a customer's debt or a supplier's payable, with its ledger entry."""
+        party[BALANCE_COLUMNS[party_type][1]] += amount
+        self.writer.add(BalanceEntry.__table__, {
+            "id": _uuid(self.rng), "party_type": party_type, "party_id": party["id"], "amount": amount,
+            "source_type": source_type, "source_id": source_id,
+            "created_by": self.rng.choice(self.users), "created_at": at, "applied": True,
+        })
+
+    def _payment(self, at: datetime, amount: Decimal, **fields) -> uuid.UUID:
+        self.payments += 1
+        payment_id = _uuid(self.rng)
+        self.writer.add(Payment.__table__, {
+            "id": payment_id,
+            "payment_number": f"PAY-{at:%Y%m%d}-G{self.shard:03d}{self.payments:08d}",
+            "method": self.rng.choice(METHODS),
+            "created_by": self.rng.choice(self.users),
+            "amount": amount,
+            "customer_id": None, "supplier_id": None, "order_id": None, "notes": None,
+            "payment_date": at, "business_date": business_date(at), "created_at": at, "updated_at": at,
+            **fields,
+        })
+        if fields.get("order_id"):
+            self.writer.add(PaymentAllocation.__table__, {
+                "payment_id": payment_id, "order_id": fields["order_id"], "amount": amount, "created_at": at,
+            })
+        return payment_id
+
+    def _movement(self, at: datetime, index: int, movement_type: MovementType, delta: int, reason: str):
+        before = self.stock[index]
+        self.stock[index] = before + delta
+        self.writer.add(StockMovement.__table__, {
+            "id": _uuid(self.rng), "product_id": self.products[index]["id"],
+            "created_by": self.rng.choice(self.users), "type": movement_type,
+            "quantity": abs(delta), "stock_before": before, "stock_after": before + delta,
+            "reason": reason, "created_at": at, "business_date": business_date(at),
+        })
+
+    def _later(self, at: datetime, max_days: int) -> datetime:
+        return min(at + timedelta(minutes=self.rng.randint(5, max_days * 1440)), self.end)
+
+    def _restock(self, at: datetime, index: int, needed: int):
+        """Receive goods on credit from a supplier, usually paid later."""
+        rng = self.rng
+        quantity = needed + rng.randint(20, 200)
+        self._movement(at, index, MovementType.IN, quantity, "Goods receipt")
+
+        supplier = rng.choice(self.suppliers)
+        amount = Decimal(quantity) * self.products[index]["cost_price"]
+        payment_id = self._payment(at, amount, type=PaymentType.OUTGOING, supplier_id=supplier["id"],
+                                   is_settlement=False, notes="Purchase on credit")
+        self._balance(at, PartyType.SUPPLIER, supplier, amount, "payment", payment_id)
+        if rng.random() < 0.7:
+            paid_at = self._later(at, 30)
+            payment_id = self._payment(paid_at, amount, type=PaymentType.OUTGOING,
+                                       supplier_id=supplier["id"], is_settlement=True)
+            self._balance(paid_at, PartyType.SUPPLIER, supplier, -amount, "payment", payment_id)
+
+    def _order(self, i: int, at: datetime):
+        rng = self.rng
+        statuses, weights = zip(*STATUS_WEIGHTS)
+        status = rng.choices(statuses, weights)[0]
+        customer = rng.choice(self.customers)
+        order_id = _uuid(rng)
+        order_number = f"SO-{at:%Y%m%d}-G{i:09d}"
+
+        # Skewed product choice so a few SKUs are hot, as in real sales
+        count = len(self.products)
+        picks = sorted({int(count * rng.random() ** 2) for _ in range(rng.choice([1, 1, 2, 2, 3, 4, 5]))})
+        lines = []
+        for index in picks:
+            product = self.products[index]
+            quantity = rng.randint(1, 10)
+            lines.append((index, quantity, product["sell_price"] * quantity))
+            self.writer.add(SalesOrderItem.__table__, {
+                "id": _uuid(rng), "order_id": order_id, "product_id": product["id"],
+                "quantity": quantity, "unit_price": product["sell_price"],
+                "cost_price": product["cost_price"], "discount": Decimal("0"),
+                "line_total": product["sell_price"] * quantity,
+                "created_at": at, "updated_at": at,
+            })
+
+        subtotal = sum(line[2] for line in lines)
+        discount = (subtotal * Decimal("0.05")).quantize(Decimal("1000")) if rng.random() < 0.1 else Decimal("0")
+        total = subtotal - discount
+        paid = Decimal("0")
+
+        if status in REVENUE_STATUSES:
+            # Stock leaves on confirmation; receive goods first when short
+            for index, quantity, _ in lines:
+                if self.stock[index] < quantity:
+                    self._restock(at, index, quantity - self.stock[index])
+            out_at = at + timedelta(microseconds=1)
+            for index, quantity, _ in lines:
+                self._movement(out_at, index, MovementType.OUT, -quantity, f"Order {order_number}")
+            self._balance(at, PartyType.CUSTOMER, customer, -total, "order_confirm", order_id)
+
+            share = {
+                OrderStatus.COMPLETED: 1,
+                OrderStatus.SHIPPED: rng.choice([1, 1, 0.5, 0]),
+                OrderStatus.CONFIRMED: rng.choice([0.5, 0, 0, 0, 0]),
+            }[status]
+            amount = (total * Decimal(share)).quantize(Decimal("1"))
+            installments = [amount] if share < 1 or rng.random() < 0.8 else [amount // 2, amount - amount // 2]
+            for installment in installments:
+                if installment <= 0:
+                    continue
+                paid_at = self._later(at, 7)
+                payment_id = self._payment(paid_at, installment, type=PaymentType.INCOMING,
+                                           customer_id=customer["id"], order_id=order_id, is_settlement=True)
+                self._balance(paid_at, PartyType.CUSTOMER, customer, installment, "payment", payment_id)
+                paid += installment
+
+        self.writer.add(SalesOrder.__table__, {
+            "id": order_id, "order_number": order_number, "customer_id": customer["id"],
+            "created_by": rng.choice(self.users), "status": status,
+            "subtotal": subtotal, "discount": discount, "total": total, "paid_amount": paid,
+            "notes": None, "order_date": at, "business_date": business_date(at), "deleted_at": None,
+            "created_at": at, "updated_at": at,
+        })
+
+    def _write_balances(self):
+        """Store final stock and balances, which are only known after all orders."""
+        with self.writer.engine.begin() as conn:
+            for table, column, rows in [
+                (Product.__table__, "current_stock",
+                 [{"_id": p["id"], "value": s} for p, s in zip(self.products, self.stock)]),
+                (Customer.__table__, "total_debt",
+                 [{"_id": c["id"], "value": c["total_debt"]} for c in self.customers]),
+                (Supplier.__table__, "total_payable",
+                 [{"_id": s["id"], "value": s["total_payable"]} for s in self.suppliers]),
+            ]:
+                conn.execute(
+                    update(table).where(table.c.id == bindparam("_id")).values({column: bindparam("value")}),
+                    rows
+                )
+
+
+def generate(url: str, spec: DatasetSpec, workers: int = 1, batch_rows: int = 20_000) -> dict:
+    """Generate spec's dataset into the database at url; returns rows written per table."""
+    spec.validate()
+    engine = create_engine(url)
+    try:
+        with Session(engine) as db:
+            if db.query(Product.id).first():
+                raise RuntimeError("Database already contains products; use an empty database")
+            hashed = hash_password(PASSWORD)
+            for user_id, role in zip(_user_ids(spec), UserRole):
+                db.add(User(id=user_id, email=f"loadtest-{role.value}@sme.local",
+                            hashed_password=hashed, full_name=f"Load Test {role.value.title()}", role=role))
+            db.commit()
+
+        args = [(url, spec, shard, batch_rows) for shard in range(spec.shards)]
+        if workers > 1:
+            with get_context("spawn").Pool(workers) as pool:
+                results = pool.starmap(_generate_shard, args)
+        else:
+            results = [_generate_shard(*a) for a in args]
+
+        with Session(engine) as db:
+            rebuild_sales_rollup(db)
+            db.commit()
+    finally:
+        engine.dispose()
+
+    totals = {}
+    for result in results:
+        for table, count in result.items():
+            totals[table] = totals.get(table, 0) + count
+    return totals
+
+
+def main():
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(description="Generate a deterministic load-test dataset.")
+    parser.add_argument("--products", type=int, default=defaults.products)
+    parser.add_argument("--customers", type=int, default=defaults.customers)
+    parser.add_argument("--suppliers", type=int, default=defaults.suppliers)
+    parser.add_argument("--orders", type=int, default=defaults.orders)
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None,
+                        help="last day of the data (default: today; fix it for reproducible runs)")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--shards", type=int, default=defaults.shards,
+                        help="data partitions; part of the dataset identity, unlike --workers")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-rows", type=int, default=20_000)
+    parser.add_argument("--database-url", default=None, help="default: the configured database")
+    args = parser.parse_args()
+
+    from app.config import settings
+    spec = DatasetSpec(args.products, args.customers, args.suppliers, args.orders,
+                       args.days, args.end_date, args.seed, args.shards)
+    started = time.perf_counter()
+    totals = generate(args.database_url or settings.DATABASE_URL, spec, args.workers, args.batch_rows)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Generated dataset in {elapsed:.0f}s")
+    for table, count in totals.items():
+        print(f"   {table}: {count:,} rows")
+    print(f"   Users: loadtest-admin@sme.local, loadtest-manager@sme.local, loadtest-staff@sme.local")
+    print(f"   Password: {PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,12 @@
 """Utility functions."""
+from datetime import date, datetime, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, any_, bindparam, cast, column, func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.config import settings
 
 
 def sanitize_like(value: str) -> str:
@@ -6,3 +14,100 @@ def sanitize_like(value: str) -> str:
     if not value:
         return value
     return value.replace("\\", "\\\\").replace("%", r"\%").replace("_", r"\_")
+
+
+def dialect_insert(db):
+    """Return the dialect-specific insert() supporting ON CONFLICT clauses.
+
+    db may be a Session or an Engine/Connection.
+    """
+    bind = db.get_bind() if hasattr(db, "get_bind") else db
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def business_date(moment: Optional[datetime] = None) -> date:
+    """Calendar date of a moment (default: now) in the shop's time zone.
+
+    Naive datetimes are UTC, like the timestamps the database returns on SQLite.
+    """
+    moment = moment or datetime.now(timezone.utc)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(ZoneInfo(settings.SHOP_TIMEZONE)).date()
+
+
+def business_date_default(timestamp_column: str):
+    """Column default computing business_date from another column of the inserted row.
+
+    Applies to ORM flushes and Core insert() alike; rows that leave the
+    timestamp to its server default get today's business date.
+    """
+    def default(context):
+        return business_date(context.get_current_parameters().get(timestamp_column))
+    return default
+
+
+# SQLite date() modifiers giving the first day of a day/week/month bucket, and the next one
+_SQLITE_BUCKET_START = {"day": (), "week": ("-6 days", "weekday 1"), "month": ("start of month",)}
+_SQLITE_BUCKET_STEP = {"day": "+1 day", "week": "+7 days", "month": "+1 month"}
+
+
+def _dialect_name(db) -> str:
+    bind = db.get_bind() if hasattr(db, "get_bind") else db
+    return bind.dialect.name
+
+
+def date_bucket(db, granularity: str, column):
+    """SQL DATE of the first day of the day/week/month containing column.
+
+    Weeks start on Monday (ISO). granularity is rendered as a literal so the
+    same expression can appear in SELECT and GROUP BY.
+    """
+    if _dialect_name(db) == "postgresql":
+        return cast(func.date_trunc(literal_column(f"'{granularity}'"), column), Date)
+    modifiers = (literal_column(f"'{m}'") for m in _SQLITE_BUCKET_START[granularity])
+    return func.date(column, *modifiers, type_=Date)
+
+
+def next_date_bucket(db, granularity: str, bucket):
+    """SQL DATE of the bucket after the one starting at bucket."""
+    if _dialect_name(db) == "postgresql":
+        return cast(bucket + literal_column(f"INTERVAL '1 {granularity}'"), Date)
+    return func.date(bucket, literal_column(f"'{_SQLITE_BUCKET_STEP[granularity]}'"), type_=Date)
+
+
+def add_by_id(db, table, column_name: str, deltas: dict):
+    """Add each id's delta to a numeric column, locking the rows in id order.
+
+    On PostgreSQL the ids and deltas are bound as two arrays: an ordered
+    SELECT ... FOR UPDATE locks the rows, and one UPDATE joins unnest() of
+    the arrays, so both statements compile once whatever the batch size.
+    Elsewhere each row is updated in id order by one executemany. table is
+    a Core Table.
+    """
+    target = table.c[column_name]
+    ids = sorted(deltas)
+    if _dialect_name(db) == "postgresql":
+        id_array = ARRAY(table.c.id.type)
+        if len(ids) > 1:
+            db.execute(select(table.c.id).where(
+                table.c.id == any_(bindparam("ids", type_=id_array))
+            ).order_by(table.c.id).with_for_update(), {"ids": ids})
+        rows = func.unnest(
+            bindparam("ids", type_=id_array), bindparam("deltas", type_=ARRAY(target.type))
+        ).table_valued(column("id", table.c.id.type), column("delta", target.type)).render_derived()
+        db.execute(
+            update(table).where(table.c.id == rows.c.id).values({column_name: target + rows.c.delta}),
+            {"ids": ids, "deltas": [deltas[i] for i in ids]}
+        )
+        return
+    db.execute(
+        update(table).where(table.c.id == bindparam("_id")).values({
+            column_name: target + bindparam("delta", type_=target.type)
+        }),
+        [{"_id": i, "delta": deltas[i]} for i in ids]
+    )
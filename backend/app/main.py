@@ -3,6 +3,7 @@ FastAPI main application - Production Ready
 Full SME Management System API
 """
 import logging
+import time
 from uuid import uuid4
 
 from fastapi import FastAPI, Depends, Request
@@ -15,6 +16,9 @@ from sqlalchemy.exc import OperationalError
 
 from app.config import settings
 from app.database import get_db, engine, Base
+from app.query_stats import track_queries
+from app.services.auth import user_cache
+from app.services.reports import arap_cache, aging_cache
 from app.api import auth, products, stock, customers, suppliers, orders, payments, reports, export, audit
 
 logger = logging.getLogger("sme")
@@ -29,10 +33,39 @@ class RequestIDMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         request_id = str(uuid4())
         request.state.request_id = request_id
-        response = await call_next(request)
+        started = time.perf_counter()
+        with track_queries() as stats:
+            response = await call_next(request)
         response.headers["X-Request-ID"] = request_id
+        # Statements issued before the response started; streamed bodies are in the log line
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = str(stats.duration_ms)
+        response.body_iterator = self._log_after_body(
+            response.body_iterator, request, response.status_code, stats, started
+        )
         return response
 
+    @staticmethod
+    async def _log_after_body(body, request: Request, status_code: int, stats, started: float):
+        async for chunk in body:
+            yield chunk
+        request_id = request.state.request_id
+        fields = {
+            "request_id": request_id,
+            "method": request.method,
+            "path": request.url.path,
+            "status": status_code,
+            "db_queries": stats.count,
+            "db_time_ms": stats.duration_ms,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        logger.info(" ".join(f"{k}={v}" for k, v in fields.items()), extra=fields)
+        for statement, count in stats.repeated():
+            logger.warning(
+                f"request_id={request_id} path={request.url.path} repeated_statement count={count} "
+                f"sql={' '.join(statement.split())[:200]!r}"
+            )
+
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -97,5 +130,8 @@ async def health_check(db: Session = Depends(get_db)):
     return {
         "status": "healthy" if db_status == "connected" else "degraded",
         "database": db_status,
-        "app_name": settings.APP_NAME
+        "app_name": settings.APP_NAME,
+        "user_cache": user_cache.stats(),
+        "arap_cache": arap_cache.stats(),
+        "aging_cache": aging_cache.stats()
     }
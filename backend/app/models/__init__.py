@@ -2,21 +2,29 @@
 from app.models.base import UUIDMixin, TimestampMixin, UUID
 from app.models.user import User, UserRole
 from app.models.product import Product
-from app.models.stock import StockMovement, MovementType
+from app.models.stock import StockMovement, MovementType, StockCheckpoint
 from app.models.customer import Customer
 from app.models.supplier import Supplier
-from app.models.order import SalesOrder, SalesOrderItem, OrderStatus, STATUS_TRANSITIONS
-from app.models.payment import Payment, PaymentType, PaymentMethod
+from app.models.order import SalesOrder, SalesOrderItem, OrderStatus, STATUS_TRANSITIONS, REVENUE_STATUSES
+from app.models.payment import Payment, PaymentType, PaymentMethod, PaymentAllocation
 from app.models.audit import AuditLog, ActionType
+from app.models.report import DailySalesRollup, DailySalesTotal
+from app.models.numbering import DocumentCounter, DOCUMENT_SEQUENCES, DOCUMENT_NUMBER_BLOCK
+from app.models.idempotency import IdempotencyKey
+from app.models.balance import BalanceEntry, BalanceCheckpoint, PartyType
 
 __all__ = [
     "UUIDMixin", "TimestampMixin", "UUID",
     "User", "UserRole",
     "Product",
-    "StockMovement", "MovementType",
+    "StockMovement", "MovementType", "StockCheckpoint",
     "Customer",
     "Supplier",
-    "SalesOrder", "SalesOrderItem", "OrderStatus", "STATUS_TRANSITIONS",
-    "Payment", "PaymentType", "PaymentMethod",
-    "AuditLog", "ActionType"
+    "SalesOrder", "SalesOrderItem", "OrderStatus", "STATUS_TRANSITIONS", "REVENUE_STATUSES",
+    "Payment", "PaymentType", "PaymentMethod", "PaymentAllocation",
+    "AuditLog", "ActionType",
+    "DailySalesRollup", "DailySalesTotal",
+    "DocumentCounter", "DOCUMENT_SEQUENCES", "DOCUMENT_NUMBER_BLOCK",
+    "IdempotencyKey",
+    "BalanceEntry", "BalanceCheckpoint", "PartyType"
 ]
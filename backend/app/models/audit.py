@@ -28,7 +28,7 @@ class AuditLog(Base, UUIDMixin):
     
     __table_args__ = (
         Index("idx_audit_entity", "entity_type", "entity_id"),
-        Index("idx_audit_created_at", "created_at"),
+        Index("idx_audit_created_at_id", "created_at", "id"),
     )
     
     def __repr__(self):
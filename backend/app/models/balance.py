@@ -0,0 +1,58 @@
+"""Append-only customer/supplier balance ledger."""
+import enum
+from sqlalchemy import Column, String, Numeric, Enum, ForeignKey, Index, DateTime, Boolean, text
+from sqlalchemy.sql import func
+
+from app.database import Base
+from app.models.base import UUIDMixin, UUID
+
+
+class PartyType(str, enum.Enum):
+    CUSTOMER = "customer"
+    SUPPLIER = "supplier"
+
+
+class BalanceEntry(Base, UUIDMixin):
+    """One change of Customer.total_debt or Supplier.total_payable.
+
+    Entries are never deleted and their amounts never change; applied is set
+    once, when the amount has been added to the balance column.
+    """
+    __tablename__ = "balance_entries"
+    
+    party_type = Column(Enum(PartyType), nullable=False)
+    party_id = Column(UUID(), nullable=False)
+    amount = Column(Numeric(15, 0), nullable=False)  # Signed, in the balance column's own convention
+    source_type = Column(String(20), nullable=False)  # order_confirm, order_cancel, payment, payment_delete
+    source_id = Column(UUID(), nullable=True)
+    created_by = Column(UUID(), ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    applied = Column(Boolean, default=False, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_balance_entries_party_created_at", "party_type", "party_id", "created_at"),
+        Index("idx_balance_entries_created_at", "created_at"),
+        # Entries still to be added to the balance columns; usually a handful
+        Index("idx_balance_entries_pending", "party_type", "party_id",
+              postgresql_where=text("NOT applied"), sqlite_where=text("NOT applied")),
+    )
+    
+    def __repr__(self):
+        return f"<BalanceEntry {self.party_type.value}:{self.party_id} {self.amount}>"
+
+
+class BalanceCheckpoint(Base):
+    """Balance of a party at a month boundary: every entry before period_end applied."""
+    __tablename__ = "balance_checkpoints"
+    
+    party_type = Column(Enum(PartyType), primary_key=True)
+    party_id = Column(UUID(), primary_key=True)
+    period_end = Column(DateTime(timezone=True), primary_key=True)
+    balance = Column(Numeric(15, 0), nullable=False)
+    
+    __table_args__ = (
+        Index("idx_balance_checkpoints_period_end", "period_end"),
+    )
+    
+    def __repr__(self):
+        return f"<BalanceCheckpoint {self.party_type.value}:{self.party_id} {self.period_end}>"
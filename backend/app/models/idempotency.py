@@ -0,0 +1,25 @@
+"""Stored responses for Idempotency-Key requests."""
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index
+
+from app.database import Base
+from app.models.base import UUID
+
+
+class IdempotencyKey(Base):
+    """Response of a create request, replayed when the client retries with the same key."""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(UUID(), primary_key=True)
+    endpoint = Column(String(50), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # sha256 of the request body
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("idx_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.endpoint}:{self.key}>"
@@ -0,0 +1,21 @@
+"""Document number counters (order and payment numbers)."""
+from sqlalchemy import Column, String, BigInteger, Sequence
+
+from app.database import Base
+
+# Numbers reserved per round trip; each worker hands them out from memory
+DOCUMENT_NUMBER_BLOCK = 100
+
+# PostgreSQL: one sequence per document type, advancing a whole block per nextval()
+DOCUMENT_SEQUENCES = {
+    name: Sequence(f"{name}_number_seq", increment=DOCUMENT_NUMBER_BLOCK, metadata=Base.metadata)
+    for name in ("order", "payment")
+}
+
+
+class DocumentCounter(Base):
+    """Block counter for databases without sequences (SQLite in tests/dev)."""
+    __tablename__ = "document_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)  # Last number reserved
@@ -2,11 +2,12 @@
 import enum
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import Column, String, Integer, Text, Numeric, Enum, ForeignKey, Index, DateTime
+from sqlalchemy import Column, String, Integer, Text, Numeric, Enum, ForeignKey, Index, DateTime, Date
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.database import Base
+from app.helpers import business_date_default
 from app.models.base import UUIDMixin, TimestampMixin, UUID
 
 
@@ -26,6 +27,9 @@ STATUS_TRANSITIONS = {
     OrderStatus.CANCELLED: [],
 }
 
+# Orders that count towards revenue (stock deducted, debt booked)
+REVENUE_STATUSES = [OrderStatus.CONFIRMED, OrderStatus.SHIPPED, OrderStatus.COMPLETED]
+
 
 class SalesOrder(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "sales_orders"
@@ -40,6 +44,8 @@ class SalesOrder(Base, UUIDMixin, TimestampMixin):
     paid_amount = Column(Numeric(15, 0), default=Decimal("0"), nullable=False)
     notes = Column(Text, nullable=True)
     order_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Shop-local date of order_date; what reports bucket and filter by
+    business_date = Column(Date, default=business_date_default("order_date"), nullable=False)
     deleted_at = Column(DateTime(timezone=True), nullable=True)  # Soft delete
     
     # Relationships
@@ -48,7 +54,8 @@ class SalesOrder(Base, UUIDMixin, TimestampMixin):
     creator = relationship("User")
     
     __table_args__ = (
-        Index("idx_sales_orders_order_date", "order_date"),
+        Index("idx_sales_orders_order_date_id", "order_date", "id"),
+        Index("idx_sales_orders_business_date", "business_date"),
         Index("idx_sales_orders_status", "status"),
         Index("idx_sales_orders_customer_id", "customer_id"),
     )
@@ -1,10 +1,11 @@
 """Payment model."""
 import enum
 from decimal import Decimal
-from sqlalchemy import Column, String, Text, Numeric, Enum, ForeignKey, Index, DateTime, Boolean
+from sqlalchemy import Column, String, Text, Numeric, Enum, ForeignKey, Index, DateTime, Date, Boolean
 from sqlalchemy.sql import func
 
 from app.database import Base
+from app.helpers import business_date_default
 from app.models.base import UUIDMixin, TimestampMixin, UUID
 
 
@@ -33,9 +34,12 @@ class Payment(Base, UUIDMixin, TimestampMixin):
     is_settlement = Column(Boolean, default=False)
     notes = Column(Text, nullable=True)
     payment_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Shop-local date of payment_date
+    business_date = Column(Date, default=business_date_default("payment_date"), nullable=False)
     
     __table_args__ = (
-        Index("idx_payments_payment_date", "payment_date"),
+        Index("idx_payments_payment_date_id", "payment_date", "id"),
+        Index("idx_payments_business_date", "business_date"),
         Index("idx_payments_type", "type"),
         Index("idx_payments_customer_id", "customer_id"),
         Index("idx_payments_supplier_id", "supplier_id"),
@@ -43,3 +47,20 @@ class Payment(Base, UUIDMixin, TimestampMixin):
     
     def __repr__(self):
         return f"<Payment {self.payment_number}>"
+
+
+class PaymentAllocation(Base):
+    """Part of an incoming payment applied to one order's paid_amount."""
+    __tablename__ = "payment_allocations"
+    
+    payment_id = Column(UUID(), ForeignKey("payments.id", ondelete="CASCADE"), primary_key=True)
+    order_id = Column(UUID(), ForeignKey("sales_orders.id"), primary_key=True)
+    amount = Column(Numeric(15, 2), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        Index("idx_payment_allocations_order_id", "order_id"),
+    )
+    
+    def __repr__(self):
+        return f"<PaymentAllocation {self.payment_id} -> {self.order_id}: {self.amount}>"
@@ -0,0 +1,41 @@
+"""Daily sales rollup models (incrementally maintained report tables)."""
+from decimal import Decimal
+from sqlalchemy import Column, Integer, Numeric, ForeignKey, Date, Index
+
+from app.database import Base
+from app.models.base import UUID
+
+
+class DailySalesRollup(Base):
+    """Per business date and product: confirmed sales figures."""
+    __tablename__ = "daily_sales_rollup"
+
+    business_date = Column(Date, primary_key=True)
+    product_id = Column(UUID(), ForeignKey("products.id"), primary_key=True)
+    revenue = Column(Numeric(15, 0), default=Decimal("0"), nullable=False)  # Sum of line totals
+    quantity = Column(Integer, default=0, nullable=False)
+    cost = Column(Numeric(15, 0), default=Decimal("0"), nullable=False)  # cost_price × quantity
+    order_count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("idx_daily_sales_rollup_product_id", "product_id"),
+    )
+
+    def __repr__(self):
+        return f"<DailySalesRollup {self.business_date} {self.product_id}>"
+
+
+class DailySalesTotal(Base):
+    """Per business date: order-level totals (order discount and collections
+    cannot be attributed to a single product)."""
+    __tablename__ = "daily_sales_totals"
+
+    business_date = Column(Date, primary_key=True)
+    revenue = Column(Numeric(15, 0), default=Decimal("0"), nullable=False)  # Sum of order totals
+    subtotal = Column(Numeric(15, 0), default=Decimal("0"), nullable=False)  # Sum of line totals
+    cost = Column(Numeric(15, 0), default=Decimal("0"), nullable=False)
+    collected = Column(Numeric(15, 0), default=Decimal("0"), nullable=False)  # Paid amount of these orders
+    order_count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<DailySalesTotal {self.business_date}>"
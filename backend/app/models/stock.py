@@ -1,9 +1,10 @@
 """StockMovement model."""
 import enum
-from sqlalchemy import Column, Integer, Text, Enum, ForeignKey, Index, DateTime
+from sqlalchemy import Column, Integer, Text, Enum, ForeignKey, Index, DateTime, Date
 from sqlalchemy.sql import func
 
 from app.database import Base
+from app.helpers import business_date_default
 from app.models.base import UUIDMixin, UUID
 
 
@@ -24,11 +25,30 @@ class StockMovement(Base, UUIDMixin):
     stock_after = Column(Integer, nullable=False)
     reason = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Shop-local date of created_at
+    business_date = Column(Date, default=business_date_default("created_at"), nullable=False)
     
     __table_args__ = (
-        Index("idx_stock_movements_product_id", "product_id"),
-        Index("idx_stock_movements_created_at", "created_at"),
+        Index("idx_stock_movements_product_id_created_at", "product_id", "created_at"),
+        Index("idx_stock_movements_created_at_id", "created_at", "id"),
+        Index("idx_stock_movements_type_business_date", "type", "business_date"),
     )
     
     def __repr__(self):
         return f"<StockMovement {self.type.value} {self.quantity}>"
+
+
+class StockCheckpoint(Base):
+    """Stock of a product at a period boundary: every movement before period_end applied."""
+    __tablename__ = "stock_checkpoints"
+    
+    product_id = Column(UUID(), ForeignKey("products.id"), primary_key=True)
+    period_end = Column(DateTime(timezone=True), primary_key=True)
+    stock = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_stock_checkpoints_period_end", "period_end"),
+    )
+    
+    def __repr__(self):
+        return f"<StockCheckpoint {self.product_id} {self.period_end}>"
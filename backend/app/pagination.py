@@ -0,0 +1,81 @@
+"""Offset and keyset (cursor) pagination for list endpoints."""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, bindparam, tuple_
+from sqlalchemy.orm import Query
+
+from app.models.base import UUID
+
+
+def encode_cursor(values: list) -> str:
+    """Encode sort-key values of the last row into an opaque cursor."""
+    plain = [
+        v.isoformat() if isinstance(v, datetime) else str(v) if isinstance(v, uuid.UUID) else v
+        for v in values
+    ]
+    raw = json.dumps(plain, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    """Decode a cursor back into typed values for the given sort columns."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        plain = json.loads(raw)
+        if not isinstance(plain, list) or len(plain) != len(columns):
+            raise ValueError("cursor does not match sort key")
+        values = []
+        for column, value in zip(columns, plain):
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, UUID):
+                value = uuid.UUID(value)
+            values.append(value)
+        return values
+    except (ValueError, TypeError, AttributeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query: Query,
+    sort_keys: list,
+    descending: bool,
+    page: int,
+    size: int,
+    cursor: Optional[str] = None,
+    include_total: bool = True
+) -> tuple[list, Optional[int], Optional[str]]:
+    """Return (items, total, next_cursor) for a list query.
+
+    sort_keys must uniquely identify a row (end with a unique column) and be
+    backed by a matching index. Without a cursor the page is fetched by
+    offset; with one, rows after the cursor are fetched with a row-value
+    comparison, so deep pages cost the same as the first one. next_cursor is
+    set whenever another page exists, so clients can switch to cursor mode
+    after the first page. The count is skipped when include_total is False.
+    """
+    total = query.order_by(None).count() if include_total else None
+
+    ordered = query.order_by(*[c.desc() if descending else c.asc() for c in sort_keys])
+    if cursor:
+        values = decode_cursor(cursor, sort_keys)
+        after = tuple_(*[bindparam(None, v, type_=c.type) for c, v in zip(sort_keys, values)])
+        key = tuple_(*sort_keys)
+        ordered = ordered.filter(key < after if descending else key > after)
+    else:
+        ordered = ordered.offset((page - 1) * size)
+
+    rows = ordered.limit(size + 1).all()
+    items = rows[:size]
+    next_cursor = None
+    if len(rows) > size:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in sort_keys])
+
+    return items, total, next_cursor
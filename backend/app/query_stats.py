@@ -0,0 +1,62 @@
+"""Per-request SQL statement counting via engine events."""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Identical statements repeated this often in one request are reported as a likely N+1
+REPEATED_STATEMENT_THRESHOLD = 10
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    """Statements issued and time spent in the database during one unit of work."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    @property
+    def duration_ms(self) -> float:
+        return round(self.duration * 1000, 2)
+
+    def repeated(self, threshold: int = REPEATED_STATEMENT_THRESHOLD) -> list[tuple[str, int]]:
+        """Statements executed at least threshold times, most frequent first."""
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold]
+
+
+@contextmanager
+def track_queries():
+    """Collect QueryStats for statements run in this context.
+
+    The stats object is shared with tasks and threadpool workers started
+    inside the block, since they inherit a copy of the context.
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    stats.duration += time.perf_counter() - conn.info["query_start"].pop()
+    stats.count += 1
+    stats.statements[statement] += 1
@@ -0,0 +1,27 @@
+"""
+Rebuild the daily sales rollup from sales orders (backfill/repair).
+Run: python -m app.rebuild_rollup
+"""
+from app.database import SessionLocal
+from app.models.report import DailySalesRollup, DailySalesTotal
+from app.services.rollup import rebuild_sales_rollup
+
+
+def rebuild():
+    """Recompute daily_sales_rollup and daily_sales_totals in one transaction."""
+    db = SessionLocal()
+    try:
+        rebuild_sales_rollup(db)
+        db.commit()
+        days = db.query(DailySalesTotal).count()
+        rows = db.query(DailySalesRollup).count()
+        print(f"✅ Rebuilt sales rollup: {days} days, {rows} product-day rows")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -9,20 +9,26 @@ from app.schemas.product import (
 )
 from app.schemas.stock import (
     StockInCreate, StockOutCreate, StockAdjustCreate,
-    StockMovementResponse, StockMovementListResponse
+    StockMovementResponse, StockMovementListResponse,
+    StockInBatchCreate, StockInBatchResponse, StockAsOfItem, StockAsOfResponse
 )
 from app.schemas.customer import (
     CustomerBase, CustomerCreate, CustomerUpdate, CustomerResponse, CustomerListResponse
 )
 from app.schemas.order import (
     OrderLineCreate, OrderLineResponse,
-    OrderCreate, OrderUpdate, OrderStatusUpdate, OrderResponse, OrderListResponse
+    OrderCreate, OrderUpdate, OrderStatusUpdate, OrderResponse, OrderListResponse,
+    OrderBatchCreate, OrderBatchResult, OrderBatchResponse,
+    OrderStatusBatchUpdate, OrderStatusBatchResult, OrderStatusBatchResponse
 )
 from app.schemas.payment import (
-    PaymentCreate, PaymentUpdate, PaymentResponse, PaymentListResponse, ARAPSummary
+    PaymentCreate, PaymentUpdate, PaymentResponse, PaymentListResponse, ARAPSummary,
+    PaymentAllocationResponse, BankMatchedLine, BankReviewLine, BankImportResponse
 )
+from app.schemas.balance import BalanceAsOfResponse
 from app.schemas.reports import (
-    DashboardMetrics, RevenueDataPoint, RevenueReport, TopProductItem, TopProductsReport
+    DashboardMetrics, RevenueGranularity, RevenueDataPoint, RevenueReport,
+    TopProductItem, TopProductsReport, ARAgingBuckets, ARAgingItem, ARAgingReport
 )
 
 __all__ = [
@@ -35,13 +41,20 @@ __all__ = [
     # Stock
     "StockInCreate", "StockOutCreate", "StockAdjustCreate",
     "StockMovementResponse", "StockMovementListResponse",
+    "StockInBatchCreate", "StockInBatchResponse", "StockAsOfItem", "StockAsOfResponse",
     # Customer
     "CustomerBase", "CustomerCreate", "CustomerUpdate", "CustomerResponse", "CustomerListResponse",
     # Order
     "OrderLineCreate", "OrderLineResponse",
     "OrderCreate", "OrderUpdate", "OrderStatusUpdate", "OrderResponse", "OrderListResponse",
+    "OrderBatchCreate", "OrderBatchResult", "OrderBatchResponse",
+    "OrderStatusBatchUpdate", "OrderStatusBatchResult", "OrderStatusBatchResponse",
     # Payment
     "PaymentCreate", "PaymentUpdate", "PaymentResponse", "PaymentListResponse", "ARAPSummary",
+    "PaymentAllocationResponse", "BankMatchedLine", "BankReviewLine", "BankImportResponse",
+    # Balance
+    "BalanceAsOfResponse",
     # Reports
-    "DashboardMetrics", "RevenueDataPoint", "RevenueReport", "TopProductItem", "TopProductsReport",
+    "DashboardMetrics", "RevenueGranularity", "RevenueDataPoint", "RevenueReport",
+    "TopProductItem", "TopProductsReport", "ARAgingBuckets", "ARAgingItem", "ARAgingReport",
 ]
@@ -0,0 +1,11 @@
+"""Balance ledger schemas."""
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class BalanceAsOfResponse(BaseModel):
+    party_id: UUID
+    at: datetime
+    balance: Decimal
@@ -46,4 +46,5 @@ class CustomerResponse(BaseModel):
 
 class CustomerListResponse(BaseModel):
     items: list[CustomerResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
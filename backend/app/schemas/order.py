@@ -35,6 +35,25 @@ class OrderCreate(BaseModel):
     notes: Optional[str] = None
 
 
+class OrderBatchCreate(BaseModel):
+    orders: list[OrderCreate] = Field(..., min_length=1, max_length=500)
+
+
+class OrderBatchResult(BaseModel):
+    index: int
+    success: bool
+    order_id: Optional[UUID] = None
+    order_number: Optional[str] = None
+    total: Optional[Decimal] = None
+    error: Optional[str] = None
+
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[OrderBatchResult]
+
+
 class OrderUpdate(BaseModel):
     discount: Optional[Decimal] = Field(None, ge=0)
     notes: Optional[str] = None
@@ -44,6 +63,25 @@ class OrderStatusUpdate(BaseModel):
     status: str = Field(..., pattern="^(draft|confirmed|shipped|completed|cancelled)$")
 
 
+class OrderStatusBatchUpdate(BaseModel):
+    order_ids: list[UUID] = Field(..., min_length=1, max_length=1000)
+    status: str = Field(..., pattern="^(draft|confirmed|shipped|completed|cancelled)$")
+
+
+class OrderStatusBatchResult(BaseModel):
+    index: int
+    order_id: UUID
+    success: bool
+    error: Optional[str] = None
+
+
+class OrderStatusBatchResponse(BaseModel):
+    status: str
+    updated: int
+    failed: int
+    results: list[OrderStatusBatchResult]
+
+
 class OrderResponse(BaseModel):
     id: UUID
     order_number: str
@@ -82,4 +120,5 @@ class OrderListItem(BaseModel):
 
 class OrderListResponse(BaseModel):
     items: list[OrderListItem]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
@@ -1,5 +1,5 @@
 """Payment schemas."""
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from uuid import UUID
 from typing import Optional
@@ -43,9 +43,18 @@ class PaymentResponse(BaseModel):
         from_attributes = True
 
 
+class PaymentAllocationResponse(BaseModel):
+    payment_id: UUID
+    payment_number: str
+    order_id: UUID
+    amount: Decimal
+    created_at: datetime
+
+
 class PaymentListResponse(BaseModel):
     items: list[PaymentResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class ARAPSummary(BaseModel):
@@ -53,3 +62,31 @@ class ARAPSummary(BaseModel):
     customer_count: int
     total_payables: Decimal
     supplier_count: int
+
+
+class BankMatchedLine(BaseModel):
+    line: int
+    value_date: date
+    amount: Decimal
+    description: str
+    customer_id: UUID
+    order_id: Optional[UUID] = None
+    rule: str
+    payment_number: Optional[str] = None
+
+
+class BankReviewLine(BaseModel):
+    line: int
+    value_date: Optional[date] = None
+    amount: Optional[Decimal] = None
+    description: str
+    reason: str
+    candidates: list[str] = []
+
+
+class BankImportResponse(BaseModel):
+    lines: int
+    matched_amount: Decimal
+    payments_created: int
+    matched: list[BankMatchedLine]
+    review: list[BankReviewLine]
@@ -1,4 +1,6 @@
 """Report schemas."""
+import enum
+from datetime import date
 from decimal import Decimal
 from uuid import UUID
 from pydantic import BaseModel
@@ -25,13 +27,20 @@ class DashboardMetrics(BaseModel):
     low_stock_count: int
 
 
+class RevenueGranularity(str, enum.Enum):
+    DAY = "day"
+    WEEK = "week"  # ISO weeks, starting Monday
+    MONTH = "month"
+
+
 class RevenueDataPoint(BaseModel):
-    period: str
+    period: str  # First day of the bucket, YYYY-MM-DD
     revenue: Decimal
     order_count: int
 
 
 class RevenueReport(BaseModel):
+    granularity: RevenueGranularity
     data: list[RevenueDataPoint]
     total_revenue: Decimal
     total_orders: int
@@ -47,3 +56,24 @@ class TopProductItem(BaseModel):
 
 class TopProductsReport(BaseModel):
     data: list[TopProductItem]
+
+
+class ARAgingBuckets(BaseModel):
+    days_0_30: Decimal
+    days_31_60: Decimal
+    days_61_90: Decimal
+    days_over_90: Decimal
+    total_open: Decimal
+
+
+class ARAgingItem(ARAgingBuckets):
+    customer_id: UUID
+    customer_code: str
+    customer_name: str
+
+
+class ARAgingReport(BaseModel):
+    as_of: date
+    items: list[ARAgingItem]
+    total: int
+    totals: ARAgingBuckets
@@ -11,6 +11,10 @@ class StockInCreate(BaseModel):
     reason: Optional[str] = None
 
 
+class StockInBatchCreate(BaseModel):
+    lines: list[StockInCreate] = Field(..., min_length=1, max_length=1000)
+
+
 class StockOutCreate(BaseModel):
     product_id: UUID
     quantity: int = Field(..., gt=0)
@@ -40,4 +44,20 @@ class StockMovementResponse(BaseModel):
 
 class StockMovementListResponse(BaseModel):
     items: list[StockMovementResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class StockInBatchResponse(BaseModel):
+    items: list[StockMovementResponse]
+    total_quantity: int
+
+
+class StockAsOfItem(BaseModel):
+    product_id: UUID
+    stock: int
+
+
+class StockAsOfResponse(BaseModel):
+    at: datetime
+    items: list[StockAsOfItem]
@@ -45,4 +45,5 @@ class SupplierResponse(BaseModel):
 
 class SupplierListResponse(BaseModel):
     items: list[SupplierResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
@@ -1,12 +1,12 @@
 """Services package."""
 from app.services.auth import (
-    hash_password, verify_password, 
+    hash_password, verify_password, hash_password_async, verify_password_async,
     create_access_token, create_refresh_token, decode_token,
-    authenticate_user, get_user_by_id
+    authenticate_user, authenticate_user_async, get_user_by_id, get_user_by_email
 )
 
 __all__ = [
-    "hash_password", "verify_password",
+    "hash_password", "verify_password", "hash_password_async", "verify_password_async",
     "create_access_token", "create_refresh_token", "decode_token",
-    "authenticate_user", "get_user_by_id"
+    "authenticate_user", "authenticate_user_async", "get_user_by_id", "get_user_by_email"
 ]
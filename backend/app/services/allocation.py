@@ -0,0 +1,113 @@
+"""Payment allocation to orders.
+
+Each part of an incoming payment applied to an order is recorded as a
+PaymentAllocation and added to the order's paid_amount, so an order's
+payments and outstanding balance are indexed lookups rather than a
+recompute over all of the customer's payments.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.helpers import add_by_id
+from app.models.order import SalesOrder, REVENUE_STATUSES
+from app.models.payment import Payment, PaymentAllocation, PaymentType
+from app.services import rollup
+
+# Columns apply_collections needs, selected instead of loading orders
+_ORDER_COLUMNS = (SalesOrder.id, SalesOrder.status, SalesOrder.deleted_at, SalesOrder.business_date)
+
+
+def _apply(db: Session, shares: list, sign: int):
+    """Add (sign=1) or remove (sign=-1) (order row, amount) shares from paid_amount."""
+    amounts, collections = defaultdict(Decimal), []
+    for order, amount in shares:
+        amounts[order.id] += amount
+        collections.append((order, sign * amount))
+    add_by_id(db, SalesOrder.__table__, "paid_amount", {oid: sign * amount for oid, amount in amounts.items()})
+    rollup.apply_collections(db, collections)
+
+
+def _is_fifo(payment) -> bool:
+    return (not payment.order_id and payment.type == PaymentType.INCOMING
+            and payment.is_settlement and payment.customer_id is not None)
+
+
+def allocate_payments(db: Session, payments: list) -> list[tuple[UUID, UUID, Decimal]]:
+    """Apply flushed payments to orders; returns (payment_id, order_id, amount) allocations.
+
+    A payment linked to an order is applied to it in full. An unlinked
+    incoming settlement is spread over the customer's open orders, oldest
+    first, until it is used up; any remainder only reduces the customer's
+    balance. Payments are applied in list order, and statements do not
+    grow with the number of payments or orders covered.
+    """
+    linked = [p for p in payments if p.order_id]
+    fifo = [p for p in payments if _is_fifo(p)]
+
+    orders = {}
+    if linked:
+        orders = {row.id: row for row in db.execute(
+            select(*_ORDER_COLUMNS).where(SalesOrder.id.in_({p.order_id for p in linked}))
+        )}
+    open_orders, remaining = defaultdict(list), {}
+    if fifo:
+        open_amount = SalesOrder.total - SalesOrder.paid_amount
+        for row in db.execute(
+            select(*_ORDER_COLUMNS, SalesOrder.customer_id, open_amount.label("open_amount")).where(
+                SalesOrder.customer_id.in_({p.customer_id for p in fifo}),
+                SalesOrder.deleted_at == None,
+                SalesOrder.status.in_(REVENUE_STATUSES),
+                open_amount > 0
+            ).order_by(SalesOrder.customer_id, SalesOrder.order_date, SalesOrder.id).with_for_update()
+        ):
+            open_orders[row.customer_id].append(row)
+            remaining[row.id] = row.open_amount
+
+    allocations = []  # (payment, order row, amount)
+    for payment in linked:
+        order = orders.get(payment.order_id)
+        if order:
+            allocations.append((payment, order, payment.amount))
+            if order.id in remaining:
+                remaining[order.id] -= payment.amount
+    for payment in fifo:
+        left = payment.amount
+        for order in open_orders[payment.customer_id]:
+            if left <= 0:
+                break
+            share = min(remaining[order.id], left)
+            if share > 0:
+                allocations.append((payment, order, share))
+                remaining[order.id] -= share
+                left -= share
+
+    if not allocations:
+        return []
+    _apply(db, [(order, amount) for _, order, amount in allocations], 1)
+    db.execute(insert(PaymentAllocation), [
+        {"payment_id": payment.id, "order_id": order.id, "amount": amount}
+        for payment, order, amount in allocations
+    ])
+    return [(payment.id, order.id, amount) for payment, order, amount in allocations]
+
+
+def allocate_payment(db: Session, payment: Payment) -> list[tuple[UUID, UUID, Decimal]]:
+    """Apply one flushed payment to orders (see allocate_payments)."""
+    return allocate_payments(db, [payment])
+
+
+def release_payment(db: Session, payment: Payment):
+    """Remove a payment's allocations and take them back off the orders' paid_amount."""
+    released = dict(db.execute(
+        delete(PaymentAllocation).where(PaymentAllocation.payment_id == payment.id).returning(
+            PaymentAllocation.order_id, PaymentAllocation.amount
+        )
+    ).all())
+    if not released:
+        return
+    orders = db.execute(select(*_ORDER_COLUMNS).where(SalesOrder.id.in_(list(released)))).all()
+    _apply(db, [(order, released[order.id]) for order in orders], -1)
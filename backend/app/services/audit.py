@@ -3,6 +3,7 @@ import json
 from typing import Optional, Any
 from uuid import UUID
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.models.audit import AuditLog
@@ -30,6 +31,32 @@ def log_action(
     # Note: commit handled by caller to avoid extra DB roundtrip
 
 
+def log_actions(
+    db: Session,
+    action: str,
+    entity_type: str,
+    user_id: UUID,
+    entries: list[tuple[UUID, Optional[dict], Optional[dict]]]
+):
+    """Log one action for many entities in a single INSERT.
+
+    entries are (entity_id, before_data, after_data) tuples.
+    """
+    if not entries:
+        return
+    db.execute(insert(AuditLog), [
+        {
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "user_id": user_id,
+            "before_data": json.dumps(before_data, default=str) if before_data else None,
+            "after_data": json.dumps(after_data, default=str) if after_data else None,
+        }
+        for entity_id, before_data, after_data in entries
+    ])
+
+
 def entity_snapshot(obj, fields: list[str]) -> dict:
     """Create minimal snapshot of entity for audit."""
     return {f: getattr(obj, f, None) for f in fields if hasattr(obj, f)}
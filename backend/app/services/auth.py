@@ -1,27 +1,66 @@
 """Authentication service - JWT + password hashing."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 import uuid
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app.cache import TTLCache
 from app.config import settings
-from app.models.user import User
+from app.models.user import User, UserRole
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a small dedicated pool caps hashing concurrency
+# per worker without occupying the request threadpool during a login burst
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+
+
+class AuthenticatedUser(NamedTuple):
+    """Detached snapshot of an active user, safe to share between requests."""
+    id: uuid.UUID
+    email: str
+    full_name: str
+    role: UserRole
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+# Active users by id; see invalidate_changed_users for what evicts an entry
+user_cache = TTLCache(settings.USER_CACHE_TTL_SECONDS)
+_user_generation = 0
+
+_CACHED_USER_FIELDS = [f for f in AuthenticatedUser._fields if f != "id"]
+
 
 def hash_password(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    return _password_executor.submit(pwd_context.hash, password).result()
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify password against hash."""
-    return pwd_context.verify(plain, hashed)
+    return _password_executor.submit(pwd_context.verify, plain, hashed).result()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without blocking the event loop or a request thread."""
+    return await asyncio.wrap_future(_password_executor.submit(pwd_context.hash, password))
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    """Verify a password without blocking the event loop or a request thread."""
+    return await asyncio.wrap_future(_password_executor.submit(pwd_context.verify, plain, hashed))
 
 
 def create_access_token(user_id: uuid.UUID, role: str) -> str:
@@ -56,9 +95,14 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    """Get user by email."""
+    return db.query(User).filter(User.email == email).first()
+
+
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """Authenticate user with email and password."""
-    user = db.query(User).filter(User.email == email).first()
+    user = get_user_by_email(db, email)
     if not user or not user.is_active:
         return None
     if not verify_password(password, user.hashed_password):
@@ -66,6 +110,91 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     return user
 
 
+def _load_login_user(db: Session, email: str) -> Optional[User]:
+    """Load a user detached from the session and release its connection."""
+    user = get_user_by_email(db, email)
+    if user:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+
+async def authenticate_user_async(db: Session, email: str, password: str) -> Optional[User]:
+    """Authenticate user without holding a request thread or DB connection during bcrypt.
+
+    The returned user is detached; persist changes with store_refresh_token.
+    """
+    user = await run_in_threadpool(_load_login_user, db, email)
+    if not user or not user.is_active:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    return user
+
+
+def store_refresh_token(db: Session, user_id: uuid.UUID, refresh_token: str):
+    """Persist the user's current refresh token."""
+    db.query(User).filter(User.id == user_id).update(
+        {User.refresh_token: refresh_token}, synchronize_session=False
+    )
+    db.commit()
+
+
 def get_user_by_id(db: Session, user_id: uuid.UUID) -> Optional[User]:
     """Get user by ID."""
     return db.query(User).filter(User.id == user_id).first()
+
+
+def get_authenticated_user(db: Session, user_id: uuid.UUID) -> Optional[AuthenticatedUser]:
+    """Return the active user for a token, from the cache when possible."""
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    # Don't cache a row read while a change to some user was committing
+    generation = _user_generation
+    user = get_user_by_id(db, user_id)
+    if not user or not user.is_active:
+        return None
+    snapshot = AuthenticatedUser(*(getattr(user, f) for f in AuthenticatedUser._fields))
+    if generation == _user_generation:
+        user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def invalidate_users(user_ids):
+    global _user_generation
+    _user_generation += 1
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def invalidate_changed_users(session, flush_context):
+    """Collect users whose cached fields changed, who were deleted, or who logged out.
+
+    They are evicted once the transaction commits; evicting earlier would let a
+    concurrent request cache the old row again before the change is visible.
+    """
+    changed = session.info.setdefault("changed_users", set())
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if not isinstance(obj, User):
+            continue
+        attrs = inspect(obj).attrs
+        logged_out = attrs.refresh_token.history.has_changes() and obj.refresh_token is None
+        if logged_out or any(attrs[f].history.has_changes() for f in _CACHED_USER_FIELDS):
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session):
+    changed = session.info.pop("changed_users", None)
+    if changed:
+        invalidate_users(changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop("changed_users", None)
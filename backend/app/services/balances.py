@@ -0,0 +1,194 @@
+"""Customer and supplier balance ledger.
+
+Every change of Customer.total_debt or Supplier.total_payable is appended
+as a BalanceEntry; writers never update or lock the customer/supplier row,
+so payments and order transitions of one busy party don't queue behind each
+other. The balance columns catch up right after the writing transaction
+commits (apply_pending_balances in a short transaction of its own), and a
+periodic run of apply_pending_balances picks up anything that was missed.
+Until then the true balance is the column plus the party's unapplied entries.
+
+Balances at a past time are read like stock (see services/checkpoints.py): monthly
+checkpoints are derived backwards from current balances, and an as-of
+query applies only the entries between the nearest checkpoint and `at`.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import cast, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.helpers import add_by_id
+from app.models.balance import BalanceEntry, BalanceCheckpoint, PartyType
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.services.checkpoints import Ledger, as_utc, build_ledger_checkpoints
+
+logger = logging.getLogger("sme")
+
+# Party type -> (model, balance column name)
+BALANCE_COLUMNS = {
+    PartyType.CUSTOMER: (Customer, "total_debt"),
+    PartyType.SUPPLIER: (Supplier, "total_payable"),
+}
+
+# Pending entries claimed (and parties updated) per statement by apply_pending_balances
+APPLY_CHUNK_ENTRIES = 1000
+
+
+class BalanceChange(NamedTuple):
+    party_type: PartyType
+    party_id: UUID
+    amount: Decimal  # signed delta of the balance column
+    source_type: str
+    source_id: Optional[UUID] = None
+
+
+def record_balance_changes(db: Session, changes: list[BalanceChange], user_id: UUID):
+    """Append one ledger entry per change in a single INSERT.
+
+    The entry ids are remembered on the session; the entries are added to
+    the balance columns once the transaction commits (see _apply_after_commit).
+    """
+    entries = [
+        {
+            "id": uuid4(), "party_type": c.party_type, "party_id": c.party_id, "amount": c.amount,
+            "source_type": c.source_type, "source_id": c.source_id, "created_by": user_id,
+        }
+        for c in changes if c.amount
+    ]
+    if entries:
+        db.execute(insert(BalanceEntry), entries)
+        db.info.setdefault("balance_entries", []).extend(e["id"] for e in entries)
+
+
+def _claim(db: Session, condition) -> list:
+    """Mark matching unapplied entries applied; returns (party_type, party_id, amount) rows."""
+    return db.execute(
+        update(BalanceEntry).where(condition, BalanceEntry.applied == False).values(applied=True)
+        .returning(BalanceEntry.party_type, BalanceEntry.party_id, BalanceEntry.amount)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _add_to_balances(db: Session, claimed: list):
+    """Add claimed amounts to the balance columns, one batch per party type."""
+    amounts = defaultdict(lambda: defaultdict(Decimal))
+    for party_type, party_id, amount in claimed:
+        amounts[party_type][party_id] += amount
+    for party_type, (model, column) in BALANCE_COLUMNS.items():
+        if amounts[party_type]:
+            add_by_id(db, model.__table__, column, amounts[party_type])
+
+
+def apply_pending_balances(db: Session, entry_ids: Optional[list[UUID]] = None) -> int:
+    """Add unapplied entries to the balance columns; commit handled by caller.
+
+    Entries are claimed in chunks with UPDATE ... SET applied WHERE NOT applied
+    RETURNING, so concurrent runs apply each entry exactly once. Only the
+    given entries are claimed (by primary key) when entry_ids is passed.
+    Returns the number of entries applied.
+    """
+    applied = 0
+    if entry_ids is not None:
+        for start in range(0, len(entry_ids), APPLY_CHUNK_ENTRIES):
+            claimed = _claim(db, BalanceEntry.id.in_(entry_ids[start:start + APPLY_CHUNK_ENTRIES]))
+            _add_to_balances(db, claimed)
+            applied += len(claimed)
+        return applied
+
+    pending = select(BalanceEntry.id).where(BalanceEntry.applied == False).limit(APPLY_CHUNK_ENTRIES)
+    while claimed := _claim(db, BalanceEntry.id.in_(pending)):
+        _add_to_balances(db, claimed)
+        applied += len(claimed)
+    return applied
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    """Add the entries this transaction wrote to the balance columns."""
+    entry_ids = session.info.pop("balance_entries", None)
+    if not entry_ids:
+        return
+    applier = Session(bind=session.get_bind())
+    try:
+        apply_pending_balances(applier, entry_ids)
+        applier.commit()
+    except Exception as e:
+        # The entries stay pending; the next periodic run applies them
+        applier.rollback()
+        logger.warning(f"Deferred balance update failed: {e}")
+    finally:
+        applier.close()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop("balance_entries", None)
+
+
+def _pending(party_type: PartyType, party_id):
+    """Sum of a party's entries not yet in its balance column."""
+    return func.coalesce(select(func.sum(BalanceEntry.amount)).where(
+        BalanceEntry.party_type == party_type,
+        BalanceEntry.party_id == party_id,
+        BalanceEntry.applied == False
+    ).scalar_subquery(), 0)
+
+
+BALANCE_LEDGER = Ledger(
+    entries=BalanceEntry, delta=BalanceEntry.amount, checkpoint=BalanceCheckpoint, value="balance",
+    keys=("party_type", "party_id"),
+    # Current balance: the column plus entries not yet applied to it
+    current=tuple(
+        select(
+            cast(party_type, BalanceEntry.party_type.type).label("party_type"), model.id.label("party_id"),
+            (getattr(model, column) + _pending(party_type, model.id)).label("value")
+        )
+        for party_type, (model, column) in BALANCE_COLUMNS.items()
+    ),
+)
+
+
+def build_balance_checkpoints(db: Session, now: Optional[datetime] = None) -> list[datetime]:
+    """Add balance checkpoints for month boundaries closed since the last run."""
+    return build_ledger_checkpoints(db, BALANCE_LEDGER, now)
+
+
+def balance_as_of(db: Session, party_type: PartyType, party_id: UUID, at: datetime) -> Optional[Decimal]:
+    """Balance of a party after every entry created at or before `at`.
+
+    Starts from the latest checkpoint at or before `at` and adds the
+    entries since; without one, starts from the earliest later checkpoint
+    (or the current balance) and subtracts the entries after `at`.
+    Returns None when the party does not exist.
+    """
+    model, column = BALANCE_COLUMNS[party_type]
+    current = db.scalar(select(getattr(model, column) + _pending(party_type, model.id)).where(model.id == party_id))
+    if current is None:
+        return None
+
+    at = as_utc(at)
+    party = [BalanceEntry.party_type == party_type, BalanceEntry.party_id == party_id]
+    checkpoints = select(BalanceCheckpoint.period_end, BalanceCheckpoint.balance).where(
+        BalanceCheckpoint.party_type == party_type, BalanceCheckpoint.party_id == party_id
+    )
+    floor = db.execute(checkpoints.where(BalanceCheckpoint.period_end <= at).order_by(
+        BalanceCheckpoint.period_end.desc()
+    ).limit(1)).first()
+    if floor:
+        window = [BalanceEntry.created_at >= as_utc(floor.period_end), BalanceEntry.created_at <= at]
+        return floor.balance + (db.scalar(select(func.sum(BalanceEntry.amount)).where(*party, *window)) or 0)
+
+    window = [BalanceEntry.created_at > at]
+    ceiling = db.execute(checkpoints.where(BalanceCheckpoint.period_end > at).order_by(
+        BalanceCheckpoint.period_end
+    ).limit(1)).first()
+    if ceiling:
+        current = ceiling.balance
+        window.append(BalanceEntry.created_at < as_utc(ceiling.period_end))
+    return current - (db.scalar(select(func.sum(BalanceEntry.amount)).where(*party, *window)) or 0)
@@ -0,0 +1,388 @@
+"""Bank statement import: match credit lines to customers and open orders.
+
+The statement is read as a stream in chunks of IMPORT_CHUNK_LINES. Each
+chunk is matched with three set-based lookups (order numbers and customer
+codes found in the line descriptions, then open orders by amount for the
+lines still unmatched), so the cost grows with the number of chunks, not
+with one round trip per line. Lines are matched in order:
+
+  1. an open order number in the description: payment linked to the order
+  2. one customer code in the description: settlement for that customer,
+     allocated to their oldest open orders (reserved while matching, so
+     later lines only see what is left open)
+  3. exactly one open order of that open amount placed within
+     MATCH_WINDOW_DAYS before the line: payment linked to the order
+
+A line whose customer already has an incoming bank payment of the same
+amount on the same date is taken to be recorded already (an overlapping or
+re-imported statement, or a payment entered by hand) and is not matched
+again; each existing payment accounts for one such line. A line matched by
+amount alone names no customer, so any bank payment of that amount on that
+date sends it to review. The existing payments are looked up once per
+chunk, by the chunk's (date, amount) pairs.
+
+Everything else (debits, unparseable lines, ambiguous or missing matches)
+is returned for review. Matched lines become incoming bank settlements,
+written in bulk once the whole statement has been matched.
+"""
+import csv
+import re
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import IO, NamedTuple, Optional
+from uuid import UUID, uuid4
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.balance import PartyType
+from app.models.customer import Customer
+from app.models.order import SalesOrder, REVENUE_STATUSES
+from app.models.payment import Payment, PaymentType, PaymentMethod
+from app.services.allocation import allocate_payments
+from app.services.balances import BalanceChange, record_balance_changes
+from app.services.numbering import next_document_numbers
+
+# Lines matched (and payments written) per batch of statements
+IMPORT_CHUNK_LINES = 1000
+# How long before a bank line an order it pays may have been placed
+MATCH_WINDOW_DAYS = 90
+MAX_STATEMENT_LINES = 100_000
+
+REQUIRED_COLUMNS = ("date", "amount", "description")
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9-]*[A-Za-z0-9]")
+
+
+class StatementFormatError(ValueError):
+    """The file is not a statement this importer can read."""
+
+
+class StatementLine(NamedTuple):
+    line: int  # 1-based, header excluded
+    value_date: Optional[date]
+    amount: Optional[Decimal]
+    description: str
+    tokens: frozenset
+
+
+class MatchedLine(NamedTuple):
+    line: int
+    value_date: date
+    amount: Decimal
+    description: str
+    customer_id: UUID
+    order_id: Optional[UUID]
+    rule: str  # order_number, customer_code, amount
+
+
+class ReviewLine(NamedTuple):
+    line: int
+    value_date: Optional[date]
+    amount: Optional[Decimal]
+    description: str
+    reason: str
+    candidates: list[str]  # order numbers that could fit
+
+
+class ImportedPayment(NamedTuple):
+    """The fields allocate_payments reads from a payment."""
+    id: UUID
+    customer_id: UUID
+    order_id: Optional[UUID]
+    amount: Decimal
+    type: PaymentType = PaymentType.INCOMING
+    is_settlement: bool = True
+
+
+class ImportResult(NamedTuple):
+    lines: int
+    matched: list[MatchedLine]
+    review: list[ReviewLine]
+    payment_numbers: list[str]  # one per matched line when written
+
+
+def _parse_date(text: str) -> Optional[date]:
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(text: str) -> Optional[Decimal]:
+    text = text.strip().replace(",", "").replace(" ", "")
+    if text.count(".") > 1:  # 1.000.000 thousands separators
+        text = text.replace(".", "")
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        return None
+
+
+def read_statement(stream: IO[str]):
+    """Yield StatementLines from CSV text with date, amount and description columns."""
+    reader = csv.DictReader(stream)
+    columns = {(name or "").strip().lower(): name for name in reader.fieldnames or []}
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise StatementFormatError(f"Missing column(s): {', '.join(missing)}")
+    for number, row in enumerate(reader, start=1):
+        if number > MAX_STATEMENT_LINES:
+            raise StatementFormatError(f"At most {MAX_STATEMENT_LINES} lines per statement")
+        description = (row[columns["description"]] or "").strip()
+        yield StatementLine(
+            line=number,
+            value_date=_parse_date(row[columns["date"]] or ""),
+            amount=_parse_amount(row[columns["amount"]] or ""),
+            description=description,
+            tokens=frozenset(t.upper() for t in _TOKEN.findall(description)),
+        )
+
+
+class _Matcher:
+    """Matches chunks of lines; remembers how much of each order is already claimed."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.claimed = defaultdict(Decimal)  # order id -> amount matched so far
+        self.open_orders = {}  # customer id -> open orders, oldest first (as allocate_payments)
+        # (customer id, amount, date) -> existing bank payments not yet paired with a line
+        self.recorded = defaultdict(int)
+        self.looked_up = set()  # (date, amount) pairs already looked up
+        self.recorded_by = defaultdict(set)  # (date, amount) -> customers with such a payment
+        self.matched: list[MatchedLine] = []
+        self.review: list[ReviewLine] = []
+
+    def _open(self, order) -> Decimal:
+        return order.total - order.paid_amount - self.claimed[order.id]
+
+    def _in_window(self, order, day: date) -> bool:
+        return day - timedelta(days=MATCH_WINDOW_DAYS) <= order.business_date <= day
+
+    def _accept(self, line, customer_id, order_id, rule):
+        self.matched.append(MatchedLine(
+            line.line, line.value_date, line.amount, line.description, customer_id, order_id, rule
+        ))
+
+    def _reject(self, line, reason, candidates=()):
+        self.review.append(ReviewLine(
+            line.line, line.value_date, line.amount, line.description, reason, list(candidates)
+        ))
+
+    def _load_open_orders(self, customer_ids, order_columns):
+        """One query for the open orders of customers settling by code."""
+        new = set(customer_ids) - set(self.open_orders)
+        if not new:
+            return
+        for customer_id in new:
+            self.open_orders[customer_id] = []
+        # Status is checked here, for the reason given in _match_amounts
+        for order in self.db.execute(select(*order_columns).where(
+            SalesOrder.customer_id.in_(new),
+            SalesOrder.deleted_at == None,
+            SalesOrder.total - SalesOrder.paid_amount > 0
+        ).order_by(SalesOrder.customer_id, SalesOrder.order_date, SalesOrder.id)):
+            if order.status in REVENUE_STATUSES:
+                self.open_orders[order.customer_id].append(order)
+
+    def _reserve(self, customer_id, amount: Decimal):
+        """Claim a settlement's share of each open order, oldest first, like allocate_payments."""
+        for order in self.open_orders[customer_id]:
+            if amount <= 0:
+                break
+            share = min(self._open(order), amount)
+            if share > 0:
+                self.claimed[order.id] += share
+                amount -= share
+
+    def _load_recorded(self, lines):
+        """One query for the existing bank payments of the lines' (date, amount) pairs."""
+        pairs = {(line.value_date, line.amount) for line in lines} - self.looked_up
+        if not pairs:
+            return
+        self.looked_up |= pairs
+        # One IN list only, for the reason given in _match_amounts; pairs are checked here
+        for customer_id, day, amount, count in self.db.execute(select(
+            Payment.customer_id, Payment.business_date, Payment.amount, func.count()
+        ).where(
+            Payment.type == PaymentType.INCOMING,
+            Payment.method == PaymentMethod.BANK,
+            Payment.customer_id != None,
+            Payment.business_date >= min(day for day, _ in pairs),
+            Payment.business_date <= max(day for day, _ in pairs),
+            Payment.amount.in_({amount for _, amount in pairs})
+        ).group_by(Payment.customer_id, Payment.business_date, Payment.amount)):
+            if (day, amount) not in pairs:
+                continue
+            self.recorded[(customer_id, amount, day)] = count
+            self.recorded_by[(day, amount)].add(customer_id)
+
+    def _already_recorded(self, line, customer_id, candidates=()) -> bool:
+        """Send the line to review if an unpaired existing payment accounts for it."""
+        key = (customer_id, line.amount, line.value_date)
+        if not self.recorded[key]:
+            return False
+        self.recorded[key] -= 1
+        self._reject(line, "Already recorded", candidates)
+        return True
+
+    def add_chunk(self, lines: list[StatementLine]):
+        credits = []
+        for line in lines:
+            if line.value_date is None:
+                self._reject(line, "Invalid date")
+            elif line.amount is None:
+                self._reject(line, "Invalid amount")
+            elif line.amount <= 0:
+                self._reject(line, "Not a credit")
+            else:
+                credits.append(line)
+        if not credits:
+            return
+        self._load_recorded(credits)
+
+        tokens = set().union(*(line.tokens for line in credits))
+        order_columns = (
+            SalesOrder.id, SalesOrder.order_number, SalesOrder.customer_id, SalesOrder.status,
+            SalesOrder.total, SalesOrder.paid_amount, SalesOrder.business_date, SalesOrder.deleted_at,
+        )
+        orders = {row.order_number.upper(): row for row in self.db.execute(
+            select(*order_columns).where(SalesOrder.order_number.in_(tokens))
+        )} if tokens else {}
+        customers = {code.upper(): cid for cid, code in self.db.execute(
+            select(Customer.id, Customer.code).where(Customer.code.in_(tokens))
+        )} if tokens else {}
+
+        self._load_open_orders({
+            customers[t] for line in credits if not line.tokens & orders.keys()
+            for t in line.tokens if t in customers
+        }, order_columns)
+
+        by_amount = []
+        for line in credits:
+            referenced = [orders[t] for t in line.tokens if t in orders]
+            if referenced:
+                self._match_order(line, referenced[0])
+                continue
+            codes = {customers[t] for t in line.tokens if t in customers}
+            if len(codes) == 1:
+                customer_id = codes.pop()
+                if not self._already_recorded(line, customer_id):
+                    self._reserve(customer_id, line.amount)
+                    self._accept(line, customer_id, None, "customer_code")
+            elif codes:
+                self._reject(line, "Several customer codes")
+            else:
+                by_amount.append(line)
+        if by_amount:
+            self._match_amounts(by_amount, order_columns)
+
+    def _match_order(self, line, order):
+        if self._already_recorded(line, order.customer_id, [order.order_number]):
+            return
+        if order.status not in REVENUE_STATUSES or order.deleted_at is not None:
+            self._reject(line, f"Order {order.order_number} is not open", [order.order_number])
+        elif not self._in_window(order, line.value_date):
+            self._reject(line, f"Order {order.order_number} is outside the date window", [order.order_number])
+        elif line.amount > self._open(order):
+            self._reject(line, f"Amount exceeds the open balance of {order.order_number}", [order.order_number])
+        else:
+            self.claimed[order.id] += line.amount
+            self._accept(line, order.customer_id, order.id, "order_number")
+
+    def _match_amounts(self, lines, order_columns):
+        """One query for the open orders of the chunk's amounts in its date range."""
+        first = min(line.value_date for line in lines) - timedelta(days=MATCH_WINDOW_DAYS)
+        last = max(line.value_date for line in lines)
+        open_amount = SalesOrder.total - SalesOrder.paid_amount
+        candidates = defaultdict(list)
+        for order in self.db.execute(select(*order_columns).where(
+            SalesOrder.business_date >= first,
+            SalesOrder.business_date <= last,
+            SalesOrder.deleted_at == None,
+            # Status is checked below: ANDed with a second IN list, PostgreSQL
+            # compares every order with every amount instead of hashing them
+            open_amount.in_({line.amount for line in lines})
+        )):
+            if order.status in REVENUE_STATUSES:
+                candidates[order.total - order.paid_amount].append(order)
+
+        for line in lines:
+            fits = [
+                o for o in candidates.get(line.amount, [])
+                if self._in_window(o, line.value_date) and self._open(o) == line.amount
+            ]
+            if self._amount_recorded(line, fits):
+                continue
+            if len(fits) == 1:
+                self.claimed[fits[0].id] += line.amount
+                self._accept(line, fits[0].customer_id, fits[0].id, "amount")
+            elif fits:
+                self._reject(line, "Several open orders of this amount", sorted(o.order_number for o in fits))
+            else:
+                self._reject(line, "No match")
+
+    def _amount_recorded(self, line, fits) -> bool:
+        """Send an amount-only line to review if any bank payment has its date and amount.
+
+        The line names no customer, so it cannot tell whose payment it is; it
+        leaves the payment to a line that names the customer.
+        """
+        if not self.recorded_by[(line.value_date, line.amount)]:
+            return False
+        self._reject(line, "Already recorded", sorted(o.order_number for o in fits))
+        return True
+
+
+def _write_payments(db: Session, matched: list[MatchedLine], numbers: list[str], user_id: UUID):
+    """Insert one chunk of payments and apply their balance and allocation effects."""
+    payments = [ImportedPayment(uuid4(), m.customer_id, m.order_id, m.amount) for m in matched]
+    shop_zone = ZoneInfo(settings.SHOP_TIMEZONE)
+    # render_nulls keeps rows with and without order_id in one executemany batch
+    db.execute(insert(Payment).execution_options(render_nulls=True), [
+        {
+            "id": p.id, "payment_number": number, "type": PaymentType.INCOMING,
+            "method": PaymentMethod.BANK, "customer_id": p.customer_id, "order_id": p.order_id,
+            "created_by": user_id, "amount": p.amount, "is_settlement": True,
+            "notes": f"Bank statement line {m.line}: {m.description}"[:500],
+            # Statement dates are already local: midnight in the shop's time zone
+            "payment_date": datetime.combine(m.value_date, time.min, tzinfo=shop_zone).astimezone(timezone.utc),
+            "business_date": m.value_date,
+        }
+        for p, m, number in zip(payments, matched, numbers)
+    ])
+    record_balance_changes(db, [
+        BalanceChange(PartyType.CUSTOMER, p.customer_id, p.amount, "payment", p.id) for p in payments
+    ], user_id)
+    allocate_payments(db, payments)
+
+
+def import_statement(db: Session, stream: IO[str], user_id: UUID, dry_run: bool = False) -> ImportResult:
+    """Match a statement and, unless dry_run, create payments for matched lines.
+
+    Commit handled by caller. Raises StatementFormatError for unreadable files.
+    """
+    matcher = _Matcher(db)
+    lines = read_statement(stream)
+    count = 0
+    while chunk := list(islice(lines, IMPORT_CHUNK_LINES)):
+        count += len(chunk)
+        matcher.add_chunk(chunk)
+
+    # Statement order, which is also the order settlements are allocated in
+    matched, review = sorted(matcher.matched), sorted(matcher.review)
+    if dry_run or not matched:
+        return ImportResult(count, matched, review, [])
+
+    # Numbers are allocated before the first write (see next_document_number)
+    numbers = next_document_numbers(db, "payment", "PAY", len(matched))
+    for start in range(0, len(matched), IMPORT_CHUNK_LINES):
+        end = start + IMPORT_CHUNK_LINES
+        _write_payments(db, matched[start:end], numbers[start:end], user_id)
+    return ImportResult(count, matched, review, numbers)
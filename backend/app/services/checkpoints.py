@@ -0,0 +1,118 @@
+"""Monthly checkpoints shared by the stock and balance ledgers.
+
+A checkpoint stores a running value (a product's stock, a party's balance)
+at a month boundary, with every ledger row created before the boundary
+applied. Checkpoints are derived backwards from the current values, which
+stay authoritative: the newest boundary is the current value minus the
+rows since, and each older boundary is the next checkpoint minus the rows
+in between.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import and_, func, insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select
+
+# Boundaries are built only once this long past, so no transaction that
+# started before a boundary can still commit rows dated before it
+CHECKPOINT_GRACE = timedelta(hours=1)
+
+
+class Ledger(NamedTuple):
+    """A ledger table and the checkpoint table built from it.
+
+    Ledger rows and checkpoints share the key columns; `delta` is the
+    signed change of one ledger row and `value` the checkpoint column it
+    accumulates into. Each `current` select yields the key columns plus a
+    "value" column holding the current value, one select per source table.
+    """
+    entries: type
+    delta: ColumnElement
+    checkpoint: type
+    value: str
+    keys: tuple[str, ...]
+    current: tuple[Select, ...]
+
+
+def as_utc(moment: datetime) -> datetime:
+    """Aware UTC datetime for comparisons and timestamptz parameters.
+
+    Naive datetimes are UTC, like datetime.utcnow() and the timestamps the
+    database returns on SQLite. A naive parameter would be read in the
+    PostgreSQL session's TimeZone instead.
+    """
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def previous_month(boundary: datetime) -> datetime:
+    return month_start(boundary - timedelta(days=1))
+
+
+def closed_boundaries(now: datetime, last_built: datetime) -> list[datetime]:
+    """UTC month boundaries after last_built that are safely in the past, newest first."""
+    boundaries = []
+    boundary = month_start(as_utc(now) - CHECKPOINT_GRACE)
+    while boundary > as_utc(last_built):
+        boundaries.append(boundary)
+        boundary = previous_month(boundary)
+    return boundaries
+
+
+def _deltas(ledger: Ledger, *conditions):
+    """Per-key sum of ledger deltas matching conditions."""
+    keys = [getattr(ledger.entries, key) for key in ledger.keys]
+    return select(*keys, func.sum(ledger.delta).label("delta")).where(*conditions).group_by(*keys).subquery()
+
+
+def _same_keys(ledger: Ledger, left, right):
+    return and_(*[left.c[key] == right[key] for key in ledger.keys])
+
+
+def build_ledger_checkpoints(db: Session, ledger: Ledger, now: Optional[datetime] = None) -> list[datetime]:
+    """Add checkpoints for month boundaries closed since the last run.
+
+    Returns the boundaries built (aware UTC), newest first; commit handled by caller.
+    """
+    checkpoint, created_at = ledger.checkpoint, ledger.entries.created_at
+    last_built = db.scalar(select(func.max(checkpoint.period_end)))
+    if last_built is None:
+        first = db.scalar(select(func.min(created_at)))
+        if first is None:
+            return []
+        last_built = month_start(as_utc(first))
+
+    boundaries = closed_boundaries(now or datetime.now(timezone.utc), last_built)
+    if not boundaries:
+        return []
+
+    columns = [*ledger.keys, "period_end", ledger.value]
+
+    def period_end(moment: datetime):
+        return literal(moment, checkpoint.period_end.type)
+
+    # Newest boundary: current value minus everything since (one statement, one snapshot)
+    since = _deltas(ledger, created_at >= boundaries[0])
+    for current in ledger.current:
+        current = current.subquery()
+        db.execute(insert(checkpoint).from_select(columns, select(
+            *[current.c[key] for key in ledger.keys], period_end(boundaries[0]),
+            current.c.value - func.coalesce(since.c.delta, 0)
+        ).outerjoin(since, _same_keys(ledger, since, current.c))))
+
+    # Older boundaries: the next checkpoint minus the rows in between
+    keys = {key: getattr(checkpoint, key) for key in ledger.keys}
+    for newer, older in zip(boundaries, boundaries[1:]):
+        between = _deltas(ledger, created_at >= older, created_at < newer)
+        db.execute(insert(checkpoint).from_select(columns, select(
+            *keys.values(), period_end(older),
+            getattr(checkpoint, ledger.value) - func.coalesce(between.c.delta, 0)
+        ).outerjoin(between, _same_keys(ledger, between, keys)).where(checkpoint.period_end == newer)))
+
+    return boundaries
@@ -0,0 +1,109 @@
+"""Idempotency keys for retried create requests.
+
+A request sent with an ``Idempotency-Key`` header stores its response in
+the same transaction as its writes. A retry with the same key replays the
+stored response without running the write path again. Two attempts that
+race past the lookup both run, but the key's primary key lets only one of
+them commit: the other rolls back and replays the winner's response.
+"""
+import hashlib
+import itertools
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.helpers import dialect_insert
+from app.models.idempotency import IdempotencyKey
+
+# Expired keys are purged by every Nth stored response (per worker)
+PURGE_EVERY = 100
+
+_stored = itertools.count(1)
+
+
+class IdempotentRequest(NamedTuple):
+    user_id: UUID
+    endpoint: str
+    key: str
+    request_hash: str
+
+
+def idempotent_request(
+    user_id: UUID, endpoint: str, key: Optional[str], data: BaseModel
+) -> Optional[IdempotentRequest]:
+    """Describe a keyed request, or None when no key was sent."""
+    if not key:
+        return None
+    request_hash = hashlib.sha256(data.model_dump_json().encode()).hexdigest()
+    return IdempotentRequest(user_id, endpoint, key, request_hash)
+
+
+def _replay(record: IdempotencyKey) -> Response:
+    return Response(
+        content=record.response_body, status_code=record.status_code,
+        media_type="application/json", headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def find_response(db: Session, request: IdempotentRequest) -> Optional[Response]:
+    """Stored response for a retried request, or None on first use of the key."""
+    record = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == request.user_id,
+        IdempotencyKey.endpoint == request.endpoint,
+        IdempotencyKey.key == request.key,
+        IdempotencyKey.expires_at > datetime.utcnow()
+    ).first()
+    if record is None:
+        return None
+    if record.request_hash != request.request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    return _replay(record)
+
+
+def commit_response(db: Session, request: IdempotentRequest, status_code: int, body: str) -> Response:
+    """Store the response with the request's pending writes and commit.
+
+    If a concurrent request with the same key committed first, the pending
+    writes are rolled back and its response is replayed instead.
+    """
+    now = datetime.utcnow()
+    table = IdempotencyKey.__table__
+    stmt = dialect_insert(db)(table).values(
+        user_id=request.user_id,
+        endpoint=request.endpoint,
+        key=request.key,
+        request_hash=request.request_hash,
+        status_code=status_code,
+        response_body=body,
+        expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    )
+    # An expired key may be reused; a live one belongs to the earlier request
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "endpoint", "key"],
+        set_={c: stmt.excluded[c] for c in ("request_hash", "status_code", "response_body", "expires_at")},
+        where=table.c.expires_at <= now
+    ).returning(table.c.key)
+
+    if db.execute(stmt).first() is None:
+        db.rollback()
+        replayed = find_response(db, request)
+        if replayed is None:
+            raise HTTPException(status_code=409, detail="Conflicting request with the same Idempotency-Key")
+        return replayed
+
+    if next(_stored) % PURGE_EVERY == 0:
+        purge_expired(db)
+    db.commit()
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+def purge_expired(db: Session) -> int:
+    """Delete expired keys; commit handled by caller."""
+    return db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
@@ -0,0 +1,100 @@
+"""Inventory service - atomic, set-based stock mutations."""
+from collections import defaultdict
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy import case, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.models.stock import StockMovement, MovementType
+
+
+class StockChange(NamedTuple):
+    """One stock movement request; delta is signed (negative removes stock)."""
+    product_id: UUID
+    delta: int
+    reason: Optional[str] = None
+
+
+class ProductNotFoundError(Exception):
+    def __init__(self, product_id: UUID):
+        self.product_id = product_id
+        super().__init__(f"Product {product_id} not found")
+
+
+class InsufficientStockError(Exception):
+    def __init__(self, sku: str):
+        self.sku = sku
+        super().__init__(f"Insufficient stock for {sku}")
+
+
+def apply_stock_changes(
+    db: Session,
+    changes: list[StockChange],
+    user_id: UUID,
+    movement_type: MovementType,
+    allow_negative: bool = False
+) -> list[StockMovement]:
+    """Apply stock changes and record one movement per change.
+
+    Deltas are aggregated per product and applied with a single conditional
+    ``UPDATE ... RETURNING``, so concurrent writers can never drive stock
+    below zero or lose an update. When several products are touched, their
+    rows are locked first in primary-key order to avoid deadlocks between
+    overlapping multi-product updates. All movements are inserted in one
+    bulk statement and returned in the order of ``changes``.
+
+    On error the UPDATE may have been partially applied: callers must roll
+    back the transaction.
+    """
+    if not changes:
+        return []
+
+    totals = defaultdict(int)
+    for change in changes:
+        totals[change.product_id] += change.delta
+    product_ids = sorted(totals)
+
+    if len(product_ids) > 1:
+        db.query(Product.id).filter(
+            Product.id.in_(product_ids)
+        ).order_by(Product.id).with_for_update().all()
+
+    delta = case(*[(Product.id == pid, totals[pid]) for pid in product_ids], else_=0)
+    stmt = update(Product).where(Product.id.in_(product_ids))
+    if not allow_negative:
+        stmt = stmt.where(Product.current_stock + delta >= 0)
+    stmt = stmt.values(current_stock=Product.current_stock + delta).returning(
+        Product.id, Product.current_stock
+    ).execution_options(synchronize_session=False)
+    stock_after = {row[0]: row[1] for row in db.execute(stmt)}
+
+    if len(stock_after) < len(product_ids):
+        missing = [pid for pid in product_ids if pid not in stock_after]
+        skus = dict(db.query(Product.id, Product.sku).filter(Product.id.in_(missing)).all())
+        for pid in missing:
+            if pid not in skus:
+                raise ProductNotFoundError(pid)
+        raise InsufficientStockError(skus[missing[0]])
+
+    # Rebuild each product's before/after chain from its final stock
+    running = {pid: stock_after[pid] - totals[pid] for pid in product_ids}
+    rows = []
+    for change in changes:
+        before = running[change.product_id]
+        running[change.product_id] = before + change.delta
+        rows.append({
+            "product_id": change.product_id,
+            "created_by": user_id,
+            "type": movement_type,
+            "quantity": change.delta if movement_type == MovementType.ADJUST else abs(change.delta),
+            "stock_before": before,
+            "stock_after": before + change.delta,
+            "reason": change.reason,
+        })
+
+    return list(db.scalars(
+        insert(StockMovement).returning(StockMovement, sort_by_parameter_order=True),
+        rows
+    ))
@@ -0,0 +1,307 @@
+"""Reporting service - set-based aggregates for dashboard metrics."""
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import chain
+from typing import NamedTuple
+
+from sqlalchemy import event, func, inspect, literal, select
+from sqlalchemy.orm import Session
+
+from app.cache import TTLCache
+from app.config import settings
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.models.order import SalesOrder, REVENUE_STATUSES
+from app.models.stock import StockMovement, MovementType
+from app.helpers import business_date, date_bucket, next_date_bucket
+from app.models.report import DailySalesTotal
+from app.schemas.reports import (
+    DashboardMetrics, RevenueGranularity, RevenueDataPoint, ARAgingBuckets, ARAgingItem
+)
+
+
+def _dec(value) -> Decimal:
+    """Normalize aggregate results (None/int/float/Decimal) to Decimal."""
+    return Decimal(str(value or 0))
+
+
+class ARAPFigures(NamedTuple):
+    """Receivables (negative balances) and payables (positive) across customers and suppliers."""
+    receivables: Decimal
+    debtor_count: int
+    payables: Decimal
+    creditor_count: int
+    total_customers: int
+
+
+class ARAging(NamedTuple):
+    """Open order balances per customer by age, largest first."""
+    as_of: date
+    items: list[ARAgingItem]
+    totals: ARAgingBuckets
+
+
+# Single entry; see track_balance_changes for what evicts it
+arap_cache = TTLCache(settings.ARAP_CACHE_TTL_SECONDS, maxsize=1)
+_arap_generation = 0
+
+# One entry per business day; evicted like the AR/AP figures and by order changes
+aging_cache = TTLCache(settings.AR_AGING_CACHE_TTL_SECONDS, maxsize=2)
+_aging_generation = 0
+
+# Fields of SalesOrder that move an order's open balance in or out of the aging report
+AGING_ORDER_FIELDS = ("status", "total", "paid_amount", "order_date", "business_date", "deleted_at")
+
+
+def compute_arap(db: Session) -> ARAPFigures:
+    """AR/AP figures in two statements (one per table) using FILTERed aggregates."""
+    customers = db.query(
+        func.sum(Customer.total_debt).filter(Customer.total_debt < 0),
+        func.count(Customer.id).filter(Customer.total_debt < 0),
+        func.sum(Customer.total_debt).filter(Customer.total_debt > 0),
+        func.count(Customer.id).filter(Customer.total_debt > 0),
+        func.count(Customer.id),
+    ).one()
+    suppliers = db.query(
+        func.sum(Supplier.total_payable).filter(Supplier.total_payable < 0),
+        func.count(Supplier.id).filter(Supplier.total_payable < 0),
+        func.sum(Supplier.total_payable).filter(Supplier.total_payable > 0),
+        func.count(Supplier.id).filter(Supplier.total_payable > 0),
+    ).one()
+    return ARAPFigures(
+        receivables=_dec(customers[0]) + _dec(suppliers[0]),
+        debtor_count=(customers[1] or 0) + (suppliers[1] or 0),
+        payables=_dec(suppliers[2]) + _dec(customers[2]),
+        creditor_count=(suppliers[3] or 0) + (customers[3] or 0),
+        total_customers=customers[4] or 0,
+    )
+
+
+def get_arap(db: Session) -> ARAPFigures:
+    """Cached AR/AP figures; recomputed after any committed balance change."""
+    figures = arap_cache.get("arap")
+    if figures is None:
+        # Don't cache a result computed while a balance change was committing
+        generation = _arap_generation
+        figures = compute_arap(db)
+        if generation == _arap_generation:
+            arap_cache.set("arap", figures)
+    return figures
+
+
+def invalidate_arap():
+    global _arap_generation
+    _arap_generation += 1
+    arap_cache.invalidate()
+
+
+def compute_revenue_series(
+    db: Session, start: date, end: date, granularity: RevenueGranularity
+) -> list[RevenueDataPoint]:
+    """Revenue per day/week/month bucket from start to end inclusive, in one statement.
+
+    Sums the daily rollup over a range on its business_date key and joins
+    the totals onto a recursive series of buckets, so empty buckets come
+    back as zeros and the result has one row per bucket. The first and last
+    buckets only count the days inside the range.
+    """
+    g = granularity.value
+    first = date_bucket(db, g, literal(start, DailySalesTotal.business_date.type))
+    last = date_bucket(db, g, literal(end, DailySalesTotal.business_date.type))
+    buckets = select(first.label("bucket")).cte("buckets", recursive=True)
+    step = next_date_bucket(db, g, buckets.c.bucket)
+    buckets = buckets.union_all(select(step).where(step <= last))
+
+    bucket = date_bucket(db, g, DailySalesTotal.business_date)
+    totals = select(
+        bucket.label("bucket"),
+        func.sum(DailySalesTotal.revenue).label("revenue"),
+        func.sum(DailySalesTotal.order_count).label("order_count"),
+    ).where(
+        DailySalesTotal.business_date >= start,
+        DailySalesTotal.business_date <= end
+    ).group_by(bucket).subquery("totals")
+
+    rows = db.execute(
+        select(buckets.c.bucket, totals.c.revenue, totals.c.order_count)
+        .outerjoin(totals, totals.c.bucket == buckets.c.bucket)
+        .order_by(buckets.c.bucket)
+    ).all()
+    return [
+        RevenueDataPoint(period=r[0].isoformat(), revenue=_dec(r[1]), order_count=r[2] or 0)
+        for r in rows
+    ]
+
+
+def compute_ar_aging(db: Session, today: date) -> ARAging:
+    """Age open order balances (total - paid_amount) by business date.
+
+    One statement grouped by customer, with a FILTERed SUM per bucket;
+    orders count once confirmed until fully paid, cancelled or deleted.
+    """
+    open_amount = SalesOrder.total - SalesOrder.paid_amount
+    d30, d60, d90 = (today - timedelta(days=n) for n in (30, 60, 90))
+    day = SalesOrder.business_date
+    total_open = func.sum(open_amount)
+    rows = db.query(
+        Customer.id,
+        Customer.code,
+        Customer.name,
+        func.sum(open_amount).filter(day >= d30),
+        func.sum(open_amount).filter(day >= d60, day < d30),
+        func.sum(open_amount).filter(day >= d90, day < d60),
+        func.sum(open_amount).filter(day < d90),
+        total_open,
+    ).join(SalesOrder, SalesOrder.customer_id == Customer.id).filter(
+        SalesOrder.deleted_at == None,
+        SalesOrder.status.in_(REVENUE_STATUSES),
+        open_amount > 0
+    ).group_by(Customer.id, Customer.code, Customer.name).order_by(
+        total_open.desc(), Customer.code
+    ).all()
+
+    items = [
+        ARAgingItem(
+            customer_id=r[0], customer_code=r[1], customer_name=r[2],
+            days_0_30=_dec(r[3]), days_31_60=_dec(r[4]), days_61_90=_dec(r[5]),
+            days_over_90=_dec(r[6]), total_open=_dec(r[7])
+        )
+        for r in rows
+    ]
+    totals = ARAgingBuckets(**{
+        field: sum((getattr(item, field) for item in items), Decimal("0"))
+        for field in ARAgingBuckets.model_fields
+    })
+    return ARAging(as_of=today, items=items, totals=totals)
+
+
+def get_ar_aging(db: Session) -> ARAging:
+    """Aging as of today's business date, cached until receivables change."""
+    today = business_date()
+    aging = aging_cache.get(today)
+    if aging is None:
+        generation = _aging_generation
+        aging = compute_ar_aging(db, today)
+        if generation == _aging_generation:
+            aging_cache.set(today, aging)
+    return aging
+
+
+def invalidate_ar_aging():
+    global _aging_generation
+    _aging_generation += 1
+    aging_cache.invalidate()
+
+
+@event.listens_for(Session, "after_flush")
+def track_balance_changes(session, flush_context):
+    """Flag the transaction when customers/suppliers or their balances change,
+    or when an order's open balance may have."""
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, (Customer, Supplier)):
+            session.info["balances_changed"] = True
+        elif isinstance(obj, SalesOrder) and obj in session.deleted:
+            session.info["orders_changed"] = True  # new orders are drafts
+    for obj in session.dirty:
+        if isinstance(obj, SalesOrder):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in AGING_ORDER_FIELDS):
+                session.info["orders_changed"] = True
+            continue
+        field = "total_debt" if isinstance(obj, Customer) else "total_payable" if isinstance(obj, Supplier) else None
+        if field and inspect(obj).attrs[field].history.has_changes():
+            session.info["balances_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def track_bulk_balance_changes(orm_execute_state):
+    """Set-based UPDATE/DELETE of customers, suppliers (e.g. order confirmation) or orders.
+
+    Matched by table name so Core table statements run through the session
+    (such as executemany balance updates) are seen as well as ORM ones.
+    """
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = orm_execute_state.statement.table.name
+        if table in (Customer.__tablename__, Supplier.__tablename__):
+            orm_execute_state.session.info["balances_changed"] = True
+        elif table == SalesOrder.__tablename__:
+            orm_execute_state.session.info["orders_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    balances_changed = session.info.pop("balances_changed", False)
+    orders_changed = session.info.pop("orders_changed", False)
+    if balances_changed:
+        invalidate_arap()
+    if balances_changed or orders_changed:
+        invalidate_ar_aging()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop("balances_changed", None)
+    session.info.pop("orders_changed", None)
+
+
+def compute_dashboard_metrics(db: Session) -> DashboardMetrics:
+    """Compute the dashboard payload with a fixed number of aggregate queries.
+
+    The query count does not depend on the number of orders, line items or
+    stock movements: every figure is a SUM/COUNT with a FILTER clause, and
+    sales figures are read from the daily rollup. AR/AP figures are cached.
+    """
+    today = business_date()
+    month_start = today.replace(day=1)
+
+    # Sales figures from the daily rollup: at most one row per day of the month
+    is_today = DailySalesTotal.business_date == today
+    profit = DailySalesTotal.subtotal - DailySalesTotal.cost
+    sales = db.query(
+        func.sum(DailySalesTotal.revenue).filter(is_today),
+        func.sum(DailySalesTotal.collected).filter(is_today),
+        func.sum(profit).filter(is_today),
+        func.sum(DailySalesTotal.order_count).filter(is_today),
+        func.sum(DailySalesTotal.revenue),
+        func.sum(DailySalesTotal.collected),
+        func.sum(profit),
+        func.sum(DailySalesTotal.order_count),
+    ).filter(DailySalesTotal.business_date >= month_start).one()
+
+    # Receivables/Payables (Cross-entity) - Return as Absolute for UI
+    arap = get_arap(db)
+
+    # Month Import Cost (Stock IN movements × cost_price)
+    month_import_cost = db.query(
+        func.sum(Product.cost_price * StockMovement.quantity)
+    ).select_from(StockMovement).join(Product, Product.id == StockMovement.product_id).filter(
+        StockMovement.business_date >= month_start,
+        StockMovement.type == MovementType.IN
+    ).scalar()
+
+    products = db.query(
+        func.count(Product.id),
+        func.count(Product.id).filter(Product.current_stock <= Product.min_stock),
+    ).filter(Product.is_active == True).one()
+
+    return DashboardMetrics(
+        today_revenue=_dec(sales[0]),
+        today_collected=_dec(sales[1]),
+        today_debt=_dec(sales[0]) - _dec(sales[1]),
+        today_profit=_dec(sales[2]),
+        today_count=sales[3] or 0,
+        month_revenue=_dec(sales[4]),
+        month_collected=_dec(sales[5]),
+        month_debt=_dec(sales[4]) - _dec(sales[5]),
+        month_profit=_dec(sales[6]),
+        month_count=sales[7] or 0,
+        month_import_cost=_dec(month_import_cost),
+        total_receivables=abs(arap.receivables),
+        total_payables=abs(arap.payables),
+        debtor_count=arap.debtor_count,
+        creditor_count=arap.creditor_count,
+        total_customers=arap.total_customers,
+        total_products=products[0] or 0,
+        low_stock_count=products[1] or 0
+    )
@@ -0,0 +1,148 @@
+"""Daily sales rollup maintenance.
+
+The rollup tables are updated in the same transaction as the order status
+change that affects them, so reports can read per-day figures instead of
+rescanning orders and line items.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import func, select, insert, distinct
+from sqlalchemy.orm import Session
+
+from app.helpers import business_date, dialect_insert
+from app.models.order import SalesOrder, SalesOrderItem, REVENUE_STATUSES
+from app.models.report import DailySalesRollup, DailySalesTotal
+
+
+def _upsert_add(db: Session, model, rows: list[dict], keys: list[str]):
+    """Insert rows, or add their values onto the existing rows for the same key."""
+    table = model.__table__
+    stmt = dialect_insert(db)(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={c: table.c[c] + stmt.excluded[c] for c in rows[0] if c not in keys}
+    )
+    db.execute(stmt)
+
+
+def business_date_of(order: SalesOrder):
+    """Date an order is reported under (set on insert; computed if not flushed yet)."""
+    return order.business_date or business_date(order.order_date)
+
+
+def apply_order(db: Session, order: SalesOrder, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) a confirmed order's figures."""
+    apply_orders(db, [order], sign)
+
+
+def apply_orders(db: Session, orders: list[SalesOrder], sign: int = 1):
+    """Add or remove several orders' figures with one upsert per rollup table."""
+    per_product, per_day = {}, {}
+    for order in orders:
+        business_date = business_date_of(order)
+        day = per_day.setdefault(business_date, {
+            "revenue": Decimal("0"), "subtotal": Decimal("0"), "cost": Decimal("0"),
+            "collected": Decimal("0"), "order_count": 0,
+        })
+        order_products = set()
+        for item in order.line_items:
+            agg = per_product.setdefault((business_date, item.product_id), {
+                "revenue": Decimal("0"), "quantity": 0, "cost": Decimal("0"), "order_count": 0
+            })
+            agg["revenue"] += item.line_total
+            agg["quantity"] += item.quantity
+            agg["cost"] += item.cost_price * item.quantity
+            if item.product_id not in order_products:
+                order_products.add(item.product_id)
+                agg["order_count"] += 1
+            day["cost"] += item.cost_price * item.quantity
+        day["revenue"] += order.total
+        day["subtotal"] += order.subtotal
+        day["collected"] += order.paid_amount
+        day["order_count"] += 1
+
+    if per_product:
+        _upsert_add(db, DailySalesRollup, [
+            {
+                "business_date": business_date,
+                "product_id": product_id,
+                "revenue": sign * agg["revenue"],
+                "quantity": sign * agg["quantity"],
+                "cost": sign * agg["cost"],
+                "order_count": sign * agg["order_count"],
+            }
+            for (business_date, product_id), agg in sorted(per_product.items())
+        ], ["business_date", "product_id"])
+
+    if per_day:
+        _upsert_add(db, DailySalesTotal, [
+            {"business_date": business_date, **{k: sign * v for k, v in day.items()}}
+            for business_date, day in sorted(per_day.items())
+        ], ["business_date"])
+
+
+def apply_collection(db: Session, order: SalesOrder, amount: Decimal):
+    """Track a payment (or its reversal) against an order already in the rollup."""
+    apply_collections(db, [(order, amount)])
+
+
+def apply_collections(db: Session, collections: list):
+    """Track (order, amount) pairs with one upsert; orders outside the rollup are skipped.
+
+    Anything with the order's status, deleted_at and business_date attributes
+    works as an order, e.g. a selected row.
+    """
+    per_day = defaultdict(Decimal)
+    for order, amount in collections:
+        if order.status in REVENUE_STATUSES and order.deleted_at is None:
+            per_day[business_date_of(order)] += amount
+    if per_day:
+        _upsert_add(db, DailySalesTotal, [
+            {"business_date": business_date, "collected": amount}
+            for business_date, amount in sorted(per_day.items())
+        ], ["business_date"])
+
+
+def rebuild_sales_rollup(db: Session):
+    """Recompute both rollup tables from sales orders (backfill/repair)."""
+    db.query(DailySalesRollup).delete(synchronize_session=False)
+    db.query(DailySalesTotal).delete(synchronize_session=False)
+
+    day = SalesOrder.business_date
+    filters = [SalesOrder.status.in_(REVENUE_STATUSES), SalesOrder.deleted_at == None]
+    line_cost = SalesOrderItem.cost_price * SalesOrderItem.quantity
+
+    per_product = select(
+        day,
+        SalesOrderItem.product_id,
+        func.sum(SalesOrderItem.line_total),
+        func.sum(SalesOrderItem.quantity),
+        func.sum(line_cost),
+        func.count(distinct(SalesOrderItem.order_id)),
+    ).join(SalesOrder, SalesOrder.id == SalesOrderItem.order_id).where(
+        *filters
+    ).group_by(day, SalesOrderItem.product_id)
+    db.execute(insert(DailySalesRollup).from_select(
+        ["business_date", "product_id", "revenue", "quantity", "cost", "order_count"],
+        per_product
+    ))
+
+    order_cost = select(
+        SalesOrderItem.order_id,
+        func.sum(line_cost).label("cost"),
+    ).group_by(SalesOrderItem.order_id).subquery()
+    totals = select(
+        day,
+        func.sum(SalesOrder.total),
+        func.sum(SalesOrder.subtotal),
+        func.coalesce(func.sum(order_cost.c.cost), 0),
+        func.sum(SalesOrder.paid_amount),
+        func.count(SalesOrder.id),
+    ).outerjoin(order_cost, order_cost.c.order_id == SalesOrder.id).where(
+        *filters
+    ).group_by(day)
+    db.execute(insert(DailySalesTotal).from_select(
+        ["business_date", "revenue", "subtotal", "cost", "collected", "order_count"],
+        totals
+    ))
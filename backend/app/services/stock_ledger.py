@@ -0,0 +1,99 @@
+"""Stock ledger checkpoints and as-of-date stock.
+
+A checkpoint stores each product's stock at a month boundary (every
+movement created before the boundary applied). Stock at any other time is
+the nearest checkpoint plus the product's movements in between, so a query
+never replays the whole ledger.
+
+Checkpoints are derived backwards from current stock, which is always
+authoritative (products may start with stock that has no movement); see
+services/checkpoints.py.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.models.stock import StockMovement, StockCheckpoint, MovementType
+from app.services.checkpoints import Ledger, as_utc, build_ledger_checkpoints
+
+# Signed change of a movement (ADJUST quantities are already signed)
+signed_quantity = case(
+    (StockMovement.type == MovementType.OUT, -StockMovement.quantity),
+    else_=StockMovement.quantity
+)
+
+STOCK_LEDGER = Ledger(
+    entries=StockMovement, delta=signed_quantity, checkpoint=StockCheckpoint, value="stock",
+    keys=("product_id",),
+    current=(select(Product.id.label("product_id"), Product.current_stock.label("value")),),
+)
+
+
+def build_checkpoints(db: Session, now: Optional[datetime] = None) -> list[datetime]:
+    """Add stock checkpoints for month boundaries closed since the last run."""
+    return build_ledger_checkpoints(db, STOCK_LEDGER, now)
+
+
+def _nearest_checkpoints(db: Session, product_ids, at: datetime, before: bool) -> dict:
+    """product_id -> (period_end, stock) of the latest checkpoint at or before
+    `at` (before=True), or the earliest one after it."""
+    edge = func.max if before else func.min
+    bound = StockCheckpoint.period_end <= at if before else StockCheckpoint.period_end > at
+    nearest = select(
+        StockCheckpoint.product_id, edge(StockCheckpoint.period_end).label("period_end")
+    ).where(StockCheckpoint.product_id.in_(product_ids), bound).group_by(
+        StockCheckpoint.product_id
+    ).subquery()
+    rows = db.execute(select(
+        StockCheckpoint.product_id, StockCheckpoint.period_end, StockCheckpoint.stock
+    ).join(nearest, (nearest.c.product_id == StockCheckpoint.product_id)
+           & (nearest.c.period_end == StockCheckpoint.period_end)))
+    return {pid: (as_utc(period_end), stock) for pid, period_end, stock in rows}
+
+
+def stock_as_of(db: Session, product_ids: list[UUID], at: datetime) -> dict[UUID, int]:
+    """Stock of each existing product after every movement created at or before `at`.
+
+    Each product starts from its nearest checkpoint (or current stock when
+    it has none) and scans only its movements between that point and `at`.
+    Products sharing an anchor are scanned in one grouped query.
+    """
+    at = as_utc(at)
+    current = dict(db.execute(
+        select(Product.id, Product.current_stock).where(Product.id.in_(product_ids))
+    ).all())
+    if not current:
+        return {}
+
+    anchors = _nearest_checkpoints(db, list(current), at, before=True)
+    missing = [pid for pid in current if pid not in anchors]
+    if missing:
+        anchors.update(_nearest_checkpoints(db, missing, at, before=False))
+    for pid, stock in current.items():
+        anchors.setdefault(pid, (None, stock))  # None: now
+
+    groups = defaultdict(list)
+    for pid, (anchor, _) in anchors.items():
+        groups[anchor].append(pid)
+
+    result = {}
+    for anchor, pids in groups.items():
+        if anchor is not None and anchor <= at:
+            sign, window = 1, [StockMovement.created_at >= anchor, StockMovement.created_at <= at]
+        else:
+            sign, window = -1, [StockMovement.created_at > at]
+            if anchor is not None:
+                window.append(StockMovement.created_at < anchor)
+        deltas = dict(db.execute(
+            select(StockMovement.product_id, func.sum(signed_quantity)).where(
+                StockMovement.product_id.in_(pids), *window
+            ).group_by(StockMovement.product_id)
+        ).all())
+        for pid in pids:
+            result[pid] = anchors[pid][1] + sign * (deltas.get(pid) or 0)
+    return result
@@ -0,0 +1,205 @@
+"""
+Stock ledger consistency verifier.
+Run: python -m app.verify_stock_ledger --workers 8
+
+Checks that each product's stock movements form an unbroken
+stock_before -> stock_after chain ending at Product.current_stock. The
+product key space is split into ranges that worker processes verify in
+parallel; each worker streams its range's movements ordered by product and
+time through a server-side cursor, so memory stays flat however large the
+ledger is.
+
+Reported issues:
+  break     a movement's stock_before differs from the previous stock_after
+  mismatch  stock_after - stock_before differs from the movement's quantity
+  drift     the last stock_after differs from the product's current stock
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+from multiprocessing import get_context
+from typing import NamedTuple, Optional
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.models.stock import StockMovement, MovementType
+
+# Rows fetched per round trip from the server-side cursor
+STREAM_ROWS = 10_000
+# Issues kept per range for the report (all are counted)
+MAX_ISSUES = 100
+
+
+class LedgerIssue(NamedTuple):
+    kind: str
+    product_id: object
+    movement_id: Optional[object]
+    expected: int
+    actual: int
+
+
+class LedgerReport(NamedTuple):
+    products: int
+    movements: int
+    counts: Counter  # issue kind -> number found
+    issues: list[LedgerIssue]  # up to MAX_ISSUES per range
+
+    @property
+    def ok(self) -> bool:
+        return not self.counts
+
+
+class _ChainChecker:
+    """Checks movements fed in (product, created_at) order.
+
+    Movements written in one transaction can share a timestamp; such a tie
+    group is put in chain order before checking instead of failing on the
+    arbitrary order the database returns them in.
+    """
+
+    def __init__(self, current_stock: dict):
+        self.current_stock = current_stock
+        self.product_id = None
+        self.expected = None
+        self.group = []
+        self.products = 0
+        self.movements = 0
+        self.counts = Counter()
+        self.issues = []
+
+    def add(self, row):
+        if row.product_id != self.product_id:
+            self._end_product()
+            self.product_id, self.expected = row.product_id, None
+            self.products += 1
+        elif row.created_at != self.group[0].created_at:
+            self._check_group()
+        self.group.append(row)
+        self.movements += 1
+
+    def finish(self):
+        self._end_product()
+
+    def _report(self, kind, movement_id, expected, actual):
+        self.counts[kind] += 1
+        if len(self.issues) < MAX_ISSUES:
+            self.issues.append(LedgerIssue(kind, self.product_id, movement_id, expected, actual))
+
+    def _check_group(self):
+        pending = self.group
+        while pending:
+            if self.expected is None:
+                # Chain start: the movement no other one in the group leads into
+                afters = {m.stock_after for m in pending}
+                row = next((m for m in pending if m.stock_before not in afters), pending[0])
+            else:
+                row = next((m for m in pending if m.stock_before == self.expected), pending[0])
+                if row.stock_before != self.expected:
+                    self._report("break", row.id, self.expected, row.stock_before)
+            pending.remove(row)
+
+            delta = -row.quantity if row.type == MovementType.OUT else row.quantity
+            if row.stock_after - row.stock_before != delta:
+                self._report("mismatch", row.id, row.stock_before + delta, row.stock_after)
+            self.expected = row.stock_after
+        self.group = []
+
+    def _end_product(self):
+        if self.product_id is None:
+            return
+        self._check_group()
+        current = self.current_stock[self.product_id]
+        if self.expected != current:
+            self._report("drift", None, current, self.expected)
+
+
+def _verify_range(url: str, first_id, last_id) -> tuple:
+    """Verify products first_id..last_id (inclusive) on a connection of its own."""
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            in_range = Product.id.between(first_id, last_id)
+            checker = _ChainChecker(dict(conn.execute(
+                select(Product.id, Product.current_stock).where(in_range)
+            ).all()))
+            rows = conn.execution_options(yield_per=STREAM_ROWS).execute(
+                select(
+                    StockMovement.product_id, StockMovement.created_at, StockMovement.id,
+                    StockMovement.type, StockMovement.quantity,
+                    StockMovement.stock_before, StockMovement.stock_after,
+                ).where(StockMovement.product_id.between(first_id, last_id)).order_by(
+                    StockMovement.product_id, StockMovement.created_at, StockMovement.id
+                )
+            )
+            for row in rows:
+                checker.add(row)
+            checker.finish()
+    finally:
+        engine.dispose()
+    return checker.products, checker.movements, checker.counts, checker.issues
+
+
+def product_ranges(db: Session, count: int) -> list[tuple]:
+    """Split the product key space into up to count inclusive (first, last) id ranges."""
+    ids = db.scalars(select(Product.id).order_by(Product.id)).all()
+    size = max(1, -(-len(ids) // count))
+    return [(chunk[0], chunk[-1]) for chunk in (ids[i:i + size] for i in range(0, len(ids), size))]
+
+
+def verify_ledger(url: str, workers: int = 1, ranges_per_worker: int = 4) -> LedgerReport:
+    """Verify every product's movement chain in the database at url."""
+    engine = create_engine(url)
+    try:
+        with Session(engine) as db:
+            ranges = product_ranges(db, workers * ranges_per_worker)
+    finally:
+        engine.dispose()
+
+    args = [(url, first, last) for first, last in ranges]
+    if workers > 1:
+        with get_context("spawn").Pool(workers) as pool:
+            results = pool.starmap(_verify_range, args)
+    else:
+        results = [_verify_range(*a) for a in args]
+
+    counts, issues = Counter(), []
+    for _, _, range_counts, range_issues in results:
+        counts.update(range_counts)
+        issues.extend(range_issues)
+    return LedgerReport(
+        products=sum(r[0] for r in results),
+        movements=sum(r[1] for r in results),
+        counts=counts,
+        issues=issues,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify stock movement chains against current stock.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ranges-per-worker", type=int, default=4,
+                        help="smaller ranges balance skewed products across workers")
+    parser.add_argument("--database-url", default=None, help="default: the configured database")
+    args = parser.parse_args()
+
+    from app.config import settings
+    started = time.perf_counter()
+    report = verify_ledger(args.database_url or settings.DATABASE_URL, args.workers, args.ranges_per_worker)
+    elapsed = time.perf_counter() - started
+
+    print(f"Checked {report.movements:,} movements of {report.products:,} products in {elapsed:.0f}s")
+    if report.ok:
+        print("✅ Stock ledger is consistent")
+        return
+    print("❌ " + ", ".join(f"{kind}: {n:,}" for kind, n in sorted(report.counts.items())))
+    for issue in report.issues:
+        print(f"   {issue.kind:<8} product={issue.product_id} movement={issue.movement_id} "
+              f"expected={issue.expected} actual={issue.actual}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
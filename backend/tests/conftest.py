@@ -1,12 +1,18 @@
 """Test configuration for pytest."""
+import os
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.database import Base, get_db
+from app.services.auth import user_cache
+from app.services.reports import arap_cache, aging_cache
+from app.services.numbering import allocator
 
 
 # Test database - in-memory SQLite for fast tests
@@ -33,6 +39,10 @@ def override_get_db():
 def setup_test_db():
     """Create tables for each test."""
     Base.metadata.create_all(bind=engine)
+    user_cache.reset()
+    arap_cache.reset()
+    aging_cache.reset()
+    allocator.reset()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -45,9 +55,84 @@ def db():
     db.close()
 
 
+@pytest.fixture(scope="function")
+def concurrent_db(tmp_path):
+    """Session factory on a file database that several threads/processes can share.
+    
+    Set TEST_CONCURRENCY_DATABASE_URL to run concurrency tests against PostgreSQL.
+    """
+    url = os.environ.get("TEST_CONCURRENCY_DATABASE_URL") or f"sqlite:///{tmp_path / 'concurrency.db'}"
+    connect_args = {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
+    shared_engine = create_engine(url, connect_args=connect_args, pool_size=20, max_overflow=10)
+    Base.metadata.create_all(bind=shared_engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=shared_engine)
+    Base.metadata.drop_all(bind=shared_engine)
+    shared_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def non_utc_db(concurrent_db):
+    """concurrent_db whose PostgreSQL sessions run with TimeZone UTC+7.
+
+    PostgreSQL reads naive timestamp parameters in the session TimeZone;
+    SQLite has none and runs the same tests unchanged.
+    """
+    engine = concurrent_db.kw["bind"]
+    if engine.dialect.name == "postgresql":
+        @event.listens_for(engine, "connect")
+        def set_time_zone(dbapi_connection, connection_record):
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute("SET TIME ZONE 'Asia/Ho_Chi_Minh'")
+            dbapi_connection.commit()
+        engine.dispose()
+    return concurrent_db
+
+
 @pytest.fixture(scope="function")
 def client():
     """Create test client with DB override."""
     app.dependency_overrides[get_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
+
+
+class QueryCounter:
+    """Counts SQL statements executed on the test engine."""
+    
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+    
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@pytest.fixture(scope="function")
+def count_queries():
+    """Context manager counting statements issued inside the block."""
+    @contextmanager
+    def _count():
+        counter = QueryCounter()
+        event.listen(engine, "before_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, "before_cursor_execute", counter)
+    return _count
+
+
+@pytest.fixture(scope="function")
+def query_budget(count_queries):
+    """Context manager failing the test if the block issues more than max_queries statements."""
+    @contextmanager
+    def _budget(max_queries: int):
+        with count_queries() as counter:
+            yield counter
+        if counter.count > max_queries:
+            listing = "\n".join(f"  {s}" for s in counter.statements)
+            pytest.fail(
+                f"Query budget exceeded: {counter.count} statements, budget {max_queries}:\n{listing}",
+                pytrace=False
+            )
+    return _budget
@@ -0,0 +1,194 @@
+"""Authentication tests."""
+import asyncio
+import time
+import httpx
+import pytest
+from app.main import app
+from app.database import get_db
+from app.models.user import User, UserRole
+from app.services import auth
+from app.services.auth import hash_password, pwd_context, user_cache
+
+
+class TestUserCache:
+    """get_current_user serves active users from a per-worker cache."""
+
+    def _setup(self, db, client, email="cache@example.com", role=UserRole.STAFF):
+        user = User(
+            email=email,
+            hashed_password=hash_password("password123"),
+            full_name="Cache User",
+            role=role
+        )
+        db.add(user)
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": email,
+            "password": "password123"
+        })
+        return {"Authorization": f"Bearer {resp.json()['access_token']}"}, user
+
+    def test_users_query_leaves_hot_path(self, client, db, count_queries):
+        """Only the first request for a user reads the users table."""
+        headers, _ = self._setup(db, client)
+
+        with count_queries() as first:
+            assert client.get("/api/products", headers=headers).status_code == 200
+        with count_queries() as second:
+            assert client.get("/api/products", headers=headers).status_code == 200
+
+        assert any("FROM users" in s for s in first.statements)
+        assert not any("FROM users" in s for s in second.statements)
+        assert user_cache.stats()["hits"] == 1
+        assert user_cache.stats()["misses"] == 1
+
+    def test_deactivation_invalidates(self, client, db):
+        """A deactivated user is rejected on the next request."""
+        headers, user = self._setup(db, client)
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+        user.is_active = False
+        db.commit()
+
+        assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+    def test_role_change_invalidates(self, client, db):
+        """A promotion takes effect without waiting for the TTL."""
+        headers, user = self._setup(db, client)
+        assert client.get("/api/audit", headers=headers).status_code == 403
+
+        user.role = UserRole.ADMIN
+        db.commit()
+
+        assert client.get("/api/audit", headers=headers).status_code == 200
+
+    def test_logout_invalidates(self, client, db):
+        """Logout clears the refresh token and evicts the cached user."""
+        headers, user = self._setup(db, client)
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+        assert user.id in user_cache._data
+
+        assert client.post("/api/auth/logout", headers=headers).status_code == 200
+
+        db.refresh(user)
+        assert user.refresh_token is None
+        assert user.id not in user_cache._data
+
+    def test_logout_after_user_deleted(self, client, db):
+        """Logging out a cached user whose row is already gone is not an error."""
+        headers, user = self._setup(db, client)
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+        user_id = user.id
+        db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+        db.commit()
+        assert user_id in user_cache._data
+
+        assert client.post("/api/auth/logout", headers=headers).status_code == 200
+
+    def test_evicted_on_commit_not_flush(self, client, db):
+        """A flushed change only evicts once committed; a rolled-back one never does."""
+        headers, user = self._setup(db, client)
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+        user.role = UserRole.ADMIN
+        db.flush()
+        assert user.id in user_cache._data
+        db.rollback()
+        assert user.id in user_cache._data
+
+        user.role = UserRole.ADMIN
+        db.flush()
+        db.commit()
+        assert user.id not in user_cache._data
+
+    def test_row_read_during_commit_not_cached(self, client, db, monkeypatch):
+        """A user loaded while another user change commits is served but not cached."""
+        headers, user = self._setup(db, client)
+        load = auth.get_user_by_id
+
+        def load_then_commit_elsewhere(session, user_id):
+            found = load(session, user_id)
+            auth.invalidate_users([user_id])  # the concurrent commit lands here
+            return found
+
+        monkeypatch.setattr(auth, "get_user_by_id", load_then_commit_elsewhere)
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+        assert user.id not in user_cache._data
+
+        monkeypatch.setattr(auth, "get_user_by_id", load)
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+        assert user.id in user_cache._data
+
+
+class TestLoginStorm:
+    """A burst of logins does not stall unrelated endpoints."""
+
+    LOGINS = 40
+
+    def _override_db(self, session_factory):
+        def _get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+        app.dependency_overrides[get_db] = _get_db
+
+    def test_other_endpoints_stay_responsive(self, concurrent_db):
+        """Product listing latency stays low while bcrypt is saturated."""
+        db = concurrent_db()
+        db.add(User(
+            email="storm@example.com",
+            # A lower cost than production keeps the run short; the pool still saturates
+            hashed_password=pwd_context.hash("password123", rounds=10),
+            full_name="Storm User",
+            role=UserRole.STAFF
+        ))
+        db.commit()
+        db.close()
+        self._override_db(concurrent_db)
+        credentials = {"email": "storm@example.com", "password": "password123"}
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                token = (await client.post("/api/auth/login", json=credentials)).json()["access_token"]
+                headers = {"Authorization": f"Bearer {token}"}
+
+                async def ping():
+                    start = time.perf_counter()
+                    response = await client.get("/api/products", headers=headers)
+                    assert response.status_code == 200
+                    return time.perf_counter() - start
+
+                baseline = [await ping() for _ in range(5)]
+
+                async def login():
+                    response = await client.post("/api/auth/login", json=credentials)
+                    return response.status_code
+
+                start = time.perf_counter()
+                storm = [asyncio.create_task(login()) for _ in range(self.LOGINS)]
+                during = []
+                while not all(task.done() for task in storm):
+                    during.append(await ping())
+                    await asyncio.sleep(0.01)
+                statuses = await asyncio.gather(*storm)
+                elapsed = time.perf_counter() - start
+                return baseline, during, statuses, elapsed
+
+        try:
+            baseline, during, statuses, elapsed = asyncio.run(run())
+        finally:
+            app.dependency_overrides.clear()
+
+        assert statuses == [200] * self.LOGINS
+        assert during
+        # Without a dedicated pool the logins hold every request thread and a
+        # ping waits for the whole storm (several seconds)
+        assert max(during) < 0.5
+        print(f"\n{self.LOGINS} logins in {elapsed:.2f}s ({self.LOGINS / elapsed:.1f}/sec); "
+              f"/api/products latency baseline {max(baseline) * 1000:.0f} ms, "
+              f"during storm max {max(during) * 1000:.0f} ms over {len(during)} requests")
@@ -0,0 +1,257 @@
+"""Customer/supplier balance ledger and as-of balance tests."""
+import uuid
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from sqlalchemy import event
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.models.balance import BalanceEntry, BalanceCheckpoint, PartyType
+from app.services.auth import hash_password
+from app.services.balances import (
+    BalanceChange, apply_pending_balances, balance_as_of, build_balance_checkpoints, record_balance_changes
+)
+
+
+class TestBalanceLedger:
+    """Every debt/payable change is appended to the ledger."""
+
+    def _setup(self, db, client):
+        user = User(
+            email="balances@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Balance User",
+            role=UserRole.STAFF
+        )
+        product = Product(sku="BAL-P", name="Balance Product", current_stock=10)
+        customer = Customer(code="BALKH01", name="Balance Customer", total_debt=Decimal("-50000"))
+        supplier = Supplier(code="BALSUP01", name="Balance Supplier")
+        db.add_all([user, product, customer, supplier])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "balances@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, product.id, customer.id, supplier.id
+
+    def _entries(self, db, party_type):
+        return [
+            (e.source_type, e.amount) for e in db.query(BalanceEntry).filter(
+                BalanceEntry.party_type == party_type
+            ).order_by(BalanceEntry.created_at, BalanceEntry.source_type)
+        ]
+
+    def test_entries_follow_orders_and_payments(self, client, db):
+        headers, product_id, customer_id, supplier_id = self._setup(db, client)
+
+        order = client.post("/api/orders", json={
+            "customer_id": str(customer_id),
+            "line_items": [{"product_id": str(product_id), "quantity": 2, "unit_price": 100000}]
+        }, headers=headers).json()
+        client.put(f"/api/orders/{order['id']}/status", json={"status": "confirmed"}, headers=headers)
+        payment = client.post("/api/payments", json={
+            "type": "incoming", "customer_id": str(customer_id), "amount": 80000, "is_settlement": True
+        }, headers=headers).json()
+        client.post("/api/payments", json={
+            "type": "outgoing", "supplier_id": str(supplier_id), "amount": 30000
+        }, headers=headers)
+        client.put(f"/api/orders/{order['id']}/status", json={"status": "cancelled"}, headers=headers)
+        assert client.delete(f"/api/payments/{payment['id']}", headers=headers).status_code == 204
+
+        db.expire_all()
+        customer_entries = self._entries(db, PartyType.CUSTOMER)
+        assert sorted(customer_entries) == sorted([
+            ("order_confirm", Decimal("-200000")),
+            ("payment", Decimal("80000")),
+            ("order_cancel", Decimal("200000")),
+            ("payment_delete", Decimal("-80000")),
+        ])
+        assert self._entries(db, PartyType.SUPPLIER) == [("payment", Decimal("30000"))]
+
+        # The balance column is the opening balance plus the party's entries
+        assert db.get(Customer, customer_id).total_debt == Decimal("-50000")
+        assert db.get(Supplier, supplier_id).total_payable == Decimal("30000")
+
+    def test_columns_applied_after_commit(self, client, db):
+        headers, _, customer_id, _ = self._setup(db, client)
+        user_id = db.query(User.id).scalar()
+        statements = []
+
+        @event.listens_for(db.get_bind(), "before_cursor_execute")
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        try:
+            record_balance_changes(db, [
+                BalanceChange(PartyType.CUSTOMER, customer_id, Decimal("-7000"), "order_confirm"),
+                BalanceChange(PartyType.CUSTOMER, customer_id, Decimal("2000"), "payment"),
+            ], user_id)
+            # Writers only append entries; the customer row is neither read nor locked
+            assert not any("customers" in s for s in statements)
+            assert balance_as_of(db, PartyType.CUSTOMER, customer_id, datetime.utcnow()) == Decimal("-55000")
+            db.commit()
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", capture)
+
+        db.expire_all()
+        assert db.get(Customer, customer_id).total_debt == Decimal("-55000")
+        assert db.query(BalanceEntry).filter(BalanceEntry.applied == False).count() == 0
+
+    def test_periodic_apply_catches_up(self, client, db):
+        _, _, customer_id, supplier_id = self._setup(db, client)
+        user_id = db.query(User.id).scalar()
+        # Entries whose after-commit update never ran
+        db.add_all([
+            BalanceEntry(party_type=PartyType.CUSTOMER, party_id=customer_id, amount=Decimal("4000"),
+                         source_type="payment", created_by=user_id),
+            BalanceEntry(party_type=PartyType.SUPPLIER, party_id=supplier_id, amount=Decimal("900"),
+                         source_type="payment", created_by=user_id),
+        ])
+        db.commit()
+
+        assert apply_pending_balances(db) == 2
+        db.commit()
+        assert apply_pending_balances(db) == 0
+        db.expire_all()
+        assert db.get(Customer, customer_id).total_debt == Decimal("-46000")
+        assert db.get(Supplier, supplier_id).total_payable == Decimal("900")
+
+    def test_balance_endpoint(self, client, db):
+        headers, _, customer_id, supplier_id = self._setup(db, client)
+
+        response = client.get(f"/api/customers/{customer_id}/balance", headers=headers)
+        assert response.status_code == 200
+        assert Decimal(response.json()["balance"]) == Decimal("-50000")
+
+        response = client.get(f"/api/suppliers/{uuid.uuid4()}/balance", headers=headers)
+        assert response.status_code == 404
+
+
+class TestBalanceAsOf:
+    """Balances at any timestamp from checkpoints plus a bounded entry scan."""
+
+    # (when, amount) on a customer whose debt started at -10000
+    HISTORY = [
+        (datetime(2026, 1, 10, 9), Decimal("-5000")),
+        (datetime(2026, 2, 15, 9), Decimal("3000")),
+        (datetime(2026, 3, 31, 12), Decimal("-2000")),
+        (datetime(2026, 4, 5, 9), Decimal("-7000")),
+    ]
+
+    # (at, expected balance)
+    EXPECTED = [
+        ("2026-01-05T00:00:00", -10000),
+        ("2026-01-10T09:00:00", -15000),
+        ("2026-02-01T00:00:00", -15000),
+        ("2026-03-31T11:59:00", -12000),
+        ("2026-03-31T19:00:00+07:00", -14000),
+        ("2026-04-30T23:59:59", -21000),
+        ("2026-09-01T00:00:00", -21000),
+    ]
+
+    def _setup(self, db, client):
+        user = User(
+            email="asof@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="As-of User",
+            role=UserRole.STAFF
+        )
+        customer = Customer(code="ASOF01", name="As-of Customer", total_debt=Decimal("-21000"))
+        idle = Supplier(code="ASOFSUP", name="Idle Supplier", total_payable=Decimal("4000"))
+        db.add_all([user, customer, idle])
+        db.flush()
+        db.add_all([
+            BalanceEntry(party_type=PartyType.CUSTOMER, party_id=customer.id, amount=amount,
+                         source_type="payment", created_by=user.id, created_at=when, applied=True)
+            for when, amount in self.HISTORY
+        ])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "asof@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, customer.id, idle.id
+
+    def _balance(self, client, headers, path, at):
+        response = client.get(path, params={"at": at}, headers=headers)
+        assert response.status_code == 200
+        return int(Decimal(response.json()["balance"]))
+
+    def test_checkpoints_are_built_incrementally(self, client, db):
+        self._setup(db, client)
+
+        built = build_balance_checkpoints(db, now=datetime(2026, 5, 10))
+        db.commit()
+        assert built == [datetime(2026, m, 1, tzinfo=timezone.utc) for m in (5, 4, 3, 2)]
+        checkpoints = {
+            (c.period_end.month, c.balance) for c in db.query(BalanceCheckpoint).filter(
+                BalanceCheckpoint.party_type == PartyType.CUSTOMER
+            )
+        }
+        assert checkpoints == {(2, -15000), (3, -12000), (4, -14000), (5, -21000)}
+        assert db.query(BalanceCheckpoint).count() == 8
+
+        assert build_balance_checkpoints(db, now=datetime(2026, 5, 31)) == []
+        assert build_balance_checkpoints(db, now=datetime(2026, 6, 2)) == [datetime(2026, 6, 1, tzinfo=timezone.utc)]
+
+    def test_as_of_with_and_without_checkpoints(self, client, db):
+        headers, customer_id, supplier_id = self._setup(db, client)
+        path = f"/api/customers/{customer_id}/balance"
+
+        without = [self._balance(client, headers, path, at) for at, _ in self.EXPECTED]
+        build_balance_checkpoints(db, now=datetime(2026, 5, 10))
+        db.commit()
+        with_checkpoints = [self._balance(client, headers, path, at) for at, _ in self.EXPECTED]
+
+        expected = [balance for _, balance in self.EXPECTED]
+        assert without == expected
+        assert with_checkpoints == expected
+        assert self._balance(client, headers, f"/api/suppliers/{supplier_id}/balance",
+                             "2026-01-01T00:00:00") == 4000
+
+    def test_session_time_zone_is_ignored(self, non_utc_db):
+        with non_utc_db() as db:
+            user = User(email="tz@example.com", hashed_password="x", full_name="TZ User", role=UserRole.STAFF)
+            customer = Customer(code="TZ01", name="Time Zone", total_debt=Decimal("-7000"))
+            db.add_all([user, customer])
+            db.flush()
+            # 20:00 UTC on March 31st is already April 1st in the session's zone (UTC+7)
+            db.add_all([
+                BalanceEntry(party_type=PartyType.CUSTOMER, party_id=customer.id, amount=amount,
+                             source_type="payment", created_by=user.id, created_at=when, applied=True)
+                for when, amount in [
+                    (datetime(2026, 3, 31, 20, tzinfo=timezone.utc), Decimal("-5000")),
+                    (datetime(2026, 4, 5, 9, tzinfo=timezone.utc), Decimal("-2000")),
+                ]
+            ])
+            db.commit()
+
+            for build in (False, True):
+                if build:
+                    build_balance_checkpoints(db, now=datetime(2026, 5, 10))
+                    db.commit()
+                for at, balance in [("2026-03-31T19:00:00", 0), ("2026-03-31T21:00:00", -5000),
+                                    ("2026-04-01T06:00:00+07:00", -5000), ("2026-04-30T23:59:59", -7000)]:
+                    assert balance_as_of(db, PartyType.CUSTOMER, customer.id,
+                                         datetime.fromisoformat(at)) == Decimal(balance)
+
+    def test_entry_scan_is_bounded(self, client, db, query_budget):
+        headers, customer_id, _ = self._setup(db, client)
+        build_balance_checkpoints(db, now=datetime(2026, 5, 10))
+        db.commit()
+
+        # party, nearest checkpoint, one entry scan from it
+        with query_budget(3) as counter:
+            assert self._balance(client, headers, f"/api/customers/{customer_id}/balance",
+                                 "2026-03-31T12:00:00") == -14000
+        entry_scan = counter.statements[-1]
+        assert "balance_entries.created_at >=" in entry_scan
+        assert "balance_entries.created_at <=" in entry_scan
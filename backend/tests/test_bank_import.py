@@ -0,0 +1,301 @@
+"""Bank statement import tests."""
+import io
+import os
+import random
+import time
+import uuid
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from sqlalchemy import func, insert
+from app.models.user import User, UserRole
+from app.models.customer import Customer
+from app.models.order import SalesOrder, OrderStatus
+from app.models.payment import Payment, PaymentAllocation
+from app.models.balance import BalanceEntry
+from app.config import settings
+from app.helpers import business_date
+from app.services.auth import hash_password
+from app.services.bank_import import import_statement
+from app.services.checkpoints import as_utc
+
+# Override to run the benchmark with a smaller statement or another budget locally
+BANK_IMPORT_TEST_LINES = int(os.environ.get("BANK_IMPORT_TEST_LINES", "50000"))
+BANK_IMPORT_TEST_SECONDS = float(os.environ.get("BANK_IMPORT_TEST_SECONDS", "60"))
+
+
+class TestBankImport:
+    """POST /api/payments/import matches statement lines in batches."""
+
+    def _setup(self, db, client, extra_orders=0):
+        user = User(
+            email="bank@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Bank User",
+            role=UserRole.STAFF
+        )
+        alpha = Customer(code="BANK01", name="Alpha", total_debt=Decimal("-1000000"))
+        beta = Customer(code="BANK02", name="Beta", total_debt=Decimal("-500000"))
+        db.add_all([user, alpha, beta])
+        db.flush()
+
+        self.today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+        # (number, customer, age in days, status, total, paid)
+        orders = [
+            ("SO-BANK-001", alpha, 5, OrderStatus.CONFIRMED, 300000, 0),
+            ("SO-BANK-002", alpha, 20, OrderStatus.COMPLETED, 120000, 20000),
+            ("SO-BANK-003", beta, 10, OrderStatus.SHIPPED, 250000, 0),
+            ("SO-BANK-004", beta, 15, OrderStatus.CONFIRMED, 250000, 0),
+            ("SO-BANK-005", beta, 3, OrderStatus.CONFIRMED, 77000, 0),
+            ("SO-BANK-006", alpha, 2, OrderStatus.DRAFT, 50000, 0),
+            ("SO-BANK-007", beta, 200, OrderStatus.CONFIRMED, 64000, 0),
+        ]
+        orders += [
+            (f"SO-BULK-{i:06d}", alpha if i % 2 else beta, i % 60, OrderStatus.CONFIRMED, 1000 + i, 0)
+            for i in range(extra_orders)
+        ]
+        ids = {}
+        for number, customer, age, status, total, paid in orders:
+            order = SalesOrder(
+                order_number=number, customer_id=customer.id, created_by=user.id, status=status,
+                subtotal=total, total=total, paid_amount=paid, order_date=self.today - timedelta(days=age)
+            )
+            db.add(order)
+            ids[number] = order
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "bank@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, alpha.id, beta.id, {number: order.id for number, order in ids.items()}
+
+    def _statement(self, rows):
+        lines = ["Date,Amount,Description"]
+        lines += [f"{day:%d/%m/%Y},\"{amount}\",{text}" for day, amount, text in rows]
+        return "\n".join(lines).encode()
+
+    def _import(self, client, headers, content, **params):
+        return client.post("/api/payments/import", params=params, headers=headers,
+                           files={"file": ("statement.csv", content, "text/csv")})
+
+    def test_matches_and_review(self, client, db):
+        headers, alpha, beta, orders = self._setup(db, client)
+        today = self.today
+        content = self._statement([
+            (today, "100,000", "CK thanh toan so-bank-002"),        # order number, case-insensitive
+            (today, "150,000", "BANK01 tra no"),                   # customer code -> FIFO
+            (today, "77,000", "chuyen khoan"),                     # unique open amount
+            (today, "250,000", "chuyen khoan"),                    # two orders of that amount
+            (today, "-30,000", "Phi ngan hang"),                   # debit
+            (today, "500,000", "SO-BANK-003"),                     # more than the order's open balance
+            (today, "64,000", "khong ro"),                          # only order of that amount is too old
+            (today, "50,000", "SO-BANK-006"),                      # draft
+            (today, "abc", "BANK02"),
+        ])
+
+        response = self._import(client, headers, content)
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["lines"], body["payments_created"]) == (9, 3)
+        assert Decimal(body["matched_amount"]) == Decimal("327000")
+        assert [(m["line"], m["rule"]) for m in body["matched"]] == [
+            (1, "order_number"), (2, "customer_code"), (3, "amount")
+        ]
+        assert body["matched"][2]["order_id"] == str(orders["SO-BANK-005"])
+        assert all(m["payment_number"].startswith("PAY-") for m in body["matched"])
+        reasons = {r["line"]: r["reason"] for r in body["review"]}
+        assert reasons == {
+            4: "Several open orders of this amount",
+            5: "Not a credit",
+            6: "Amount exceeds the open balance of SO-BANK-003",
+            7: "No match",
+            8: "Order SO-BANK-006 is not open",
+            9: "Invalid amount",
+        }
+        assert body["review"][0]["candidates"] == ["SO-BANK-003", "SO-BANK-004"]
+
+        db.expire_all()
+        paid = {n: int(db.get(SalesOrder, oid).paid_amount) for n, oid in orders.items()}
+        # Order 2 is fully paid by line 1, so BANK01's settlement goes to order 1
+        assert (paid["SO-BANK-001"], paid["SO-BANK-002"], paid["SO-BANK-005"]) == (150000, 120000, 77000)
+        assert db.get(Customer, alpha).total_debt == Decimal("-750000")
+        assert db.get(Customer, beta).total_debt == Decimal("-423000")
+        assert db.query(PaymentAllocation).count() == 3
+
+    def test_dry_run_writes_nothing(self, client, db):
+        headers, _, _, _ = self._setup(db, client)
+        content = self._statement([(self.today, "77000", "x")])
+
+        body = self._import(client, headers, content, dry_run=True).json()
+        assert (len(body["matched"]), body["payments_created"]) == (1, 0)
+        assert body["matched"][0]["payment_number"] is None
+        assert db.query(Payment).count() == 0
+
+    def test_recorded_payments_go_to_review(self, client, db):
+        headers, alpha, beta, orders = self._setup(db, client)
+        today = self.today
+        # Entered by hand before the statement arrived
+        client.post("/api/payments", json={
+            "type": "incoming", "method": "bank", "customer_id": str(beta), "amount": 40000,
+            "is_settlement": True
+        }, headers=headers)
+        first = [
+            (today, "100,000", "CK thanh toan SO-BANK-002"),
+            (today, "77,000", "chuyen khoan"),
+            (today, "10,000", "BANK01 tra no"),
+            (today, "10,000", "BANK01 tra no"),                    # a second, genuine payment
+        ]
+        body = self._import(client, headers, self._statement(first)).json()
+        assert body["payments_created"] == 4
+        # Another customer now has an open order of the amount line 2 paid
+        db.add(SalesOrder(order_number="SO-BANK-008", customer_id=alpha, created_by=db.query(User.id).scalar(),
+                          status=OrderStatus.CONFIRMED, subtotal=77000, total=77000, order_date=today))
+        db.commit()
+
+        # An overlapping statement: the first four lines again, one new line and the hand-entered one
+        content = self._statement(first + [
+            (today, "30,000", "BANK01"),
+            (today, "40,000", "BANK02"),
+        ])
+        body = self._import(client, headers, content).json()
+        assert [(m["line"], m["rule"]) for m in body["matched"]] == [(5, "customer_code")]
+        assert {r["line"]: r["reason"] for r in body["review"]} == {
+            1: "Already recorded", 2: "Already recorded", 3: "Already recorded",
+            4: "Already recorded", 6: "Already recorded",
+        }
+        assert [r["candidates"] for r in body["review"][:2]] == [["SO-BANK-002"], ["SO-BANK-008"]]
+
+        db.expire_all()
+        assert db.query(Payment).count() == 6
+        assert db.get(Customer, alpha).total_debt == Decimal("-850000")
+        assert db.get(Customer, beta).total_debt == Decimal("-383000")
+
+    def test_settlements_reserve_open_orders(self, client, db):
+        headers, alpha, _, orders = self._setup(db, client)
+        content = self._statement([
+            (self.today, "150,000", "BANK01 tra no"),              # FIFO: all of SO-BANK-002, then SO-BANK-001
+            (self.today, "100,000", "SO-BANK-002"),                # nothing left open on it
+            (self.today, "300,000", "chuyen khoan"),               # SO-BANK-001 has only 250,000 left
+            (self.today, "250,000", "SO-BANK-001"),
+        ])
+
+        body = self._import(client, headers, content).json()
+        assert [(m["line"], m["rule"]) for m in body["matched"]] == [(1, "customer_code"), (4, "order_number")]
+        assert {r["line"]: r["reason"] for r in body["review"]} == {
+            2: "Amount exceeds the open balance of SO-BANK-002", 3: "No match",
+        }
+
+        db.expire_all()
+        paid = {n: db.get(SalesOrder, orders[n]) for n in ("SO-BANK-001", "SO-BANK-002")}
+        assert {n: int(o.paid_amount) for n, o in paid.items()} == {"SO-BANK-001": 300000, "SO-BANK-002": 120000}
+        assert all(o.paid_amount <= o.total for o in paid.values())
+
+    def test_payment_date_is_local_midnight(self, client, db, monkeypatch):
+        monkeypatch.setattr(settings, "SHOP_TIMEZONE", "Asia/Ho_Chi_Minh")  # UTC+7
+        headers, _, _, _ = self._setup(db, client)
+        content = self._statement([(datetime(2026, 4, 1), "77,000", "BANK02")])
+
+        assert self._import(client, headers, content).json()["payments_created"] == 1
+        payment = db.query(Payment).one()
+        assert as_utc(payment.payment_date) == datetime(2026, 3, 31, 17, tzinfo=timezone.utc)
+        assert business_date(payment.payment_date) == payment.business_date == date(2026, 4, 1)
+
+    def test_missing_columns(self, client, db):
+        headers, _, _, _ = self._setup(db, client)
+        response = self._import(client, headers, b"Date,Amount\n2026-01-01,5")
+        assert response.status_code == 400
+        assert "description" in response.json()["detail"]
+
+    def test_statements_grow_with_chunks_not_lines(self, client, db, count_queries):
+        headers, _, _, _ = self._setup(db, client, extra_orders=2000)
+        content = self._statement([
+            (self.today, f"{1000 + i}", f"SO-BULK-{i:06d}") for i in range(2000)
+        ])
+
+        with count_queries() as counter:
+            body = self._import(client, headers, content).json()
+
+        assert body["payments_created"] == 2000
+        # Per 1000-line chunk: recorded-payment and three matching lookups, then
+        # payments, ledger entries, order lookup, paid_amount update, allocations,
+        # rollup; after commit, applying the ledger entries
+        assert counter.count <= 30
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_CONCURRENCY_DATABASE_URL", "").startswith("postgresql"),
+                    reason="benchmarks PostgreSQL; set TEST_CONCURRENCY_DATABASE_URL")
+class TestBankImportScale:
+    """A full statement imports, and re-imports, within the time budget on PostgreSQL."""
+
+    CUSTOMERS = 5_000
+    ORDERS_PER_LINE = 1.2
+
+    def _setup(self, db) -> tuple:
+        rng = random.Random(1)
+        user = User(email="bulk@example.com", hashed_password="x", full_name="Bulk", role=UserRole.STAFF)
+        db.add(user)
+        db.flush()
+        customers = [
+            {"id": uuid.uuid4(), "code": f"KH{i:05d}", "name": f"Customer {i}", "total_debt": Decimal(0)}
+            for i in range(self.CUSTOMERS)
+        ]
+        db.execute(insert(Customer), customers)
+        today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+        orders = []
+        for i in range(int(BANK_IMPORT_TEST_LINES * self.ORDERS_PER_LINE)):
+            at = today - timedelta(days=rng.randrange(60), minutes=rng.randrange(1440))
+            total = Decimal(rng.randrange(100, 100_000) * 1000)
+            orders.append({
+                "id": uuid.uuid4(), "order_number": f"SO-{i:07d}", "customer_id": rng.choice(customers)["id"],
+                "created_by": user.id, "status": OrderStatus.CONFIRMED, "subtotal": total, "total": total,
+                "discount": 0, "paid_amount": 0, "order_date": at,
+            })
+        for start in range(0, len(orders), 10_000):
+            db.execute(insert(SalesOrder), orders[start:start + 10_000])
+        db.commit()
+
+        # A third each of order-number, customer-code and amount-only lines
+        lines = ["Date,Amount,Description"]
+        for i in range(BANK_IMPORT_TEST_LINES):
+            order, day = orders[i], today - timedelta(days=rng.randrange(3))
+            if i % 3 == 0:
+                description, amount = f"CK thanh toan {order['order_number']}", order["total"]
+            elif i % 3 == 1:
+                description = f"{rng.choice(customers)['code']} tra no"
+                amount = Decimal(rng.randrange(1, 500) * 1000)
+            else:
+                description, amount = "chuyen khoan", order["total"]
+            lines.append(f"{day:%d/%m/%Y},{amount},{description}")
+        return user.id, "\n".join(lines)
+
+    def _import(self, session_factory, user_id, content):
+        with session_factory() as db:
+            started = time.perf_counter()
+            result = import_statement(db, io.StringIO(content), user_id)
+            db.commit()  # includes applying the balance entries
+            return result, time.perf_counter() - started
+
+    def test_statement_within_budget(self, concurrent_db):
+        with concurrent_db() as db:
+            user_id, content = self._setup(db)
+
+        first, first_seconds = self._import(concurrent_db, user_id, content)
+        again, again_seconds = self._import(concurrent_db, user_id, content)
+        print(f"\nImported {first.lines} lines in {first_seconds:.1f}s ({len(first.matched)} matched), "
+              f"re-imported in {again_seconds:.1f}s ({len(again.matched)} matched)")
+
+        assert first.lines == again.lines == BANK_IMPORT_TEST_LINES
+        assert len(first.matched) > BANK_IMPORT_TEST_LINES * 0.8
+        assert first_seconds < BANK_IMPORT_TEST_SECONDS
+        assert again_seconds < BANK_IMPORT_TEST_SECONDS
+        # Nothing imported the first time is imported again
+        assert not {m.line for m in first.matched} & {m.line for m in again.matched}
+        with concurrent_db() as db:
+            payments = db.scalar(func.count(Payment.id).select())
+            assert payments == len(first.matched) + len(again.matched)
+            assert db.query(BalanceEntry).filter(BalanceEntry.applied == False).count() == 0
+            assert db.query(SalesOrder).filter(SalesOrder.paid_amount > SalesOrder.total).count() == 0
+            assert db.scalar(func.sum(Customer.total_debt).select()) == db.scalar(func.sum(Payment.amount).select())
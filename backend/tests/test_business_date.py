@@ -0,0 +1,69 @@
+"""Shop-local business dates stored on orders, payments and stock movements."""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from app.config import settings
+from app.helpers import business_date
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.order import SalesOrder, OrderStatus
+from app.models.payment import Payment
+from app.models.stock import StockMovement, MovementType
+from app.services.auth import hash_password
+
+
+class TestBusinessDate:
+    """business_date follows SHOP_TIMEZONE, not the UTC date of the timestamp."""
+
+    def _setup(self, db, client, monkeypatch):
+        monkeypatch.setattr(settings, "SHOP_TIMEZONE", "Asia/Ho_Chi_Minh")  # UTC+7
+        user = User(
+            email="bizdate@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Business Date User",
+            role=UserRole.STAFF
+        )
+        product = Product(sku="BD-P", name="Business Date Product", cost_price=Decimal("1000"),
+                          sell_price=Decimal("2000"), current_stock=100)
+        customer = Customer(code="BDKH01", name="Business Date Customer")
+        db.add_all([user, product, customer])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "bizdate@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, user, product, customer
+
+    def test_populated_on_insert(self, client, db, monkeypatch):
+        headers, user, product, customer = self._setup(db, client, monkeypatch)
+        late_evening = datetime(2026, 3, 31, 20, 0)  # naive UTC; 03:00 on April 1st in the shop
+        order = SalesOrder(order_number="BD-001", customer_id=customer.id, created_by=user.id,
+                           status=OrderStatus.DRAFT, order_date=late_evening)
+        db.add(order)
+        db.commit()
+        assert str(order.business_date) == "2026-04-01"
+
+        # Server-default timestamps (ORM) and bulk Core inserts get today's shop date
+        client.post("/api/payments", json={
+            "type": "incoming", "customer_id": str(customer.id), "amount": 1000, "is_settlement": True
+        }, headers=headers)
+        client.post("/api/stock/in", json={"product_id": str(product.id), "quantity": 5}, headers=headers)
+        assert db.query(Payment.business_date).scalar() == business_date()
+        assert db.query(StockMovement.business_date).scalar() == business_date()
+
+    def test_import_cost_uses_shop_month(self, client, db, monkeypatch):
+        headers, user, product, _ = self._setup(db, client, monkeypatch)
+        midnight = datetime.combine(business_date().replace(day=1), time.min)  # as naive UTC
+        for hours_before, quantity in [(3, 10), (8, 1000)]:
+            # 3h before UTC midnight is 04:00 on the 1st locally; 8h before is still last month
+            at = midnight - timedelta(hours=hours_before)
+            db.add(StockMovement(product_id=product.id, created_by=user.id, type=MovementType.IN,
+                                 quantity=quantity, stock_before=0, stock_after=quantity, created_at=at))
+        db.commit()
+
+        dashboard = client.get("/api/reports/dashboard", headers=headers).json()
+        assert Decimal(dashboard["month_import_cost"]) == Decimal("10000")
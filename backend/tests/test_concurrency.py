@@ -0,0 +1,218 @@
+"""Concurrency stress tests for stock-affecting write paths."""
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, update
+from sqlalchemy.exc import OperationalError
+
+from app.api.orders import update_order_status
+from app.api.stock import stock_in
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.order import SalesOrder, SalesOrderItem
+from app.models.stock import StockMovement, MovementType
+from app.schemas.order import OrderStatusUpdate
+from app.schemas.stock import StockInCreate
+
+
+def _retrying(session_factory, action, attempts=50):
+    """Run action(db) in a fresh session, retrying transient lock failures (HTTP 500)."""
+    for _ in range(attempts):
+        db = session_factory()
+        try:
+            return action(db)
+        except HTTPException as e:
+            if e.status_code != 500:
+                return e.status_code
+        finally:
+            db.close()
+    return "failed"
+
+
+class TestOrderConfirmationConcurrency:
+    """Concurrent confirmations against one hot SKU."""
+
+    STOCK = 50
+    ORDERS = 120
+    WORKERS = 8
+
+    def _setup(self, session_factory):
+        db = session_factory()
+        user = User(email="stress@example.com", hashed_password="x", full_name="Stress", role=UserRole.STAFF)
+        customer = Customer(code="STRESS", name="Stress Customer")
+        product = Product(sku="HOT-SKU", name="Hot SKU", current_stock=self.STOCK)
+        db.add_all([user, customer, product])
+        db.flush()
+
+        order_ids = []
+        for i in range(self.ORDERS):
+            order = SalesOrder(
+                order_number=f"SO-STRESS-{i}",
+                customer_id=customer.id,
+                created_by=user.id,
+                subtotal=Decimal("1000"),
+                total=Decimal("1000"),
+            )
+            order.line_items.append(SalesOrderItem(
+                product_id=product.id, quantity=1,
+                unit_price=Decimal("1000"), line_total=Decimal("1000")
+            ))
+            db.add(order)
+            db.flush()
+            order_ids.append(order.id)
+        db.commit()
+        ids = (user.id, customer.id, product.id)
+        db.close()
+        return ids, order_ids
+
+    def test_hot_sku_never_oversells(self, concurrent_db):
+        """Exactly STOCK confirmations succeed; the movement chain stays intact."""
+        (user_id, customer_id, product_id), order_ids = self._setup(concurrent_db)
+
+        def confirm(order_id):
+            def action(db):
+                user = db.get(User, user_id)
+                update_order_status(order_id, OrderStatusUpdate(status="confirmed"), db=db, current_user=user)
+                return "confirmed"
+            return _retrying(concurrent_db, action)
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            outcomes = Counter(pool.map(confirm, order_ids))
+
+        assert outcomes == {"confirmed": self.STOCK, 400: self.ORDERS - self.STOCK}
+
+        db = concurrent_db()
+        try:
+            assert db.get(Product, product_id).current_stock == 0
+            movements = db.query(StockMovement).filter(StockMovement.product_id == product_id).all()
+            assert len(movements) == self.STOCK
+            assert sorted(m.stock_after for m in movements) == list(range(self.STOCK))
+            assert all(m.stock_before - m.stock_after == 1 for m in movements)
+            assert db.get(Customer, customer_id).total_debt == Decimal("-1000") * self.STOCK
+        finally:
+            db.close()
+
+    def test_same_order_confirmed_once(self, concurrent_db):
+        """Concurrent confirms of one order: one wins, stock and debt move once."""
+        (user_id, customer_id, product_id), order_ids = self._setup(concurrent_db)
+
+        def confirm(_):
+            def action(db):
+                user = db.get(User, user_id)
+                update_order_status(order_ids[0], OrderStatusUpdate(status="confirmed"), db=db, current_user=user)
+                return "confirmed"
+            return _retrying(concurrent_db, action)
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            outcomes = Counter(pool.map(confirm, range(self.WORKERS)))
+
+        # Losers either see the new status (400) or lose the conditional update (409)
+        assert outcomes["confirmed"] == 1
+        assert set(outcomes) <= {"confirmed", 400, 409}
+        db = concurrent_db()
+        try:
+            assert db.get(Product, product_id).current_stock == self.STOCK - 1
+            assert db.query(StockMovement).filter(StockMovement.product_id == product_id).count() == 1
+            assert db.get(Customer, customer_id).total_debt == Decimal("-1000")
+        finally:
+            db.close()
+
+
+def _locked_stock_in(db, data, user):
+    """Baseline: lock the product row, then read-modify-write in Python.
+
+    The no-op UPDATE takes the row lock on PostgreSQL and the write lock on
+    SQLite, where SELECT ... FOR UPDATE is not supported.
+    """
+    db.execute(update(Product).where(Product.id == data.product_id).values(
+        current_stock=Product.current_stock
+    ))
+    product = db.get(Product, data.product_id, populate_existing=True)
+    stock_before = product.current_stock
+    product.current_stock += data.quantity
+    db.add(StockMovement(
+        product_id=product.id, created_by=user.id, type=MovementType.IN,
+        quantity=data.quantity, stock_before=stock_before, stock_after=product.current_stock
+    ))
+    db.commit()
+
+
+class TestStockReceiptConcurrency:
+    """Concurrent receipts on one product never lose an update."""
+
+    RECEIPTS = 200
+    WORKERS = 8
+    ROUND_TRIP_SECONDS = 0.002
+
+    def _setup(self, session_factory, name):
+        db = session_factory()
+        user = User(email=f"{name}@example.com", hashed_password="x", full_name="Receipts", role=UserRole.STAFF)
+        product = Product(sku=f"RCV-{name}", name="Received SKU", current_stock=0)
+        db.add_all([user, product])
+        db.commit()
+        ids = (user.id, product.id)
+        db.close()
+        return ids
+
+    def _run(self, session_factory, name, receive):
+        """Run RECEIPTS receipts of 1..RECEIPTS units; returns receipts/sec."""
+        user_id, product_id = self._setup(session_factory, name)
+
+        def one(quantity):
+            data = StockInCreate(product_id=product_id, quantity=quantity)
+            for _ in range(100):
+                db = session_factory()
+                try:
+                    receive(db, data, db.get(User, user_id))
+                    return
+                except OperationalError:
+                    db.rollback()  # SQLite lock timeout; retry like a client would
+                finally:
+                    db.close()
+            raise AssertionError("receipt kept failing")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            list(pool.map(one, range(1, self.RECEIPTS + 1)))
+        rate = self.RECEIPTS / (time.perf_counter() - start)
+
+        db = session_factory()
+        try:
+            assert db.get(Product, product_id).current_stock == self.RECEIPTS * (self.RECEIPTS + 1) // 2
+            movements = db.query(StockMovement).filter(StockMovement.product_id == product_id).all()
+            assert len(movements) == self.RECEIPTS
+            # Every movement starts where another ended: an unbroken chain from zero
+            assert sorted(m.stock_before for m in movements) == sorted(
+                [0] + [m.stock_after for m in movements]
+            )[:-1]
+            assert all(m.stock_after - m.stock_before == m.quantity for m in movements)
+        finally:
+            db.close()
+        return rate
+
+    def test_atomic_update_vs_row_lock(self, concurrent_db):
+        """Both keep the chain intact; the atomic UPDATE holds the hot row for fewer round trips.
+
+        Each statement pays ROUND_TRIP_SECONDS, as it would over a network, so
+        throughput is bound by how long the product row stays locked.
+        """
+        engine = concurrent_db.kw["bind"]
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def round_trip(*_):
+            time.sleep(self.ROUND_TRIP_SECONDS)
+
+        try:
+            atomic = self._run(
+                concurrent_db, "atomic", lambda db, data, user: stock_in(data, db=db, current_user=user)
+            )
+            locked = self._run(concurrent_db, "locked", _locked_stock_in)
+        finally:
+            event.remove(engine, "before_cursor_execute", round_trip)
+
+        assert atomic > 1.3 * locked, f"atomic {atomic:.0f}/s vs row lock {locked:.0f}/s"
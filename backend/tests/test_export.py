@@ -0,0 +1,93 @@
+"""Streaming CSV export tests."""
+import asyncio
+import csv
+import io
+import os
+import pytest
+from decimal import Decimal
+from sqlalchemy import text
+from app.api.export import export_products
+from app.models.user import User, UserRole
+from app.models.customer import Customer
+from app.models.order import SalesOrder, OrderStatus
+from app.utils.csv_export import EXPORT_CHUNK_ROWS
+from tests.conftest import TestingSessionLocal
+
+# Override to run the memory test with a smaller table locally
+EXPORT_TEST_ROWS = int(os.environ.get("EXPORT_TEST_ROWS", "1000000"))
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class TestStreamingExport:
+    """Exports stream column-only rows in bounded chunks."""
+
+    def test_orders_csv_content(self, client, db):
+        """Rows span several chunks and keep the existing columns."""
+        user = User(email="exp@example.com", hashed_password="x", full_name="Exp", role=UserRole.STAFF)
+        customer = Customer(code="EXP001", name="Export Customer")
+        db.add_all([user, customer])
+        db.flush()
+        count = EXPORT_CHUNK_ROWS * 2 + 5
+        for i in range(count):
+            db.add(SalesOrder(
+                order_number=f"SO-EXP-{i}",
+                customer_id=customer.id,
+                created_by=user.id,
+                status=OrderStatus.CONFIRMED,
+                total=Decimal("300000"),
+                paid_amount=Decimal("100000"),
+            ))
+        db.commit()
+
+        response = client.get("/api/export/orders", params={"order_status": "confirmed"})
+        assert response.status_code == 200
+        assert "text/csv" in response.headers["content-type"]
+
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == ["Ma don", "Ngay dat", "Trang thai", "Tong tien", "Da thanh toan", "Con lai", "Ghi chu"]
+        assert len(rows) == count + 1
+        assert rows[1][2:6] == ["confirmed", "300000", "100000", "200000"]
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc to sample RSS")
+    def test_peak_memory_is_flat(self, db):
+        """Exporting a million products keeps resident memory flat."""
+        db.execute(text("""
+            WITH RECURSIVE seq(n) AS (
+                SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows
+            )
+            INSERT INTO products (id, sku, name, category, unit, cost_price, sell_price,
+                                  current_stock, min_stock, is_active, created_at, updated_at)
+            SELECT printf('00000000-0000-0000-0000-%012d', n), 'SKU' || n, 'Product number ' || n,
+                   'Category', 'cái', 60000, 90000, n % 500, 10, 1,
+                   CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+            FROM seq
+        """), {"rows": EXPORT_TEST_ROWS})
+        db.commit()
+
+        response = export_products(db=TestingSessionLocal())
+
+        async def consume():
+            lines = size = largest = peak = 0
+            async for chunk in response.body_iterator:
+                lines += chunk.count("\n")
+                size += len(chunk)
+                largest = max(largest, len(chunk))
+                peak = max(peak, _rss_bytes())
+            return lines, size, largest, peak
+
+        baseline = _rss_bytes()
+        lines, size, largest, peak = asyncio.run(consume())
+        growth = peak - baseline
+
+        assert lines == EXPORT_TEST_ROWS + 1
+        assert largest < 200 * EXPORT_CHUNK_ROWS
+        # The CSV alone is ~65 MB and loading the rows takes several times that;
+        # streaming only holds a chunk of rows at a time
+        assert growth < 32 * 1024 * 1024
+        print(f"\nExported {EXPORT_TEST_ROWS} rows ({size / 1e6:.1f} MB), "
+              f"peak RSS growth {growth / 1e6:.1f} MB")
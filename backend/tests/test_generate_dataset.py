@@ -0,0 +1,119 @@
+"""Load-test dataset generator tests."""
+import pytest
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.generate_dataset import DatasetSpec, generate
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.models.order import SalesOrder, SalesOrderItem, REVENUE_STATUSES
+from app.models.payment import Payment, PaymentType
+from app.models.stock import StockMovement
+from app.models.balance import BalanceEntry, PartyType
+from app.models.report import DailySalesTotal
+from app.services.checkpoints import as_utc
+
+SPEC = DatasetSpec(products=40, customers=30, suppliers=8, orders=400, days=30,
+                   end_date=date(2026, 6, 30), seed=7, shards=4)
+
+
+def _url(session_factory) -> str:
+    return session_factory.kw["bind"].url.render_as_string(hide_password=False)
+
+
+def _fingerprint(db) -> tuple:
+    return (
+        sorted(db.query(Product.sku, Product.current_stock, Product.sell_price).all()),
+        sorted(db.query(Customer.code, Customer.total_debt).all()),
+        sorted((number, status, total, paid, as_utc(at)) for number, status, total, paid, at in db.query(
+            SalesOrder.order_number, SalesOrder.status, SalesOrder.total, SalesOrder.paid_amount, SalesOrder.order_date
+        )),
+        sorted(db.query(Payment.payment_number, Payment.amount).all()),
+        db.query(StockMovement).count(),
+        db.query(SalesOrderItem).count(),
+    )
+
+
+class TestGenerateDataset:
+    """Generated data is deterministic and satisfies the app's invariants."""
+
+    def test_invariants(self, concurrent_db):
+        """Stock chains, balances and the rollup match the generated rows."""
+        totals = generate(_url(concurrent_db), SPEC, workers=1, batch_rows=500)
+        assert totals["sales_orders"] == SPEC.orders
+        assert totals["products"] == SPEC.products
+
+        db = concurrent_db()
+        try:
+            chains = defaultdict(list)
+            for m in db.query(StockMovement).order_by(StockMovement.created_at):
+                chains[m.product_id].append(m)
+            for product in db.query(Product):
+                movements = chains[product.id]
+                expected_before = 0
+                for m in movements:
+                    assert m.stock_before == expected_before
+                    assert m.stock_after >= 0
+                    expected_before = m.stock_after
+                assert product.current_stock == expected_before
+
+            paid = dict(db.query(Payment.order_id, func.sum(Payment.amount)).filter(
+                Payment.order_id != None).group_by(Payment.order_id).all())
+            debts = defaultdict(Decimal)
+            for order in db.query(SalesOrder):
+                assert order.paid_amount == paid.get(order.id, 0)
+                assert order.total == order.subtotal - order.discount
+                if order.status in REVENUE_STATUSES:
+                    debts[order.customer_id] -= order.total - order.paid_amount
+            for customer in db.query(Customer):
+                assert customer.total_debt == debts[customer.id]
+
+            for supplier in db.query(Supplier):
+                payments = db.query(Payment).filter(
+                    Payment.supplier_id == supplier.id, Payment.type == PaymentType.OUTGOING).all()
+                assert supplier.total_payable == sum(
+                    (-p.amount if p.is_settlement else p.amount for p in payments), Decimal("0"))
+
+            # Every balance change has its (already applied) ledger entry
+            entries = dict(
+                ((party_type, party_id), amount) for party_type, party_id, amount in db.query(
+                    BalanceEntry.party_type, BalanceEntry.party_id, func.sum(BalanceEntry.amount)
+                ).group_by(BalanceEntry.party_type, BalanceEntry.party_id)
+            )
+            for customer in db.query(Customer):
+                assert entries.get((PartyType.CUSTOMER, customer.id), 0) == customer.total_debt
+            for supplier in db.query(Supplier):
+                assert entries.get((PartyType.SUPPLIER, supplier.id), 0) == supplier.total_payable
+            assert db.query(BalanceEntry).filter(BalanceEntry.applied == False).count() == 0
+
+            revenue = db.query(func.sum(SalesOrder.total)).filter(
+                SalesOrder.status.in_(REVENUE_STATUSES)).scalar()
+            assert db.query(func.sum(DailySalesTotal.revenue)).scalar() == revenue
+        finally:
+            db.close()
+
+    def test_deterministic_across_workers(self, concurrent_db, tmp_path):
+        """The same spec yields the same rows whether shards run serially or in parallel."""
+        generate(_url(concurrent_db), SPEC, workers=1)
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'parallel.db'}")
+        Base.metadata.create_all(bind=engine)
+        try:
+            generate(str(engine.url), SPEC, workers=2)
+            serial, parallel = concurrent_db(), sessionmaker(bind=engine)()
+            try:
+                assert _fingerprint(serial) == _fingerprint(parallel)
+            finally:
+                serial.close()
+                parallel.close()
+        finally:
+            engine.dispose()
+
+    def test_refuses_non_empty_database(self, concurrent_db):
+        generate(_url(concurrent_db), SPEC._replace(orders=10))
+        with pytest.raises(RuntimeError):
+            generate(_url(concurrent_db), SPEC._replace(orders=10))
@@ -0,0 +1,143 @@
+"""Idempotency-Key tests for order and payment creation."""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.payments import create_payment
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.order import SalesOrder
+from app.models.payment import Payment
+from app.models.idempotency import IdempotencyKey
+from app.schemas.payment import PaymentCreate
+from app.services.auth import hash_password
+
+
+class TestIdempotencyKeys:
+    """Retries with the same Idempotency-Key replay the first response."""
+
+    def _setup(self, db, client):
+        user = User(
+            email="idem@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Idem User",
+            role=UserRole.STAFF
+        )
+        customer = Customer(code="IDEM01", name="Idem Customer")
+        product = Product(sku="IDEM-P", name="Idem Product", current_stock=10)
+        db.add_all([user, customer, product])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "idem@example.com",
+            "password": "password123"
+        })
+        return {"Authorization": f"Bearer {resp.json()['access_token']}"}, customer, product
+
+    def test_order_retry_replays_response(self, client, db):
+        headers, customer, product = self._setup(db, client)
+        payload = {
+            "customer_id": str(customer.id),
+            "line_items": [{"product_id": str(product.id), "quantity": 2, "unit_price": 1500}],
+        }
+        keyed = {**headers, "Idempotency-Key": "order-1"}
+
+        first = client.post("/api/orders", json=payload, headers=keyed)
+        retry = client.post("/api/orders", json=payload, headers=keyed)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert retry.json() == first.json()
+        assert first.json()["line_items"][0]["product_sku"] == "IDEM-P"
+        assert db.query(SalesOrder).count() == 1
+
+        # Without a key (or with a new one) each request creates an order
+        client.post("/api/orders", json=payload, headers=headers)
+        client.post("/api/orders", json=payload, headers={**headers, "Idempotency-Key": "order-2"})
+        assert db.query(SalesOrder).count() == 3
+
+    def test_payment_retry_books_debt_once(self, client, db):
+        headers, customer, _ = self._setup(db, client)
+        keyed = {**headers, "Idempotency-Key": "pay-1"}
+        payload = {"type": "incoming", "customer_id": str(customer.id), "amount": 5000}
+
+        responses = [client.post("/api/payments", json=payload, headers=keyed) for _ in range(3)]
+
+        assert {r.status_code for r in responses} == {201}
+        assert len({r.json()["payment_number"] for r in responses}) == 1
+        assert db.query(Payment).count() == 1
+        db.refresh(customer)
+        assert customer.total_debt == Decimal("-5000")
+
+    def test_key_reused_with_different_body(self, client, db):
+        headers, customer, _ = self._setup(db, client)
+        keyed = {**headers, "Idempotency-Key": "pay-2"}
+
+        client.post("/api/payments", json={
+            "type": "incoming", "customer_id": str(customer.id), "amount": 5000
+        }, headers=keyed)
+        response = client.post("/api/payments", json={
+            "type": "incoming", "customer_id": str(customer.id), "amount": 7000
+        }, headers=keyed)
+
+        assert response.status_code == 422
+        assert db.query(Payment).count() == 1
+
+    def test_expired_key_is_reused(self, client, db):
+        headers, customer, _ = self._setup(db, client)
+        keyed = {**headers, "Idempotency-Key": "pay-3"}
+        payload = {"type": "incoming", "customer_id": str(customer.id), "amount": 5000}
+
+        first = client.post("/api/payments", json=payload, headers=keyed)
+        db.query(IdempotencyKey).update({IdempotencyKey.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+        db.commit()
+        second = client.post("/api/payments", json=payload, headers=keyed)
+
+        assert second.status_code == 201
+        assert second.json()["id"] != first.json()["id"]
+        assert db.query(IdempotencyKey).count() == 1
+        assert db.query(Payment).count() == 2
+
+    def test_concurrent_retries_create_one_payment(self, concurrent_db):
+        """Racing retries of one key commit exactly one payment and all see its response."""
+        db = concurrent_db()
+        user = User(email="race@example.com", hashed_password="x", full_name="Race", role=UserRole.STAFF)
+        customer = Customer(code="RACE01", name="Race Customer")
+        db.add_all([user, customer])
+        db.commit()
+        user_id, customer_id = user.id, customer.id
+        db.close()
+        data = PaymentCreate(type="incoming", customer_id=customer_id, amount=Decimal("1000"))
+
+        def retry(_):
+            for _ in range(50):
+                db = concurrent_db()
+                try:
+                    response = create_payment(
+                        data, db=db, current_user=db.get(User, user_id), idempotency_key="race-1"
+                    )
+                    return json.loads(response.body)["id"]
+                except HTTPException:
+                    raise
+                except Exception:
+                    db.rollback()  # SQLite lock contention; retry like a client would
+                finally:
+                    db.close()
+            return "failed"
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = list(pool.map(retry, range(16)))
+
+        assert len(set(ids)) == 1 and ids[0] != "failed"
+        db = concurrent_db()
+        try:
+            assert db.query(Payment).count() == 1
+            assert db.get(Customer, customer_id).total_debt == Decimal("-1000")
+        finally:
+            db.close()
@@ -0,0 +1,96 @@
+"""Document number allocation tests."""
+import re
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from sqlalchemy import create_engine
+from app.models.user import User, UserRole
+from app.models.customer import Customer
+from app.services.auth import hash_password
+from app.services.numbering import DocumentNumberAllocator
+
+
+def _allocate(url: str, threads: int, per_thread: int) -> list[int]:
+    """Allocate numbers from several threads of a fresh process."""
+    engine = create_engine(url, connect_args={"timeout": 60} if url.startswith("sqlite") else {})
+    allocator = DocumentNumberAllocator(block_size=7)
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            batches = pool.map(
+                lambda _: [allocator.next_value(engine, "order") for _ in range(per_thread)],
+                range(threads)
+            )
+            return [value for batch in batches for value in batch]
+    finally:
+        engine.dispose()
+
+
+class TestDocumentNumbers:
+    """Order and payment numbers are unique under concurrency."""
+
+    PROCESSES = 4
+    THREADS = 4
+    PER_THREAD = 250
+
+    def _auth(self, db, client):
+        user = User(
+            email="numbers@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Numbers User",
+            role=UserRole.STAFF
+        )
+        customer = Customer(code="NUM001", name="Numbers Customer")
+        db.add_all([user, customer])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "numbers@example.com",
+            "password": "password123"
+        })
+        return {"Authorization": f"Bearer {resp.json()['access_token']}"}, customer
+
+    def test_payments_in_same_second_are_unique(self, client, db):
+        """Back-to-back payments no longer collide on a second-resolution timestamp."""
+        headers, customer = self._auth(db, client)
+
+        numbers = []
+        for _ in range(5):
+            response = client.post("/api/payments", json={
+                "type": "incoming", "customer_id": str(customer.id), "amount": 1000
+            }, headers=headers)
+            assert response.status_code == 201
+            numbers.append(response.json()["payment_number"])
+
+        assert len(set(numbers)) == 5
+        assert all(re.fullmatch(r"PAY-\d{8}-\d{6,}", n) for n in numbers)
+
+        response = client.post("/api/orders", json={
+            "customer_id": str(customer.id), "line_items": []
+        }, headers=headers)
+        assert re.fullmatch(r"SO-\d{8}-\d{6,}", response.json()["order_number"])
+
+    def test_bulk_allocation_reserves_once(self, db, count_queries):
+        allocator = DocumentNumberAllocator(block_size=7)
+        bind = db.get_bind()
+        first = allocator.next_values(bind, "order", 3)
+
+        with count_queries() as counter:
+            bulk = allocator.next_values(bind, "order", 30)
+        assert counter.count == 1
+
+        # The rest of the current block is used first, and the last block's remainder after
+        assert first + bulk + [allocator.next_value(bind, "order")] == list(range(1, 35))
+
+    def test_no_collisions_across_processes(self, concurrent_db):
+        """Thousands of allocations from several processes and threads never repeat."""
+        url = concurrent_db.kw["bind"].url.render_as_string(hide_password=False)
+        with get_context("spawn").Pool(self.PROCESSES) as pool:
+            results = pool.starmap(
+                _allocate, [(url, self.THREADS, self.PER_THREAD)] * self.PROCESSES
+            )
+
+        values = [v for result in results for v in result]
+        assert len(values) == self.PROCESSES * self.THREADS * self.PER_THREAD
+        assert len(set(values)) == len(values)
+        # Only each process's partly used last block is left unused
+        assert max(values) <= len(values) + self.PROCESSES * 7
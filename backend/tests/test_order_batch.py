@@ -0,0 +1,204 @@
+"""Batch order endpoint tests."""
+import time
+import uuid
+import pytest
+from decimal import Decimal
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.order import SalesOrder, SalesOrderItem
+from app.models.audit import AuditLog
+from app.models.report import DailySalesTotal
+from app.models.stock import StockMovement, MovementType
+from app.services.auth import hash_password
+from app.services.numbering import allocator
+
+
+class TestBatchCreate:
+    """POST /api/orders/batch creates valid orders and reports the rest."""
+
+    def _setup(self, db, client, products=3):
+        user = User(
+            email="batch@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Batch User",
+            role=UserRole.STAFF
+        )
+        customer = Customer(code="BATCH01", name="Batch Customer")
+        items = [
+            Product(sku=f"BT{i:03d}", name=f"Batch Product {i}", cost_price=Decimal("1000"),
+                    sell_price=Decimal("1500"), current_stock=100)
+            for i in range(products)
+        ]
+        db.add_all([user, customer, *items])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "batch@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, customer, items
+
+    def _order(self, customer, products, quantity=2):
+        return {
+            "customer_id": str(customer.id),
+            "discount": 100,
+            "line_items": [
+                {"product_id": str(p.id), "quantity": quantity, "unit_price": 1500} for p in products
+            ],
+        }
+
+    def test_partial_failure(self, client, db):
+        headers, customer, products = self._setup(db, client)
+        products[2].is_active = False
+        db.commit()
+
+        response = client.post("/api/orders/batch", json={"orders": [
+            self._order(customer, products[:2]),
+            {**self._order(customer, products[:1]), "customer_id": str(uuid.uuid4())},
+            self._order(customer, products[1:]),
+            {**self._order(customer, []), "line_items": [
+                {"product_id": str(uuid.uuid4()), "quantity": 1, "unit_price": 1}
+            ]},
+            self._order(customer, products[:1], quantity=5),
+        ]}, headers=headers)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["created"], body["failed"]) == (2, 3)
+        results = body["results"]
+        assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+        assert [r["success"] for r in results] == [True, False, False, False, True]
+        assert results[1]["error"] == "Customer not found"
+        assert results[2]["error"] == "Product BT002 is inactive"
+        assert results[3]["error"].endswith("not found")
+        assert Decimal(results[0]["total"]) == Decimal("5900")
+        assert results[0]["order_number"] != results[4]["order_number"]
+
+        # Created orders read back exactly like single-path ones
+        order = client.get(f"/api/orders/{results[4]['order_id']}", headers=headers).json()
+        assert order["status"] == "draft"
+        assert Decimal(order["subtotal"]) == Decimal("7500")
+        assert Decimal(order["total"]) == Decimal("7400")
+        assert len(order["line_items"]) == 1
+        assert order["order_number"] == results[4]["order_number"]
+
+        assert db.query(SalesOrder).count() == 2
+        assert db.query(SalesOrderItem).count() == 3
+        assert db.query(AuditLog).filter(AuditLog.entity_type == "order").count() == 2
+
+    def test_statements_do_not_grow_with_batch_size(self, client, db, query_budget):
+        headers, customer, products = self._setup(db, client)
+
+        payload = {"orders": [self._order(customer, products) for _ in range(50)]}
+
+        # customers, products, number block, orders, items, audit
+        with query_budget(6):
+            response = client.post("/api/orders/batch", json=payload, headers=headers)
+        assert response.json()["created"] == 50
+
+    def test_numbers_reserved_once_across_blocks(self, client, db, query_budget, monkeypatch):
+        """A batch spanning many number blocks still reserves them in one statement."""
+        headers, customer, products = self._setup(db, client)
+        monkeypatch.setattr(allocator, "block_size", 7)
+        payload = {"orders": [self._order(customer, products) for _ in range(50)]}
+
+        with query_budget(6):
+            response = client.post("/api/orders/batch", json=payload, headers=headers)
+        numbers = [r["order_number"] for r in response.json()["results"]]
+        assert len(set(numbers)) == 50
+        assert [int(n.rsplit("-", 1)[1]) for n in numbers] == list(range(1, 51))
+
+    def test_throughput_vs_single_orders(self, client, db):
+        """Benchmark: orders/second through the batch path vs one POST per order."""
+        headers, customer, products = self._setup(db, client, products=5)
+        count = 200
+        payloads = [self._order(customer, products) for _ in range(count)]
+
+        start = time.perf_counter()
+        for payload in payloads:
+            assert client.post("/api/orders", json=payload, headers=headers).status_code == 201
+        single = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = client.post("/api/orders/batch", json={"orders": payloads}, headers=headers)
+        batch = count / (time.perf_counter() - start)
+
+        assert response.json()["created"] == count
+        print(f"\norders/s single={single:.0f} batch={batch:.0f} ({batch / single:.1f}x)")
+        assert batch > 3 * single
+
+
+class TestBatchStatus:
+    """POST /api/orders/status/batch moves many orders in one transaction."""
+
+    def _setup(self, db, client, orders=4, stock=10):
+        headers, customer, products = TestBatchCreate()._setup(db, client, products=2)
+        for product in products:
+            product.current_stock = stock
+        db.commit()
+        response = client.post("/api/orders/batch", json={"orders": [
+            TestBatchCreate()._order(customer, products) for _ in range(orders)
+        ]}, headers=headers)
+        return headers, customer, products, [r["order_id"] for r in response.json()["results"]]
+
+    def test_confirm_ship_cancel(self, client, db):
+        # Each order takes 2 of each product; stock covers 3 of the 4 orders
+        headers, customer, products, order_ids = self._setup(db, client, stock=7)
+        missing = str(uuid.uuid4())
+
+        response = client.post("/api/orders/status/batch", json={
+            "order_ids": [*order_ids, missing, order_ids[0]], "status": "confirmed"
+        }, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["updated"], body["failed"]) == (3, 3)
+        assert [r["success"] for r in body["results"]] == [True, True, True, False, False, False]
+        assert body["results"][3]["error"] == "Insufficient stock for BT000"
+        assert body["results"][4]["error"] == "Order not found"
+        assert body["results"][5]["error"] == "Duplicate order"
+
+        for product in products:
+            db.refresh(product)
+            assert product.current_stock == 1
+        db.refresh(customer)
+        assert customer.total_debt == Decimal("-17700")
+        assert db.query(StockMovement).filter(StockMovement.type == MovementType.OUT).count() == 6
+        assert db.query(DailySalesTotal).one().order_count == 3
+
+        # Shipping a draft order is not an allowed transition
+        response = client.post("/api/orders/status/batch", json={
+            "order_ids": order_ids[:2] + order_ids[3:], "status": "shipped"
+        }, headers=headers)
+        results = response.json()["results"]
+        assert [r["success"] for r in results] == [True, True, False]
+        assert results[2]["error"] == "Cannot transition from draft to shipped"
+
+        # Cancelling a confirmed order reverses its effects; a draft one has none
+        response = client.post("/api/orders/status/batch", json={
+            "order_ids": order_ids[2:], "status": "cancelled"
+        }, headers=headers)
+        assert response.json()["updated"] == 2
+        for product in products:
+            db.refresh(product)
+            assert product.current_stock == 3
+        db.refresh(customer)
+        assert customer.total_debt == Decimal("-11800")
+        assert db.query(DailySalesTotal).one().order_count == 2
+
+        statuses = [client.get(f"/api/orders/{oid}", headers=headers).json()["status"] for oid in order_ids]
+        assert statuses == ["shipped", "shipped", "cancelled", "cancelled"]
+        assert db.query(AuditLog).filter(AuditLog.action == "status_change").count() == 7
+
+    def test_statements_do_not_grow_with_batch_size(self, client, db, query_budget):
+        headers, _, _, order_ids = self._setup(db, client, orders=300, stock=1000)
+        payload = {"order_ids": order_ids, "status": "confirmed"}
+
+        # orders, items, product check; stock lock, update, movements;
+        # ledger entries, two rollup upserts, status, audit; after commit,
+        # claiming the entries and the debt update
+        with query_budget(13):
+            response = client.post("/api/orders/status/batch", json=payload, headers=headers)
+        assert response.json()["updated"] == 300
@@ -0,0 +1,68 @@
+"""Order endpoints load the response graph in a fixed number of queries."""
+import pytest
+from decimal import Decimal
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.services.auth import hash_password
+
+
+class TestLargeOrderQueries:
+    """A 200-line order costs the same handful of statements as a small one."""
+
+    LINES = 200
+
+    def _setup(self, db, client):
+        user = User(
+            email="eager@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Eager User",
+            role=UserRole.STAFF
+        )
+        customer = Customer(code="EAGER01", name="Eager Customer")
+        products = [
+            Product(sku=f"EG{i:04d}", name=f"Eager Product {i}", cost_price=Decimal("1000"),
+                    sell_price=Decimal("1500"), current_stock=10)
+            for i in range(self.LINES)
+        ]
+        db.add_all([user, customer, *products])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "eager@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, customer, products
+
+    def test_create_get_confirm(self, client, db, query_budget):
+        headers, customer, products = self._setup(db, client)
+        payload = {
+            "customer_id": str(customer.id),
+            "line_items": [
+                {"product_id": str(p.id), "quantity": 2, "unit_price": 1500} for p in products
+            ],
+        }
+
+        # 7 plus reserving the first block of order numbers
+        with query_budget(8):
+            response = client.post("/api/orders", json=payload, headers=headers)
+        assert response.status_code == 201
+        order = response.json()
+        assert len(order["line_items"]) == self.LINES
+        assert order["customer_name"] == "Eager Customer"
+        assert order["creator_name"] == "Eager User"
+        assert {line["product_sku"] for line in order["line_items"]} == {p.sku for p in products}
+
+        with query_budget(2):
+            response = client.get(f"/api/orders/{order['id']}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["line_items"][0]["product_name"].startswith("Eager Product")
+
+        with query_budget(14):
+            response = client.put(f"/api/orders/{order['id']}/status",
+                                  json={"status": "confirmed"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["status"] == "confirmed"
+        assert len(response.json()["line_items"]) == self.LINES
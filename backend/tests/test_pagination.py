@@ -0,0 +1,109 @@
+"""Keyset (cursor) pagination tests."""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.order import SalesOrder
+from app.models.stock import StockMovement, MovementType
+from app.services.auth import hash_password
+
+
+class TestKeysetPagination:
+    """Cursor pages cover every row exactly once, in the offset order."""
+
+    def _setup(self, db, client):
+        user = User(
+            email="pages@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Pages User",
+            role=UserRole.STAFF
+        )
+        db.add(user)
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "pages@example.com",
+            "password": "password123"
+        })
+        return {"Authorization": f"Bearer {resp.json()['access_token']}"}, user
+
+    def _walk(self, client, headers, url, size, **filters):
+        """Follow next_cursor from the first page until the last one."""
+        ids = []
+        params = {"size": size, "include_total": False, **filters}
+        while True:
+            data = client.get(url, params=params, headers=headers).json()
+            assert data["total"] is None
+            ids.extend(item["id"] for item in data["items"])
+            if not data["next_cursor"]:
+                return ids
+            params["cursor"] = data["next_cursor"]
+
+    def test_orders_cursor_matches_offset_order(self, client, db):
+        """Orders sharing a timestamp are neither skipped nor repeated."""
+        headers, user = self._setup(db, client)
+        customer = Customer(code="PKH001", name="Pages Customer")
+        db.add(customer)
+        db.flush()
+
+        base = datetime(2026, 1, 1, 8, 0, 0)
+        for i in range(23):
+            db.add(SalesOrder(
+                order_number=f"SO-PAGE-{i}",
+                customer_id=customer.id,
+                created_by=user.id,
+                order_date=base + timedelta(minutes=i // 3),
+            ))
+        db.commit()
+
+        full = client.get("/api/orders", params={"size": 100}, headers=headers).json()
+        assert full["total"] == 23
+        assert full["next_cursor"] is None
+
+        ids = self._walk(client, headers, "/api/orders", 5)
+        assert ids == [item["id"] for item in full["items"]]
+
+    def test_first_page_returns_cursor(self, client, db):
+        """An offset request exposes next_cursor so clients can switch modes."""
+        headers, _ = self._setup(db, client)
+        for i in range(3):
+            db.add(Product(sku=f"PG{i:03d}", name=f"Page Product {i}"))
+        db.commit()
+
+        data = client.get("/api/products", params={"size": 2}, headers=headers).json()
+        assert data["total"] == 3
+        assert [p["sku"] for p in data["items"]] == ["PG000", "PG001"]
+
+        nxt = client.get("/api/products", params={"size": 2, "cursor": data["next_cursor"]},
+                         headers=headers).json()
+        assert [p["sku"] for p in nxt["items"]] == ["PG002"]
+        assert nxt["next_cursor"] is None
+
+    def test_movements_cursor_with_filter(self, client, db):
+        """Cursor pages respect the product filter."""
+        headers, user = self._setup(db, client)
+        product = Product(sku="PGMOV", name="Moving Product")
+        other = Product(sku="PGOTHER", name="Other Product")
+        db.add_all([product, other])
+        db.flush()
+
+        base = datetime(2026, 1, 1, 8, 0, 0)
+        for i in range(12):
+            for p in (product, other):
+                db.add(StockMovement(
+                    product_id=p.id, created_by=user.id, type=MovementType.IN,
+                    quantity=1, stock_before=i, stock_after=i + 1,
+                    created_at=base + timedelta(seconds=i // 2),
+                ))
+        db.commit()
+
+        ids = self._walk(client, headers, "/api/stock", 5, product_id=str(product.id))
+        assert len(ids) == len(set(ids)) == 12
+
+    def test_invalid_cursor(self, client, db):
+        """A malformed cursor is a client error."""
+        headers, _ = self._setup(db, client)
+        response = client.get("/api/customers", params={"cursor": "not-a-cursor"}, headers=headers)
+        assert response.status_code == 400
@@ -0,0 +1,123 @@
+"""FIFO payment allocation tests."""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.models.user import User, UserRole
+from app.models.customer import Customer
+from app.models.order import SalesOrder, OrderStatus
+from app.models.payment import PaymentAllocation
+from app.models.report import DailySalesTotal
+from app.services.auth import hash_password
+from app.services.rollup import rebuild_sales_rollup
+
+
+class TestPaymentAllocation:
+    """Incoming settlements pay off the customer's oldest open orders."""
+
+    def _setup(self, db, client, orders=None):
+        user = User(
+            email="allocation@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Allocation User",
+            role=UserRole.STAFF
+        )
+        customer = Customer(code="ALLOC01", name="Allocation Customer")
+        db.add_all([user, customer])
+        db.flush()
+
+        # (age in days, status, total, paid); oldest open orders are paid first
+        orders = orders or [
+            (10, OrderStatus.CONFIRMED, 300000, 0),
+            (30, OrderStatus.COMPLETED, 100000, 0),
+            (20, OrderStatus.SHIPPED, 200000, 50000),
+            (40, OrderStatus.DRAFT, 500000, 0),
+            (50, OrderStatus.COMPLETED, 80000, 80000),
+        ]
+        now = datetime.utcnow()
+        created = []
+        for i, (age, status, total, paid) in enumerate(orders):
+            order = SalesOrder(
+                order_number=f"ALLOC-{i:03d}", customer_id=customer.id, created_by=user.id,
+                status=status, subtotal=total, total=total, paid_amount=paid,
+                order_date=now - timedelta(days=age)
+            )
+            db.add(order)
+            created.append(order)
+        db.flush()
+        rebuild_sales_rollup(db)
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "allocation@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, customer.id, [o.id for o in created]
+
+    def _pay(self, client, headers, customer_id, amount, **fields):
+        response = client.post("/api/payments", json={
+            "type": "incoming", "customer_id": str(customer_id), "amount": amount,
+            "is_settlement": True, **fields
+        }, headers=headers)
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    def _paid(self, db, order_ids):
+        db.expire_all()
+        return [int(db.get(SalesOrder, oid).paid_amount) for oid in order_ids]
+
+    def _collected(self, db):
+        return int(sum(row.collected for row in db.query(DailySalesTotal)))
+
+    def test_oldest_open_orders_first(self, client, db):
+        headers, customer_id, orders = self._setup(db, client)
+        collected = self._collected(db)
+
+        self._pay(client, headers, customer_id, 180000)
+        assert self._paid(db, orders) == [0, 100000, 130000, 0, 80000]
+        second = self._pay(client, headers, customer_id, 400000)
+        # The remainder beyond open orders only reduces the customer's balance
+        assert self._paid(db, orders) == [300000, 100000, 200000, 0, 80000]
+        assert self._collected(db) == collected + 550000
+
+        response = client.get(f"/api/orders/{orders[2]}/payments", headers=headers)
+        assert response.status_code == 200
+        assert [int(Decimal(p["amount"])) for p in response.json()] == [80000, 70000]
+        assert response.json()[1]["payment_id"] == second
+
+    def test_linked_and_non_settlement_payments(self, client, db):
+        headers, customer_id, orders = self._setup(db, client)
+
+        self._pay(client, headers, customer_id, 20000, order_id=str(orders[0]))
+        self._pay(client, headers, customer_id, 50000, is_settlement=False)
+        assert self._paid(db, orders) == [20000, 0, 50000, 0, 80000]
+        assert db.query(PaymentAllocation).count() == 1
+
+    def test_delete_reverses_allocations(self, client, db):
+        headers, customer_id, orders = self._setup(db, client)
+        collected = self._collected(db)
+
+        payment_id = self._pay(client, headers, customer_id, 250000)
+        assert self._paid(db, orders) == [0, 100000, 200000, 0, 80000]
+        assert db.query(PaymentAllocation).count() == 2
+
+        assert client.delete(f"/api/payments/{payment_id}", headers=headers).status_code == 204
+        assert self._paid(db, orders) == [0, 0, 50000, 0, 80000]
+        assert db.query(PaymentAllocation).count() == 0
+        assert self._collected(db) == collected
+
+    def test_statements_do_not_grow_with_orders(self, client, db, count_queries):
+        many = [(age, OrderStatus.CONFIRMED, 10000, 0) for age in range(40)]
+        headers, customer_id, orders = self._setup(db, client, orders=many)
+
+        with count_queries() as one:
+            self._pay(client, headers, customer_id, 10000)
+        with count_queries() as all_open:
+            payment_id = self._pay(client, headers, customer_id, 390000)
+        assert self._paid(db, orders) == [10000] * 40
+        assert all_open.count <= one.count
+
+        with count_queries() as release:
+            client.delete(f"/api/payments/{payment_id}", headers=headers)
+        assert release.count <= one.count
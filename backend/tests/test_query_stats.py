@@ -0,0 +1,79 @@
+"""Per-request query statistics tests."""
+import logging
+import pytest
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.query_stats import REPEATED_STATEMENT_THRESHOLD, track_queries
+from app.services.auth import hash_password
+
+
+class TestQueryStats:
+    """Statement counts and DB time are reported per request."""
+
+    def _setup(self, db, client):
+        user = User(
+            email="stats@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Stats User",
+            role=UserRole.STAFF
+        )
+        db.add(user)
+        db.add(Product(sku="QS001", name="Stats Product"))
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "stats@example.com",
+            "password": "password123"
+        })
+        return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    def test_headers_match_statements(self, client, db, count_queries):
+        """X-DB-Query-Count reports exactly the statements the request issued."""
+        headers = self._setup(db, client)
+
+        with count_queries() as counter:
+            response = client.get("/api/products", headers=headers)
+
+        assert response.status_code == 200
+        assert int(response.headers["X-DB-Query-Count"]) == counter.count > 0
+        assert float(response.headers["X-DB-Time-Ms"]) >= 0
+
+    def test_log_line_keyed_by_request_id(self, client, db, caplog):
+        headers = self._setup(db, client)
+
+        with caplog.at_level(logging.INFO, logger="sme"):
+            response = client.get("/api/products", headers=headers)
+
+        request_id = response.headers["X-Request-ID"]
+        records = [r for r in caplog.records if getattr(r, "request_id", None) == request_id]
+        assert len(records) == 1
+        assert records[0].db_queries == int(response.headers["X-DB-Query-Count"])
+        assert records[0].path == "/api/products"
+
+    def test_repeated_statements_are_flagged(self, db):
+        """The same statement issued in a loop is reported as a likely N+1."""
+        product = Product(sku="QS002", name="Repeated")
+        db.add(product)
+        db.commit()
+        product_id = product.id
+
+        with track_queries() as stats:
+            for _ in range(REPEATED_STATEMENT_THRESHOLD):
+                db.query(Product).filter(Product.id == product_id).first()
+
+        assert stats.count == REPEATED_STATEMENT_THRESHOLD
+        [(statement, count)] = stats.repeated()
+        assert "FROM products" in statement
+        assert count == REPEATED_STATEMENT_THRESHOLD
+
+    def test_query_budget(self, client, db, query_budget):
+        """The budget fixture passes within budget and fails the test when exceeded."""
+        headers = self._setup(db, client)
+        client.get("/api/products", headers=headers)  # warm the user cache
+
+        with query_budget(2):
+            client.get("/api/products", headers=headers)
+
+        with pytest.raises(pytest.fail.Exception, match="Query budget exceeded"):
+            with query_budget(1):
+                client.get("/api/products", headers=headers)
@@ -0,0 +1,444 @@
+"""Report aggregation tests."""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.models.order import SalesOrder, SalesOrderItem, OrderStatus
+from app.models.stock import StockMovement, MovementType
+from app.models.report import DailySalesRollup, DailySalesTotal
+from app.helpers import business_date
+from app.services.auth import hash_password
+from app.services.reports import arap_cache
+from app.services.rollup import rebuild_sales_rollup
+
+
+class TestDashboardAggregation:
+    """Dashboard metrics are computed with set-based aggregates."""
+
+    def _setup(self, db, client):
+        user = User(
+            email="dash@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Dash User",
+            role=UserRole.STAFF
+        )
+        db.add(user)
+
+        product = Product(sku="DASH001", name="Dash Product", cost_price=Decimal("60000"),
+                          current_stock=10000, min_stock=5)
+        low = Product(sku="DASH002", name="Low Product", current_stock=1, min_stock=5)
+        db.add_all([product, low])
+
+        customer = Customer(code="DKH001", name="Dash Customer", total_debt=Decimal("-300000"))
+        creditor = Customer(code="DKH002", name="Prepaid Customer", total_debt=Decimal("50000"))
+        supplier = Supplier(code="DSUP001", name="Dash Supplier", total_payable=Decimal("200000"))
+        db.add_all([customer, creditor, supplier])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "dash@example.com",
+            "password": "password123"
+        })
+        return resp.json()["access_token"], user, product, customer
+
+    def _add_orders(self, db, user, product, customer, count, start=0):
+        """Add confirmed orders with two lines each plus a matching stock receipt."""
+        for i in range(start, start + count):
+            order = SalesOrder(
+                order_number=f"SO-DASH-{i}",
+                customer_id=customer.id,
+                created_by=user.id,
+                status=OrderStatus.CONFIRMED,
+                subtotal=Decimal("200000"),
+                total=Decimal("200000"),
+                paid_amount=Decimal("50000"),
+            )
+            db.add(order)
+            db.flush()
+            for _ in range(2):
+                db.add(SalesOrderItem(
+                    order_id=order.id,
+                    product_id=product.id,
+                    quantity=1,
+                    unit_price=Decimal("100000"),
+                    cost_price=Decimal("60000"),
+                    line_total=Decimal("100000"),
+                ))
+            db.add(StockMovement(
+                product_id=product.id,
+                created_by=user.id,
+                type=MovementType.IN,
+                quantity=2,
+                stock_before=0,
+                stock_after=2,
+            ))
+        db.commit()
+        # Orders inserted directly bypass the status workflow - backfill the rollup
+        rebuild_sales_rollup(db)
+        db.commit()
+
+    def test_dashboard_values(self, client, db):
+        """Aggregates match the per-order arithmetic."""
+        token, user, product, customer = self._setup(db, client)
+        self._add_orders(db, user, product, customer, 3)
+
+        response = client.get("/api/reports/dashboard",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["today_count"] == 3
+        assert data["month_count"] == 3
+        assert Decimal(data["today_revenue"]) == Decimal("600000")
+        assert Decimal(data["today_collected"]) == Decimal("150000")
+        assert Decimal(data["today_debt"]) == Decimal("450000")
+        assert Decimal(data["today_profit"]) == Decimal("240000")
+        assert Decimal(data["month_import_cost"]) == Decimal("360000")
+        assert Decimal(data["total_receivables"]) == Decimal("300000")
+        assert Decimal(data["total_payables"]) == Decimal("250000")
+        assert data["debtor_count"] == 1
+        assert data["creditor_count"] == 2
+        assert data["total_customers"] == 2
+        assert data["total_products"] == 2
+        assert data["low_stock_count"] == 1
+
+    def test_dashboard_query_count_is_constant(self, client, db, count_queries):
+        """Query count does not grow with order, line item or movement volume."""
+        token, user, product, customer = self._setup(db, client)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        self._add_orders(db, user, product, customer, 5)
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        with count_queries() as small:
+            assert client.get("/api/reports/dashboard", headers=headers).status_code == 200
+
+        self._add_orders(db, user, product, customer, 200, start=5)
+        arap_cache.invalidate()  # compare cold AR/AP figures too
+        with count_queries() as large:
+            response = client.get("/api/reports/dashboard", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["today_count"] == 205
+
+        assert large.count == small.count
+        assert large.count <= 8
+
+
+class TestSalesRollup:
+    """Daily sales rollup is maintained by order status transitions."""
+
+    def _setup(self, db, client):
+        user = User(
+            email="rollup@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Rollup User",
+            role=UserRole.STAFF
+        )
+        db.add(user)
+
+        product_a = Product(sku="ROLL-A", name="Rollup A", cost_price=Decimal("40000"), current_stock=100)
+        product_b = Product(sku="ROLL-B", name="Rollup B", cost_price=Decimal("10000"), current_stock=100)
+        customer = Customer(code="RKH100", name="Rollup Customer")
+        db.add_all([product_a, product_b, customer])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "rollup@example.com",
+            "password": "password123"
+        })
+        return resp.json()["access_token"], product_a, product_b, customer
+
+    def _create_order(self, client, headers, customer, product_a, product_b):
+        resp = client.post("/api/orders",
+            json={
+                "customer_id": str(customer.id),
+                "line_items": [
+                    {"product_id": str(product_a.id), "quantity": 2, "unit_price": 100000},
+                    {"product_id": str(product_b.id), "quantity": 3, "unit_price": 20000},
+                    {"product_id": str(product_a.id), "quantity": 1, "unit_price": 100000},
+                ],
+                "discount": 10000
+            },
+            headers=headers
+        )
+        assert resp.status_code == 201
+        return resp.json()["id"]
+
+    def _snapshot(self, db):
+        db.expire_all()
+        rows = {
+            (r.business_date, r.product_id): (Decimal(str(r.revenue)), r.quantity, Decimal(str(r.cost)), r.order_count)
+            for r in db.query(DailySalesRollup).all()
+        }
+        totals = {
+            t.business_date: (Decimal(str(t.revenue)), Decimal(str(t.subtotal)), Decimal(str(t.cost)),
+                              Decimal(str(t.collected)), t.order_count)
+            for t in db.query(DailySalesTotal).all()
+        }
+        return rows, totals
+
+    def test_confirm_adds_and_cancel_subtracts(self, client, db):
+        """Confirming adds the order to the rollup, cancelling removes it."""
+        token, product_a, product_b, customer = self._setup(db, client)
+        headers = {"Authorization": f"Bearer {token}"}
+        order_id = self._create_order(client, headers, customer, product_a, product_b)
+
+        # Drafts are not reported
+        assert db.query(DailySalesRollup).count() == 0
+
+        client.put(f"/api/orders/{order_id}/status", json={"status": "confirmed"}, headers=headers)
+        rows, totals = self._snapshot(db)
+        by_product = {product_id: vals for (_, product_id), vals in rows.items()}
+        assert by_product[product_a.id] == (Decimal("300000"), 3, Decimal("120000"), 1)
+        assert by_product[product_b.id] == (Decimal("60000"), 3, Decimal("30000"), 1)
+        [day_totals] = totals.values()
+        assert day_totals == (Decimal("350000"), Decimal("360000"), Decimal("150000"), Decimal("0"), 1)
+
+        client.put(f"/api/orders/{order_id}/status", json={"status": "cancelled"}, headers=headers)
+        rows, totals = self._snapshot(db)
+        assert all(vals == (Decimal("0"), 0, Decimal("0"), 0) for vals in rows.values())
+        assert all(vals[-1] == 0 and vals[0] == Decimal("0") for vals in totals.values())
+
+    def test_rebuild_matches_incremental(self, client, db):
+        """Backfill produces the same rows as incremental maintenance."""
+        token, product_a, product_b, customer = self._setup(db, client)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for _ in range(3):
+            order_id = self._create_order(client, headers, customer, product_a, product_b)
+            client.put(f"/api/orders/{order_id}/status", json={"status": "confirmed"}, headers=headers)
+        client.post("/api/payments",
+            json={"type": "incoming", "customer_id": str(customer.id), "order_id": order_id,
+                  "amount": 50000, "is_settlement": True},
+            headers=headers
+        )
+        cancelled_id = self._create_order(client, headers, customer, product_a, product_b)
+        client.put(f"/api/orders/{cancelled_id}/status", json={"status": "confirmed"}, headers=headers)
+        client.put(f"/api/orders/{cancelled_id}/status", json={"status": "cancelled"}, headers=headers)
+
+        incremental_rows, incremental_totals = self._snapshot(db)
+        rebuild_sales_rollup(db)
+        db.commit()
+        rebuilt_rows, rebuilt_totals = self._snapshot(db)
+
+        assert {k: v for k, v in incremental_rows.items() if v[-1]} == rebuilt_rows
+        assert {k: v for k, v in incremental_totals.items() if v[-1]} == rebuilt_totals
+        [day_totals] = rebuilt_totals.values()
+        assert day_totals[3] == Decimal("50000")
+
+    def test_reports_read_rollup(self, client, db):
+        """Revenue and top-products reports are served from the rollup."""
+        token, product_a, product_b, customer = self._setup(db, client)
+        headers = {"Authorization": f"Bearer {token}"}
+        for _ in range(2):
+            order_id = self._create_order(client, headers, customer, product_a, product_b)
+            client.put(f"/api/orders/{order_id}/status", json={"status": "confirmed"}, headers=headers)
+
+        revenue = client.get("/api/reports/revenue?days=7", headers=headers).json()
+        assert revenue["total_orders"] == 2
+        assert Decimal(revenue["total_revenue"]) == Decimal("700000")
+
+        top = client.get("/api/reports/top-products?days=7", headers=headers).json()["data"]
+        by_sku = {p["product_sku"]: p for p in top}
+        assert set(by_sku) == {"ROLL-A", "ROLL-B"}
+        assert by_sku["ROLL-A"]["quantity_sold"] == 6
+        assert Decimal(by_sku["ROLL-A"]["total_revenue"]) == Decimal("600000")
+
+        dashboard = client.get("/api/reports/dashboard", headers=headers).json()
+        assert dashboard["today_count"] == 2
+        assert Decimal(dashboard["today_profit"]) == Decimal("420000")
+
+    def test_revenue_series_fills_gaps(self, client, db, query_budget):
+        """Day/week/month series has one row per bucket, zeros included."""
+        token, *_ = self._setup(db, client)
+        headers = {"Authorization": f"Bearer {token}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        today = business_date()
+        figures = {0: (100, 1), 3: (200, 2), 20: (400, 1), 40: (800, 1)}  # days ago: revenue, orders
+        db.add_all([
+            DailySalesTotal(business_date=today - timedelta(days=ago), revenue=Decimal(revenue),
+                            subtotal=Decimal(revenue), cost=Decimal("0"), collected=Decimal("0"),
+                            order_count=orders)
+            for ago, (revenue, orders) in figures.items()
+        ])
+        db.commit()
+
+        starts = {
+            "day": lambda d: d,
+            "week": lambda d: d - timedelta(days=d.weekday()),
+            "month": lambda d: d.replace(day=1),
+        }
+        for granularity, start_of in starts.items():
+            with query_budget(1):
+                report = client.get(
+                    f"/api/reports/revenue?days=30&granularity={granularity}", headers=headers
+                ).json()
+            expected = {}
+            for ago in range(31):
+                day = today - timedelta(days=ago)
+                revenue, orders = figures.get(ago, (0, 0))
+                bucket = expected.setdefault(start_of(day).isoformat(), [0, 0])
+                bucket[0] += revenue
+                bucket[1] += orders
+            assert report["granularity"] == granularity
+            assert [p["period"] for p in report["data"]] == sorted(expected)
+            assert {
+                p["period"]: [Decimal(p["revenue"]), p["order_count"]] for p in report["data"]
+            } == expected
+            assert Decimal(report["total_revenue"]) == Decimal("700")
+            assert report["total_orders"] == 4
+
+        assert client.get("/api/reports/revenue?granularity=year", headers=headers).status_code == 422
+
+
+class TestARAPSummary:
+    """AR/AP figures are computed once and evicted by balance changes."""
+
+    def _setup(self, db, client):
+        user = User(
+            email="arap@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="ARAP User",
+            role=UserRole.STAFF
+        )
+        product = Product(sku="ARAP-P", name="ARAP Product", current_stock=10)
+        customer = Customer(code="ARKH01", name="AR Customer", total_debt=Decimal("-300000"))
+        supplier = Supplier(code="APSUP01", name="AP Supplier", total_payable=Decimal("200000"))
+        db.add_all([user, product, customer, supplier])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "arap@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, product, customer, supplier
+
+    def _summary(self, client, headers):
+        data = client.get("/api/payments/ar-ap", headers=headers).json()
+        return Decimal(data["total_receivables"]), Decimal(data["total_payables"])
+
+    def test_cached_until_balances_change(self, client, db, query_budget):
+        headers, product, customer, supplier = self._setup(db, client)
+        customer_id, product_id, supplier_id = customer.id, product.id, supplier.id
+
+        with query_budget(2):
+            assert self._summary(client, headers) == (Decimal("-300000"), Decimal("200000"))
+        with query_budget(0):
+            assert self._summary(client, headers) == (Decimal("-300000"), Decimal("200000"))
+        # sales, import cost, products; AR/AP comes from the cache
+        with query_budget(3):
+            dashboard = client.get("/api/reports/dashboard", headers=headers)
+        assert Decimal(dashboard.json()["total_receivables"]) == Decimal("300000")
+
+        # Payment changes a balance through the ledger
+        client.post("/api/payments", json={
+            "type": "outgoing", "supplier_id": str(supplier_id), "amount": 50000, "is_settlement": True
+        }, headers=headers)
+        assert self._summary(client, headers) == (Decimal("-300000"), Decimal("150000"))
+
+        # Order confirmation changes it with a set-based UPDATE
+        order = client.post("/api/orders", json={
+            "customer_id": str(customer_id),
+            "line_items": [{"product_id": str(product_id), "quantity": 1, "unit_price": 100000}]
+        }, headers=headers).json()
+        assert self._summary(client, headers) == (Decimal("-300000"), Decimal("150000"))
+        client.put(f"/api/orders/{order['id']}/status", json={"status": "confirmed"}, headers=headers)
+        assert self._summary(client, headers) == (Decimal("-400000"), Decimal("150000"))
+
+        # A failed (rolled back) change leaves the cached figures in place
+        response = client.put(f"/api/orders/{order['id']}/status",
+                              json={"status": "completed"}, headers=headers)
+        assert response.status_code == 400
+        with query_budget(0):
+            assert self._summary(client, headers) == (Decimal("-400000"), Decimal("150000"))
+
+
+class TestARAging:
+    """Receivables aging is one grouped query, cached until receivables change."""
+
+    def _setup(self, db, client):
+        user = User(
+            email="aging@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Aging User",
+            role=UserRole.STAFF
+        )
+        big = Customer(code="AGE01", name="Big Debtor")
+        small = Customer(code="AGE02", name="Small Debtor")
+        paid_up = Customer(code="AGE03", name="Paid Up")
+        db.add_all([user, big, small, paid_up])
+        db.flush()
+
+        now = datetime.utcnow()
+        # (customer, age in days, status, total, paid)
+        orders = [
+            (big, 5, OrderStatus.CONFIRMED, 100000, 40000),
+            (big, 45, OrderStatus.SHIPPED, 200000, 0),
+            (big, 75, OrderStatus.COMPLETED, 300000, 100000),
+            (big, 200, OrderStatus.COMPLETED, 50000, 0),
+            (big, 10, OrderStatus.DRAFT, 999000, 0),
+            (big, 10, OrderStatus.CANCELLED, 999000, 0),
+            (small, 30, OrderStatus.CONFIRMED, 70000, 0),
+            (small, 31, OrderStatus.CONFIRMED, 20000, 0),
+            (paid_up, 15, OrderStatus.COMPLETED, 80000, 80000),
+        ]
+        for i, (customer, age, status, total, paid) in enumerate(orders):
+            db.add(SalesOrder(
+                order_number=f"AGE-{i:03d}", customer_id=customer.id, created_by=user.id,
+                status=status, subtotal=total, total=total, paid_amount=paid,
+                order_date=now - timedelta(days=age)
+            ))
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "aging@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, big.id, small.id
+
+    def _buckets(self, row):
+        return [int(Decimal(row[k])) for k in
+                ("days_0_30", "days_31_60", "days_61_90", "days_over_90", "total_open")]
+
+    def test_buckets_and_totals(self, client, db):
+        headers, big, small = self._setup(db, client)
+
+        response = client.get("/api/reports/ar-aging", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        first, second = data["items"]
+        assert first["customer_id"] == str(big)
+        assert self._buckets(first) == [60000, 200000, 200000, 50000, 510000]
+        assert second["customer_id"] == str(small)
+        assert self._buckets(second) == [70000, 20000, 0, 0, 90000]
+        assert self._buckets(data["totals"]) == [130000, 220000, 200000, 50000, 600000]
+
+        page = client.get("/api/reports/ar-aging", params={"page": 2, "size": 1}, headers=headers).json()
+        assert [item["customer_id"] for item in page["items"]] == [str(small)]
+        assert (page["total"], self._buckets(page["totals"])[-1]) == (2, 600000)
+
+    def test_cached_until_payment(self, client, db, query_budget):
+        headers, big, small = self._setup(db, client)
+
+        with query_budget(1):
+            client.get("/api/reports/ar-aging", headers=headers)
+        with query_budget(0):
+            client.get("/api/reports/ar-aging", params={"page": 2, "size": 1}, headers=headers)
+
+        order = db.query(SalesOrder).filter(SalesOrder.order_number == "AGE-006").one()
+        response = client.post("/api/payments", json={
+            "type": "incoming", "customer_id": str(small), "order_id": str(order.id),
+            "amount": 70000, "is_settlement": True
+        }, headers=headers)
+        assert response.status_code == 201
+
+        with query_budget(1):
+            data = client.get("/api/reports/ar-aging", headers=headers).json()
+        assert self._buckets(data["items"][1]) == [0, 20000, 0, 0, 20000]
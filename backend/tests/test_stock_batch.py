@@ -0,0 +1,98 @@
+"""Bulk stock receiving tests."""
+import time
+import uuid
+import pytest
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.stock import StockMovement
+from app.services.auth import hash_password
+
+
+class TestStockInBatch:
+    """POST /api/stock/in/batch receives a delivery in one transaction."""
+
+    def _setup(self, db, client, products=3):
+        user = User(
+            email="receiving@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Receiving User",
+            role=UserRole.STAFF
+        )
+        items = [
+            Product(sku=f"RC{i:04d}", name=f"Received {i}", current_stock=5) for i in range(products)
+        ]
+        db.add_all([user, *items])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "receiving@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, [p.id for p in items]
+
+    def test_duplicates_are_aggregated(self, client, db):
+        headers, (a, b, c) = self._setup(db, client)
+
+        response = client.post("/api/stock/in/batch", json={"lines": [
+            {"product_id": str(a), "quantity": 3, "reason": "PO-1"},
+            {"product_id": str(b), "quantity": 10},
+            {"product_id": str(a), "quantity": 4, "reason": "PO-2"},
+            {"product_id": str(a), "quantity": 1, "reason": "PO-1"},
+        ]}, headers=headers)
+
+        assert response.status_code == 201
+        body = response.json()
+        assert body["total_quantity"] == 18
+        first, second = body["items"]
+        assert (first["product_id"], first["quantity"]) == (str(a), 8)
+        assert (first["stock_before"], first["stock_after"]) == (5, 13)
+        assert first["reason"] == "PO-1; PO-2"
+        assert (second["quantity"], second["stock_after"], second["reason"]) == (10, 15, None)
+
+        assert db.get(Product, a).current_stock == 13
+        assert db.get(Product, c).current_stock == 5
+        assert db.query(StockMovement).count() == 2
+
+    def test_unknown_product_rejects_batch(self, client, db):
+        headers, (a, _, _) = self._setup(db, client)
+        missing = uuid.uuid4()
+
+        response = client.post("/api/stock/in/batch", json={"lines": [
+            {"product_id": str(a), "quantity": 3},
+            {"product_id": str(missing), "quantity": 1},
+        ]}, headers=headers)
+
+        assert response.status_code == 404
+        assert str(missing) in response.json()["detail"]
+        assert db.get(Product, a).current_stock == 5
+        assert db.query(StockMovement).count() == 0
+
+    def test_statements_do_not_grow_with_lines(self, client, db, query_budget):
+        headers, product_ids = self._setup(db, client, products=300)
+        payload = {"lines": [{"product_id": str(pid), "quantity": 2} for pid in product_ids]}
+
+        # lock, update, movements
+        with query_budget(3):
+            response = client.post("/api/stock/in/batch", json=payload, headers=headers)
+        assert len(response.json()["items"]) == 300
+
+    def test_throughput_vs_per_line(self, client, db):
+        """Benchmark: lines/second through the batch path vs one POST /stock/in per line."""
+        headers, product_ids = self._setup(db, client, products=300)
+        lines = [{"product_id": str(pid), "quantity": 2} for pid in product_ids]
+
+        start = time.perf_counter()
+        for line in lines:
+            assert client.post("/api/stock/in", json=line, headers=headers).status_code == 201
+        single = len(lines) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = client.post("/api/stock/in/batch", json={"lines": lines}, headers=headers)
+        batch = len(lines) / (time.perf_counter() - start)
+
+        assert response.status_code == 201
+        assert all(m["stock_after"] == 9 for m in response.json()["items"])
+        print(f"\nreceipt lines/s per-line={single:.0f} batch={batch:.0f} ({batch / single:.1f}x)")
+        assert batch > 3 * single
@@ -0,0 +1,150 @@
+"""Stock checkpoint and as-of-date stock tests."""
+import uuid
+import pytest
+from datetime import datetime, timezone
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.stock import StockMovement, StockCheckpoint, MovementType
+from app.services.auth import hash_password
+from app.services.checkpoints import as_utc
+from app.services.stock_ledger import build_checkpoints, stock_as_of
+
+
+class TestStockAsOf:
+    """Stock at any timestamp from checkpoints plus a bounded delta scan."""
+
+    # (when, type, quantity, stock_before, stock_after) on a product that started with 10
+    HISTORY = [
+        (datetime(2026, 1, 10, 9), MovementType.IN, 5, 10, 15),
+        (datetime(2026, 2, 15, 9), MovementType.OUT, 3, 15, 12),
+        (datetime(2026, 3, 31, 12), MovementType.ADJUST, -2, 12, 10),
+        (datetime(2026, 4, 5, 9), MovementType.IN, 7, 10, 17),
+    ]
+
+    # (at, expected stock of the moving product)
+    EXPECTED = [
+        ("2026-01-05T00:00:00", 10),
+        ("2026-01-10T09:00:00", 15),
+        ("2026-02-01T00:00:00", 15),
+        ("2026-03-31T11:59:00", 12),
+        ("2026-03-31T12:00:00", 10),
+        ("2026-03-31T19:00:00+07:00", 10),
+        ("2026-04-30T23:59:59", 17),
+        ("2026-09-01T00:00:00", 17),
+    ]
+
+    def _setup(self, db, client):
+        user = User(
+            email="ledger@example.com",
+            hashed_password=hash_password("password123"),
+            full_name="Ledger User",
+            role=UserRole.STAFF
+        )
+        moving = Product(sku="LEDGER-1", name="Moving", current_stock=17)
+        idle = Product(sku="LEDGER-2", name="Idle", current_stock=4)
+        db.add_all([user, moving, idle])
+        db.flush()
+        db.add_all([
+            StockMovement(product_id=moving.id, created_by=user.id, type=kind, quantity=quantity,
+                          stock_before=before, stock_after=after, created_at=when)
+            for when, kind, quantity, before, after in self.HISTORY
+        ])
+        db.commit()
+
+        resp = client.post("/api/auth/login", json={
+            "email": "ledger@example.com",
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        client.get("/api/auth/me", headers=headers)  # warm the user cache
+        return headers, moving.id, idle.id
+
+    def _as_of(self, client, headers, at, *product_ids):
+        response = client.get("/api/stock/as-of", params={
+            "at": at, "product_id": [str(pid) for pid in product_ids]
+        }, headers=headers)
+        assert response.status_code == 200
+        return [item["stock"] for item in response.json()["items"]]
+
+    def test_checkpoints_are_built_incrementally(self, client, db):
+        self._setup(db, client)
+
+        built = build_checkpoints(db, now=datetime(2026, 5, 10))
+        db.commit()
+        assert built == [datetime(2026, m, 1, tzinfo=timezone.utc) for m in (5, 4, 3, 2)]
+        checkpoints = {
+            (c.period_end.month, c.stock) for c in db.query(StockCheckpoint).join(Product).filter(
+                Product.sku == "LEDGER-1"
+            )
+        }
+        assert checkpoints == {(2, 15), (3, 12), (4, 10), (5, 17)}
+        assert db.query(StockCheckpoint).count() == 8
+
+        assert build_checkpoints(db, now=datetime(2026, 5, 31)) == []
+        assert build_checkpoints(db, now=datetime(2026, 6, 1, 0, 30)) == []  # within the grace period
+        assert build_checkpoints(db, now=datetime(2026, 6, 2)) == [datetime(2026, 6, 1, tzinfo=timezone.utc)]
+
+    def test_as_of_with_and_without_checkpoints(self, client, db):
+        headers, moving, idle = self._setup(db, client)
+
+        without = [self._as_of(client, headers, at, moving, idle) for at, _ in self.EXPECTED]
+        build_checkpoints(db, now=datetime(2026, 5, 10))
+        db.commit()
+        with_checkpoints = [self._as_of(client, headers, at, moving, idle) for at, _ in self.EXPECTED]
+
+        expected = [[stock, 4] for _, stock in self.EXPECTED]
+        assert without == expected
+        assert with_checkpoints == expected
+
+    def test_delta_scan_is_bounded(self, client, db, query_budget):
+        headers, moving, idle = self._setup(db, client)
+        build_checkpoints(db, now=datetime(2026, 5, 10))
+        db.commit()
+
+        # products, nearest checkpoints, one delta scan for the shared anchor
+        with query_budget(3) as counter:
+            assert self._as_of(client, headers, "2026-03-31T12:00:00", moving, idle) == [10, 4]
+        delta_scan = counter.statements[-1]
+        assert "stock_movements.created_at >=" in delta_scan
+        assert "stock_movements.created_at <=" in delta_scan
+
+    def test_unknown_product(self, client, db):
+        headers, moving, _ = self._setup(db, client)
+        missing = uuid.uuid4()
+
+        response = client.get("/api/stock/as-of", params={
+            "at": "2026-03-01T00:00:00", "product_id": [str(moving), str(missing)]
+        }, headers=headers)
+        assert response.status_code == 404
+        assert str(missing) in response.json()["detail"]
+
+
+class TestNonUtcSession:
+    """Boundaries and as-of windows stay in UTC whatever the session TimeZone."""
+
+    def test_movement_next_to_a_boundary(self, non_utc_db):
+        with non_utc_db() as db:
+            user = User(email="tz@example.com", hashed_password="x", full_name="TZ User", role=UserRole.STAFF)
+            product = Product(sku="TZ-1", name="Time Zone", current_stock=17)
+            db.add_all([user, product])
+            db.flush()
+            # 20:00 UTC on March 31st is already April 1st in the session's zone (UTC+7)
+            db.add_all([
+                StockMovement(product_id=product.id, created_by=user.id, type=MovementType.IN, quantity=quantity,
+                              stock_before=before, stock_after=before + quantity, created_at=when)
+                for when, quantity, before in [
+                    (datetime(2026, 3, 31, 20, tzinfo=timezone.utc), 5, 10),
+                    (datetime(2026, 4, 5, 9, tzinfo=timezone.utc), 2, 15),
+                ]
+            ])
+            db.commit()
+
+            april, may = (datetime(2026, m, 1, tzinfo=timezone.utc) for m in (4, 5))
+            assert build_checkpoints(db, now=datetime(2026, 5, 10)) == [may, april]
+            db.commit()
+            checkpoints = {(as_utc(c.period_end), c.stock) for c in db.query(StockCheckpoint)}
+            assert checkpoints == {(april, 15), (may, 17)}
+
+            for at, stock in [("2026-03-31T19:00:00", 10), ("2026-03-31T21:00:00", 15),
+                              ("2026-04-01T06:00:00+07:00", 15), ("2026-04-30T23:59:59", 17)]:
+                assert stock_as_of(db, [product.id], datetime.fromisoformat(at)) == {product.id: stock}
@@ -0,0 +1,90 @@
+"""Stock ledger verifier tests."""
+import pytest
+from datetime import date, datetime
+from app.generate_dataset import DatasetSpec, generate
+from app.models.user import User, UserRole
+from app.models.product import Product
+from app.models.stock import StockMovement, MovementType
+from app.verify_stock_ledger import verify_ledger
+
+SPEC = DatasetSpec(products=40, customers=30, suppliers=8, orders=400, days=30,
+                   end_date=date(2026, 6, 30), seed=11, shards=4)
+
+
+def _url(session_factory) -> str:
+    return session_factory.kw["bind"].url.render_as_string(hide_password=False)
+
+
+class TestVerifyStockLedger:
+    """Breaks, mismatches and drift are found across parallel workers."""
+
+    def test_consistent_ledger(self, concurrent_db):
+        generate(_url(concurrent_db), SPEC, workers=1, batch_rows=500)
+
+        report = verify_ledger(_url(concurrent_db), workers=2)
+
+        db = concurrent_db()
+        try:
+            assert report.movements == db.query(StockMovement).count() > 0
+            assert report.products == db.query(StockMovement.product_id).distinct().count()
+        finally:
+            db.close()
+        assert report.ok, report.issues
+
+    def test_reports_breaks_mismatches_and_drift(self, concurrent_db):
+        generate(_url(concurrent_db), SPEC, workers=1, batch_rows=500)
+        db = concurrent_db()
+        try:
+            chains = {}
+            for m in db.query(StockMovement).order_by(StockMovement.created_at):
+                chains.setdefault(m.product_id, []).append(m)
+            (broken, broken_chain), (drifting, _), (mismatched, mismatched_chain) = [
+                (pid, chain) for pid, chain in chains.items() if len(chain) >= 3
+            ][:3]
+
+            # A lost update: the middle movement starts from a stale stock level
+            broken_chain[1].stock_before += 4
+            broken_chain[1].stock_after += 4
+            for m in broken_chain[2:]:
+                m.stock_before += 4
+                m.stock_after += 4
+            db.get(Product, broken).current_stock += 4
+            db.get(Product, drifting).current_stock += 1
+            mismatched_chain[-1].quantity += 2
+            db.commit()
+            broken_id, mismatched_id = broken_chain[1].id, mismatched_chain[-1].id
+        finally:
+            db.close()
+
+        report = verify_ledger(_url(concurrent_db), workers=2, ranges_per_worker=3)
+
+        assert report.counts == {"break": 1, "drift": 1, "mismatch": 1}
+        found = {(i.kind, i.product_id, i.movement_id) for i in report.issues}
+        assert found == {
+            ("break", broken, broken_id),
+            ("drift", drifting, None),
+            ("mismatch", mismatched, mismatched_id),
+        }
+
+    def test_movements_sharing_a_timestamp(self, concurrent_db):
+        """Movements written in one transaction may come back in any order."""
+        db = concurrent_db()
+        try:
+            user = User(email="verify@example.com", hashed_password="x", full_name="V", role=UserRole.STAFF)
+            product = Product(sku="TIE-1", name="Tie", current_stock=6)
+            db.add_all([user, product])
+            db.flush()
+            when = datetime(2026, 6, 1, 12)
+            db.add_all([
+                StockMovement(product_id=product.id, created_by=user.id, type=kind, quantity=q,
+                              stock_before=before, stock_after=after, created_at=when)
+                for kind, q, before, after in [
+                    (MovementType.OUT, 1, 9, 8), (MovementType.OUT, 2, 8, 6), (MovementType.IN, 9, 0, 9)
+                ]
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+        report = verify_ledger(_url(concurrent_db))
+        assert (report.movements, report.ok) == (3, True)